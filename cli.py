@@ -0,0 +1,143 @@
+"""Answers timetable filters from the command line, without starting the app.
+
+Every line of the input is a filter written as a json object, e.g.
+
+    {"groups": ["GM22"], "professors": ["Minea I"]}
+
+or a filter expression (see timetable_geo_uaic/expressions.py), e.g.
+
+    prof:"Minea I" AND (group:GM22 OR group:GR31) AND NOT room:B8
+
+and every line of the output is a json object with the filter and its lectures.
+
+    python cli.py queries.jsonl
+    python cli.py - < queries.jsonl
+    python cli.py --each-group --format text
+    python cli.py --clashes
+    python cli.py --free-rooms MARTI 12-14
+    python cli.py --all-semesters queries.jsonl
+
+With --all-semesters every filter is answered in every timetable saved by the app (every academic year
+and semester) and the output tells which timetable the lectures are from.
+"""
+import argparse
+import json
+import os
+import sys
+
+from timetable_geo_uaic.clashes import find_clashes
+from timetable_geo_uaic.library import TimetableLibrary
+from timetable_geo_uaic.occupancy import RoomOccupancy
+from timetable_geo_uaic.query import FilterSpec, QueryEngine
+from timetable_geo_uaic.utils.utils import TimetableNotFound
+
+
+def read_specs(lines):
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            if line.startswith('{'):
+                yield FilterSpec.from_dict(json.loads(line))
+            else:
+                yield FilterSpec.from_dict({'expression': line})
+        except (ValueError, TypeError) as e:
+            raise SystemExit(f'line {number}: {e}')
+
+
+def write_json(spec, lectures, output, key=None):
+    result = {'query': spec.to_dict(), 'lectures': [lecture.to_dict() for lecture in lectures]}
+    if key is not None:
+        result['timetable'] = key.to_dict()
+    output.write(json.dumps(result))
+    output.write('\n')
+
+
+def write_text(spec, lectures, output, key=None):
+    output.write(f'# {json.dumps(spec.to_dict())}\n')
+    if key is not None:
+        output.write(f'# {key.label}\n')
+    for lecture in lectures:
+        output.write(' | '.join((
+            lecture.weekday,
+            lecture.interval,
+            ', '.join(lecture.groups),
+            ', '.join(lecture.professors),
+            ', '.join(lecture.rooms),
+            ', '.join(lecture.subjects),
+        )))
+        output.write('\n')
+    output.write('\n')
+
+
+def write_results(specs, write, output, engine=None, library=None):
+    """Answers the filters in the library if it is given, in the engine otherwise."""
+    if library is not None:
+        for spec in specs:
+            for key, lectures in library.query(spec):
+                write(spec, lectures, output, key)
+        return
+    for spec, lectures in engine.query_many(specs):
+        write(spec, lectures, output)
+
+
+def load_engine(download=False):
+    try:
+        return QueryEngine.from_files(download=download)
+    except TimetableNotFound:
+        raise SystemExit('There is no saved timetable, run the app or use --download.')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Filters the timetable saved by the app.')
+    parser.add_argument('queries', nargs='?', default=None, help='file with one json filter or expression per line, - for stdin')
+    parser.add_argument('--each-group', action='store_true', help='one filter for every group of the timetable')
+    parser.add_argument('--format', choices=('json', 'text'), default='json')
+    parser.add_argument('--download', action='store_true', help='download the timetable if it was never saved')
+    parser.add_argument('--all-semesters', action='store_true', help='answer the filters in every saved timetable')
+    parser.add_argument('--clashes', action='store_true', help='report the clashes of the whole timetable')
+    parser.add_argument(
+        '--free-rooms', nargs='+', metavar=('WEEKDAY', 'INTERVAL'),
+        help='list the rooms free on a weekday, during the given intervals or the whole day',
+    )
+    args = parser.parse_args(argv)
+    if args.queries is None and not args.each_group and not args.clashes and not args.free_rooms:
+        parser.error('give a file of filters, - for stdin, --each-group, --clashes or --free-rooms')
+    if args.clashes:
+        engine = load_engine(args.download)
+        print(find_clashes(engine.timetable, engine.catalog.hierarchy).to_text())
+        return
+    if args.free_rooms:
+        engine = load_engine(args.download)
+        occupancy = RoomOccupancy.from_timetable(engine.timetable)
+        weekday, *intervals = args.free_rooms
+        if weekday not in occupancy.weekdays or not set(intervals) <= set(occupancy.intervals):
+            raise SystemExit(f'The weekdays are {occupancy.weekdays} and the intervals are {occupancy.intervals}.')
+        slots = [(weekday, interval) for interval in intervals] or occupancy.get_day(weekday)
+        print('\n'.join(occupancy.free_rooms_in(slots)))
+        return
+    # with --all-semesters only the timetables of the library are read, not the default one
+    engine = load_engine(args.download) if args.each_group or not args.all_semesters else None
+    library = TimetableLibrary() if args.all_semesters else None
+    if library is not None and not library.keys():
+        raise SystemExit('There is no saved timetable, run the app.')
+    write = write_json if args.format == 'json' else write_text
+    if args.each_group:
+        write_results(engine.get_group_specs(), write, sys.stdout, engine, library)
+    elif args.queries == '-':
+        write_results(read_specs(sys.stdin), write, sys.stdout, engine, library)
+    else:
+        # the filters are read lazily, the file stays open until every one is answered
+        with open(args.queries, encoding='utf-8') as f:
+            write_results(read_specs(f), write, sys.stdout, engine, library)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except BrokenPipeError:
+        # the reader stopped early (e.g. head), the rest of the output is dropped quietly
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
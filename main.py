@@ -1,11 +1,21 @@
+import sys
+
+# imported first, so that the time spent importing the app is part of the startup report
+from timetable_geo_uaic.startup import timer
 from PyQt6.QtWidgets import QApplication
 
 from timetable_geo_uaic.models import VerticalTimeHorizontalDays
 
+timer.mark('import')
+
 
 
 def main():
     app = QApplication([])
+    if '--startup-report' in sys.argv:
+        # print the report and quit after the first paint
+        timer.enabled = True
+        timer.callbacks.append(app.quit)
     model = VerticalTimeHorizontalDays()
     window = model.ui
     window.show()
@@ -0,0 +1,164 @@
+import random
+
+import pytest
+
+from timetable_geo_uaic.expressions import (
+    MAX_DEPTH,
+    And,
+    FilterSyntaxError,
+    Not,
+    Or,
+    Term,
+    parse,
+)
+from timetable_geo_uaic.index import TIMETABLE_KEYS
+from timetable_geo_uaic.query import FilterSpec, QueryEngine
+from timetable_geo_uaic.store import ColumnarTimetable
+from timetable_geo_uaic.synthetic import SyntheticTimetable
+
+
+@pytest.fixture(scope='module')
+def engine():
+    synthetic = SyntheticTimetable(groups=60, professors=40, rooms=20, subjects=30, lectures_per_cell=10)
+    return QueryEngine.from_store(ColumnarTimetable.from_json(synthetic.timetable))
+
+
+def select(engine, text):
+    postings = engine.index.select(parse(text))
+    return list(engine.get_postings()) if postings is None else postings
+
+
+def test_and_binds_tighter_than_or():
+    a, b, c = Term('groups', 'GM11'), Term('professors', 'Minea I'), Term('rooms', 'B601')
+    assert parse('group:GM11 OR prof:"Minea I" room:B601') == Or((a, And((b, c))))
+    assert parse('(group:GM11 OR prof:"Minea I") room:B601') == And((Or((a, b)), c))
+    assert parse('group:GM11 AND prof:"Minea I"') == parse('group:GM11 prof:"Minea I"')
+
+
+def test_not_binds_tighter_than_and():
+    a, b = Term('groups', 'GM11'), Term('rooms', 'B601')
+    assert parse('NOT group:GM11 room:B601') == And((Not(a), b))
+    assert parse('group:GM11 AND NOT room:B601') == And((a, Not(b)))
+    assert parse('NOT NOT group:GM11') == Not(Not(a))
+
+
+def test_keys_and_operators_are_case_insensitive():
+    assert parse('GROUP:GM11 and not Sala:B601') == And((Term('groups', 'GM11'), Not(Term('rooms', 'B601'))))
+
+
+@pytest.mark.parametrize('name', ['Minea I', 'B601 (Geologie)', 'say "hi"', 'back\\slash', 'AND', 'or'])
+def test_quoted_names(name):
+    term = Term('professors', name)
+    assert parse(term.to_text()) == term
+
+
+def test_escapes():
+    assert parse(r'prof:"Minea \"I\" \\ x"') == Term('professors', 'Minea "I" \\ x')
+
+
+def test_empty_expression():
+    assert parse('') is None
+    assert parse('   ') is None
+
+
+@pytest.mark.parametrize('text, position', [
+    ('group:GM11 "', 11),
+    ('group:GM11 ; room:B601', 11),
+    ('teacher:Minea', 0),
+    ('group:GM11 lecture:x', 11),
+    ('group:GM11 GM12', 11),
+    ('group:GM11)', 10),
+    ('(group:GM11', 11),
+    ('(group:GM11 OR (room:B601)', 26),
+    ('group:GM11 AND', 14),
+    ('NOT', 3),
+    ('AND group:GM11', 0),
+    ('group:GM11 OR OR room:B601', 14),
+    ('()', 1),
+])
+def test_syntax_errors(text, position):
+    with pytest.raises(FilterSyntaxError) as error:
+        parse(text)
+    assert error.value.position == position
+    assert f'(position {position})' in str(error.value)
+
+
+def test_syntax_errors_are_value_errors():
+    with pytest.raises(ValueError):
+        FilterSpec.from_dict({'expression': 'group:'})
+
+
+def test_max_depth():
+    term = 'group:GM11'
+    assert parse('(' * MAX_DEPTH + term + ')' * MAX_DEPTH) == Term('groups', 'GM11')
+    with pytest.raises(FilterSyntaxError) as error:
+        parse('(' * (MAX_DEPTH + 1) + term + ')' * (MAX_DEPTH + 1))
+    assert error.value.position == MAX_DEPTH
+    parse('NOT ' * MAX_DEPTH + term)
+    with pytest.raises(FilterSyntaxError) as error:
+        parse('NOT ' * (MAX_DEPTH + 1) + term)
+    assert error.value.position == 4 * MAX_DEPTH
+
+
+def test_deep_nesting_does_not_exhaust_the_stack():
+    with pytest.raises(FilterSyntaxError):
+        parse('(' * 100000)
+    with pytest.raises(FilterSyntaxError):
+        parse('NOT ' * 100000 + 'group:GM11')
+
+
+@pytest.mark.parametrize('name', ['abc', 'GM', 'XX99', '123', ''])
+def test_names_which_are_not_groups_match_nothing(engine, name):
+    assert engine.query({'groups': [name]}) == []
+    assert engine.query(f'group:"{name}"') == []
+    assert select(engine, f'NOT group:"{name}"') == list(engine.get_postings())
+
+
+def test_operators(engine):
+    everything = list(engine.get_postings())
+    a = 'group:GM11'
+    b = f'prof:"{engine.catalog.professors.names[0]}"'
+    c = f'room:{engine.catalog.rooms.names[0]}'
+    assert select(engine, a) and select(engine, b) and select(engine, c)
+    assert set(select(engine, f'{a} OR {b} {c}')) == set(select(engine, a)) | (set(select(engine, b)) & set(select(engine, c)))
+    assert set(select(engine, f'({a} OR {b}) {c}')) == (set(select(engine, a)) | set(select(engine, b))) & set(select(engine, c))
+    assert set(select(engine, f'{a} AND NOT {c}')) == set(select(engine, a)) - set(select(engine, c))
+    assert set(select(engine, f'NOT {a}')) == set(everything) - set(select(engine, a))
+    assert select(engine, f'NOT NOT {a}') == select(engine, a)
+    # the postings are returned in timetable order
+    result = select(engine, f'{a} OR {b}')
+    assert result == [posting for posting in everything if posting in set(result)]
+
+
+def test_same_results_as_the_dialog(engine):
+    models = pytest.importorskip('timetable_geo_uaic.models')
+    filter_by_iterable_object = models.VerticalTimeHorizontalDays.filter_by_iterable_object
+    names = {
+        'groups': engine.catalog.groups.names,
+        'professors': engine.catalog.professors.names,
+        'rooms': engine.catalog.rooms.names,
+        'subjects': engine.catalog.subjects.timetable_names,
+    }
+    rng = random.Random(0)
+    for _ in range(300):
+        criteria = {
+            timetable_key: rng.sample(names[timetable_key], rng.randint(1, 2))
+            for timetable_key in TIMETABLE_KEYS
+            if rng.random() < 0.4
+        }
+        # as the comboboxes of the dialog, one timetable key after the other
+        filtered = engine.timetable
+        for timetable_key, values in criteria.items():
+            filtered = filter_by_iterable_object(filtered, values, timetable_key)
+        expected = [
+            (weekday, interval, *(tuple(lectures[timetable_key][i].names) for timetable_key in TIMETABLE_KEYS))
+            for weekday, intervals in filtered.items()
+            for interval, lectures in intervals.items()
+            for i in range(len(lectures['groups']))
+        ]
+        for spec in (criteria, FilterSpec(expression=FilterSpec(**criteria).parsed.to_text()) if criteria else ''):
+            lectures = engine.query(spec)
+            assert [
+                (lecture.weekday, lecture.interval, lecture.groups, lecture.professors, lecture.rooms, lecture.subjects)
+                for lecture in lectures
+            ] == expected, criteria
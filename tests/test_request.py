@@ -0,0 +1,59 @@
+import functools
+import http.server
+import os
+import threading
+
+import pytest
+
+from timetable_geo_uaic.request import Fetcher, HTMLCache
+from timetable_geo_uaic.synthetic import SyntheticTimetable
+from timetable_geo_uaic.utils.streaming import StreamingTableParser
+from timetable_geo_uaic.utils.utils import HTMLElementsToJson, Table
+
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def website(tmp_path):
+    """Serves a synthetic timetable page the way the website does, with Last-Modified and 304 answers."""
+    root = tmp_path / 'site'
+    fetcher = Fetcher(base_url='', cache=HTMLCache(str(tmp_path / 'cache')))
+    page = root / fetcher.get_url().lstrip('/')
+    page.parent.mkdir(parents=True)
+    page.write_text(SyntheticTimetable(groups=8, lectures_per_cell=2).to_html(), encoding='utf-8')
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=str(root)))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    fetcher.base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    yield fetcher
+    server.shutdown()
+    server.server_close()
+
+
+def save_json(fetcher: Fetcher, tmp_path) -> HTMLElementsToJson:
+    table = Table(fetcher=fetcher)
+    html_elements_to_json = HTMLElementsToJson(
+        StreamingTableParser(table),
+        json_file_path=str(tmp_path / 't.json'),
+        snapshot_file_path=str(tmp_path / 't.snapshot'),
+    )
+    html_elements_to_json.save_json()
+    return html_elements_to_json
+
+
+def test_unchanged_page_is_not_parsed_again(website, tmp_path):
+    first = save_json(website, tmp_path)
+    json_path = tmp_path / 't.json'
+    assert first.parser.table.result.downloaded
+    assert website.cache.get_source(str(json_path)) == first.parser.table.result.digest
+    # the file is dated back, so a rewrite is noticed even within the resolution of the clock
+    os.utime(json_path, ns=(0, 0))
+
+    second = save_json(website, tmp_path)
+    assert not second.parser.table.result.downloaded
+    assert second.is_up_to_date()
+    assert json_path.stat().st_mtime_ns == 0
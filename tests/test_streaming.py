@@ -0,0 +1,100 @@
+import pytest
+
+from timetable_geo_uaic.synthetic import SyntheticTimetable
+from timetable_geo_uaic.utils.streaming import StreamingTableParser
+from timetable_geo_uaic.utils.utils import HTMLTableParser, Table
+
+
+METHODS = ('get_weekdays', 'get_intervals', 'get_subjects', 'get_groups', 'get_professors', 'get_rooms')
+
+
+def page(cell: str) -> str:
+    """A page with the structure of the website and a single cell, repeated for two weekdays and two intervals."""
+    return '\n'.join((
+        '<html><body><table><tr><td>a</td></tr></table><table><tr><td>b</td></tr></table>',
+        '<table id="table"><thead><tr><td></td><th class="xAxis">LUNI</th><th class="xAxis">MARȚI</th></tr></thead>',
+        '<tbody>',
+        f'<tr><th class="yAxis">08-10</th><td>{cell}</td><td>{cell}</td></tr>',
+        f'<tr><th class="yAxis">10-12</th><td>{cell}</td><td>{cell}</td></tr>',
+        '<tr class="foot"><td></td><td colspan="2">Orar generat cu FET</td></tr>',
+        '</tbody></table></body></html>',
+    ))
+
+
+def lines(groups: str, subjects: str, professors: str, rooms: str, separator: str = '') -> str:
+    rows = (
+        ('studentsset line0', groups),
+        ('line1', subjects),
+        ('teacher line2', professors),
+        ('room line3', rooms),
+    )
+    return separator.join(f'<tr class="{class_}">{cells}</tr>' for class_, cells in rows)
+
+
+EDGE_CASES = {
+    'whitespace': '<table class="detailed">\n  ' + lines(
+        '\n    <td> GM11 </td>\n    <td>\tGR21\n</td>\n  ',
+        '<td>\n Geografie fizica (C)\n</td> <td>Turism (LP)</td>',
+        '<td>Minea I</td>\n<td>Groza O</td>',
+        '<td>B601</td>  <td>C400</td>',
+        separator='\n  ',
+    ) + '\n</table>',
+    'nbsp': '<table class="detailed">' + lines(
+        '<td>GM&nbsp;11</td><td>&nbsp;</td>',
+        '<td>Geografie&nbsp;fizica (C)</td><td>&nbsp;</td>',
+        '<td>Minea&nbsp;I</td><td></td>',
+        '<td>&nbsp;B601&nbsp;</td><td>&nbsp;</td>',
+    ) + '</table>',
+    'br': '<table class="detailed">' + lines(
+        '<td>GM11<br>GM12</td>',
+        '<td>Geografie<br/>fizica (C)</td>',
+        '<td>Minea I<br>Groza O</td>',
+        '<td><br></td>',
+    ) + '</table>',
+    'comments': '<table class="detailed"><!-- lectures -->' + lines(
+        '<td>GM<!-- group -->11</td><!-- between --><td>GR21</td>',
+        '<td>Turism (LP)<!-- end --></td>',
+        '<td><!-- none --></td>',
+        '<td>B601</td>',
+    ) + '</table>',
+    'nested spans': '<table class="detailed">' + lines(
+        '<td><span>GM11</span></td><td><span><span>GR</span>21</span></td>',
+        '<td><span>Geografie <span class="x">fizica</span></span> (C)</td>',
+        '<td><span>Minea</span> <span>I</span></td>',
+        '<td><span>B601</span><span>B602</span></td>',
+    ) + '</table>',
+    'entities': '<table class="detailed">' + lines(
+        '<td>GM11 &amp; GR21</td>',
+        '<td>Geografia Rom&#226;niei &lt;Op&gt; (C)</td>',
+        '<td>Ungurea&#x219;u &icirc; A</td>',
+        '<td>B601 &quot;Ia&#537;i&quot;</td>',
+    ) + '</table>',
+}
+
+
+def parse(parser_class: type, markup: str) -> list:
+    parser = parser_class(table=Table.from_content(markup.encode('utf-8')))
+    return [getattr(parser, method)() for method in METHODS]
+
+
+@pytest.mark.parametrize('synthetic', [
+    SyntheticTimetable(groups=10, lectures_per_cell=1),
+    SyntheticTimetable(groups=40, lectures_per_cell=8, seed=1),
+    SyntheticTimetable(groups=200, lectures_per_cell=20, seed=2),
+], ids=['one lecture', 'small', 'medium'])
+def test_synthetic_pages(synthetic):
+    markup = synthetic.to_html()
+    assert parse(StreamingTableParser, markup) == parse(HTMLTableParser, markup)
+
+
+@pytest.mark.parametrize('cell', EDGE_CASES.values(), ids=EDGE_CASES.keys())
+def test_edge_cases(cell):
+    markup = page(cell)
+    expected = parse(HTMLTableParser, markup)
+    assert expected[0] == ['LUNI', 'MARTI']
+    assert parse(StreamingTableParser, markup) == expected
+
+
+def test_page_without_timetable():
+    with pytest.raises(ValueError):
+        StreamingTableParser(table=Table.from_content(b'<html><table></table></html>')).get_weekdays()
@@ -18,4 +18,7 @@ def resource_path(relative_path: Path):
 DIALOG_ICON = resource_path(Path('timetable_geo_uaic/ui/icon.png'))
 MAIN_UI = resource_path(Path('timetable_geo_uaic/ui/main.ui'))
 TIMETABLE = resource_path(Path('timetable_geo_uaic/timetable.json'))
+TIMETABLE_SNAPSHOT = resource_path(Path('timetable_geo_uaic/timetable.snapshot'))
+HTML_CACHE = resource_path(Path('timetable_geo_uaic/cache'))
+TIMETABLES = resource_path(Path('timetable_geo_uaic/timetables'))
 
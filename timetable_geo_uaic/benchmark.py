@@ -0,0 +1,369 @@
+"""Benchmarks of the whole pipeline on synthetic timetables (see synthetic.py), compared to stored baselines.
+
+    python -m timetable_geo_uaic.benchmark                   compare to the baseline
+    python -m timetable_geo_uaic.benchmark --save            store the results as the new baseline
+    python -m timetable_geo_uaic.benchmark --sizes small --stages parse index
+
+Every stage is timed on its own (its input is prepared beforehand) and the best of several runs is kept.
+A stage is a regression when it is slower than its baseline by more than the tolerance and by more than
+--min-difference milliseconds (so the noise of the fastest stages is ignored), in which case the
+exit status is 1. A fixed workload is timed with every run and the baseline is scaled by how much slower or
+faster it ran, so that a busier or slower machine is not mistaken for a regression. Still, the baselines
+are best stored again on a new machine.
+The stages which need Qt (the legacy filter of the dialog and the rendering) are skipped without PyQt6."""
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from attrs import define, field
+
+from .synthetic import SyntheticTimetable
+
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'benchmark_baseline.json')
+SIZES = {
+    'small': SyntheticTimetable(groups=20, professors=30, rooms=15, subjects=40, lectures_per_cell=4),
+    'medium': SyntheticTimetable(groups=80, professors=120, rooms=60, subjects=160, lectures_per_cell=16),
+    'large': SyntheticTimetable(groups=320, professors=480, rooms=240, subjects=640, lectures_per_cell=64),
+}
+# seconds by which a stage has to change to be reported, the times of sub-millisecond stages are mostly noise
+MIN_DIFFERENCE = 0.5 / 1000
+# the groups filtered by the filter stages
+FILTERED_GROUPS = 20
+PARSER_METHODS = ('get_weekdays', 'get_intervals', 'get_subjects', 'get_groups', 'get_professors', 'get_rooms')
+# created by the render stage if there is no application yet
+_application = None
+
+
+def measure(function: Callable[..., object], setup: Callable[[], tuple] = tuple, repeat: int = 5) -> float:
+    """Returns the best time of the function, in seconds. The setup creates its arguments and is not timed."""
+    best = float('inf')
+    for _ in range(repeat):
+        args = setup()
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def calibrate(repeat: int = 5) -> float:
+    """Times a fixed workload of pure Python (strings, dicts and sorting, as the pipeline), in seconds."""
+    def work() -> None:
+        names = [f'GM{i % 97} {i}' for i in range(50000)]
+        groups = {}
+        for i, name in enumerate(names):
+            groups.setdefault(name[:4], []).append(i)
+        sorted(names, key=str.casefold)
+    return measure(work, repeat=repeat)
+
+
+@define
+class Workload:
+    """The inputs of every stage for one synthetic timetable, each created once by the stage before."""
+    synthetic: SyntheticTimetable
+    content: bytes = field(init=False)
+    timetable: dict = field(init=False)
+    objects: dict = field(init=False, default=None)
+    catalog: object = field(init=False, default=None)
+    index: object = field(init=False, default=None)
+    groups: list[str] = field(init=False, factory=list)
+
+
+    def __attrs_post_init__(self) -> None:
+        self.content = self.synthetic.to_html().encode('utf-8')
+        self.timetable = self.synthetic.timetable
+
+
+def get_parser(content: bytes, parser_class: type | None = None):
+    from .utils.streaming import StreamingTableParser
+    from .utils.utils import Table
+    return (parser_class or StreamingTableParser)(table=Table.from_content(content))
+
+
+def bench_parse(workload: Workload, repeat: int) -> float:
+    def parse() -> None:
+        parser = get_parser(workload.content)
+        for method in PARSER_METHODS:
+            getattr(parser, method)()
+    return measure(parse, repeat=repeat)
+
+
+def bench_parse_bs4(workload: Workload, repeat: int) -> float:
+    from .utils.utils import HTMLTableParser
+
+    def parse() -> None:
+        parser = get_parser(workload.content, HTMLTableParser)
+        for method in PARSER_METHODS:
+            getattr(parser, method)()
+    return measure(parse, repeat=max(1, repeat // 2))
+
+
+def bench_json(workload: Workload, repeat: int) -> float:
+    """Builds the json dictionary from the extracted page, serializes it and writes the json file."""
+    from .utils.utils import HTMLElementsToJson
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_file_path = os.path.join(directory, 'timetable.json')
+
+        def setup() -> tuple:
+            parser = get_parser(workload.content)
+            parser.extractor  # the page is parsed here
+            return HTMLElementsToJson(parser=parser, json_file_path=json_file_path),
+
+        def save(html_elements_to_json: HTMLElementsToJson) -> None:
+            html_elements_to_json.create_json_attribute()
+            with open(json_file_path, 'w') as f:
+                f.write(html_elements_to_json.json_file)
+        return measure(save, setup, repeat)
+
+
+def bench_objects(workload: Workload, repeat: int) -> float:
+    from .objects import entities
+    from .utils.utils import JsonToObjects
+
+    def setup() -> tuple:
+        # the shared entities are created again, as when the first timetable is loaded
+        entities.clear()
+        return JsonToObjects(copy.deepcopy(workload.timetable)),
+
+    def convert(json_to_objects: JsonToObjects) -> None:
+        json_to_objects.convert_timetable()
+        workload.objects = json_to_objects.timetable
+        workload.catalog = json_to_objects.catalog
+    return measure(convert, setup, repeat)
+
+
+def bench_catalog(workload: Workload, repeat: int) -> float:
+    from .utils.utils import JsonToObjects
+
+    def setup() -> tuple:
+        json_to_objects = JsonToObjects(copy.deepcopy(workload.timetable))
+        json_to_objects.convert_timetable()
+        return json_to_objects,
+    return measure(lambda json_to_objects: json_to_objects.create_catalog(), setup, repeat)
+
+
+def bench_columnar(workload: Workload, repeat: int) -> float:
+    """The conversion used by the dialog: the json to a columnar store, then to the objects."""
+    from .store import ColumnarTimetable, ColumnarToObjects
+
+    def convert() -> None:
+        ColumnarToObjects(ColumnarTimetable.from_json(workload.timetable)).convert_timetable()
+    return measure(convert, repeat=repeat)
+
+
+def bench_index(workload: Workload, repeat: int) -> float:
+    from .index import SlotIndex
+
+    def build() -> None:
+        workload.index = SlotIndex(workload.objects, workload.catalog)
+        workload.index.bitsets
+    seconds = measure(build, repeat=repeat)
+    workload.groups = [group.name for group in workload.catalog.groups if not group.aggregate][:FILTERED_GROUPS]
+    return seconds
+
+
+def bench_filter(workload: Workload, repeat: int) -> float:
+    def filter_groups() -> None:
+        for group in workload.groups:
+            workload.index.filter({'groups': [group]})
+    return measure(filter_groups, repeat=repeat)
+
+
+def bench_filter_legacy(workload: Workload, repeat: int) -> float:
+    """The filter of the dialog before the index, which copies the timetable for every combobox."""
+    from .models import VerticalTimeHorizontalDays
+
+    def filter_groups() -> None:
+        for group in workload.groups:
+            VerticalTimeHorizontalDays.filter_by_iterable_object(workload.objects, [group], 'groups')
+    return measure(filter_groups, repeat=repeat)
+
+
+def bench_render(workload: Workload, repeat: int) -> float:
+    """Fills the table of the dialog and paints it offscreen."""
+    from PyQt6.QtWidgets import QApplication, QTableView
+    from .utils.table_model import TimetableTableModel, LectureStackDelegate
+
+    global _application
+    if QApplication.instance() is None:
+        # kept, since Qt needs the application as long as there are widgets
+        _application = QApplication([])
+    view = QTableView()
+    view.resize(1280, 720)
+    view.setItemDelegate(LectureStackDelegate(view))
+
+    def render() -> None:
+        model = TimetableTableModel(view)
+        model.set_headers(weekdays=list(workload.objects), intervals=list(next(iter(workload.objects.values()))))
+        model.set_timetable(workload.objects)
+        view.setModel(model)
+        view.grab()
+    return measure(render, repeat=repeat)
+
+
+# in order, since a stage might use what the ones before it created
+STAGES: dict[str, Callable[[Workload, int], float]] = {
+    'parse': bench_parse,
+    'parse_bs4': bench_parse_bs4,
+    'json': bench_json,
+    'objects': bench_objects,
+    'catalog': bench_catalog,
+    'columnar': bench_columnar,
+    'index': bench_index,
+    'filter': bench_filter,
+    'filter_legacy': bench_filter_legacy,
+    'render': bench_render,
+}
+QT_STAGES = ('filter_legacy', 'render')
+# the stages needed by the others
+REQUIRED_STAGES = {'catalog': 'objects', 'index': 'objects', 'filter': 'index', 'filter_legacy': 'index', 'render': 'objects'}
+
+
+def has_qt() -> bool:
+    try:
+        import PyQt6.QtWidgets  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def run(sizes: list[str], stages: list[str], repeat: int = 5, log: Callable[[str], None] | None = None) -> dict[str, dict[str, float]]:
+    """Returns the seconds of every stage, for every size."""
+    if not has_qt():
+        stages = [stage for stage in stages if stage not in QT_STAGES]
+    needed = set(stages)
+    for stage in reversed(STAGES):
+        if stage in needed and stage in REQUIRED_STAGES:
+            needed.add(REQUIRED_STAGES[stage])
+    results = {}
+    for size in sizes:
+        workload = Workload(SIZES[size])
+        results[size] = {}
+        for stage, bench in STAGES.items():
+            if stage not in needed:
+                continue
+            seconds = bench(workload, repeat)
+            if stage in stages:
+                results[size][stage] = seconds
+                if log is not None:
+                    log(f'{size:<8} {stage:<14} {seconds * 1000:10.2f} ms')
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+    scale: float = 1,
+    min_difference: float = MIN_DIFFERENCE,
+) -> tuple[list[str], list[str]]:
+    """Returns the lines of the comparison and the regressions (as size/stage).
+    The times of the baseline are multiplied by the scale, the ratio of the current calibration to its one.
+    A stage whose time changed by less than min_difference seconds is neither a regression nor faster."""
+    lines = [f'{"size":<8} {"stage":<14} {"baseline":>12} {"current":>12} {"ratio":>7}']
+    regressions = []
+    for size, stages in results.items():
+        for stage, seconds in stages.items():
+            before = baseline.get(size, {}).get(stage)
+            if before is not None:
+                before *= scale
+            if before is None:
+                lines.append(f'{size:<8} {stage:<14} {"-":>12} {seconds * 1000:9.2f} ms')
+                continue
+            ratio = seconds / before if before else float('inf')
+            flag = ''
+            if abs(seconds - before) < min_difference:
+                pass
+            elif ratio > 1 + tolerance:
+                flag = '  REGRESSION'
+                regressions.append(f'{size}/{stage}')
+            elif ratio < 1 / (1 + tolerance):
+                flag = '  faster'
+            lines.append(f'{size:<8} {stage:<14} {before * 1000:9.2f} ms {seconds * 1000:9.2f} ms {ratio:6.2f}x{flag}')
+    return lines, regressions
+
+
+def read_baseline(path: str) -> dict | None:
+    """Returns the stored baseline: the machine, the calibration and the results of every size."""
+    try:
+        with open(path, 'r') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if 'results' not in baseline or 'calibration' not in baseline:
+        return None
+    return baseline
+
+
+def save_baseline(path: str, results: dict[str, dict[str, float]], calibration: float, repeat: int) -> None:
+    """Stores the results, merged with the baseline of the sizes and stages which did not run.
+    Those are scaled to the new calibration."""
+    baseline = read_baseline(path)
+    merged = {}
+    if baseline is not None:
+        scale = calibration / baseline['calibration']
+        merged = {
+            size: {stage: seconds * scale for stage, seconds in stages.items()}
+            for size, stages in baseline['results'].items()
+        }
+    for size, stages in results.items():
+        merged.setdefault(size, {}).update(stages)
+    with open(path, 'w') as f:
+        json.dump({
+            'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'processor': platform.machine()},
+            'repeat': repeat,
+            'calibration': calibration,
+            'results': merged,
+        }, f, indent=2)
+        f.write('\n')
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Benchmarks the pipeline on synthetic timetables.')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--repeat', type=int, default=7, help='runs of every stage, the best one is kept')
+    parser.add_argument('--baseline', default=BASELINE, help='json file of the baseline')
+    parser.add_argument('--save', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='slowdown allowed before a regression, 0.3 is 30%%')
+    parser.add_argument(
+        '--min-difference', type=float, default=MIN_DIFFERENCE * 1000,
+        help='milliseconds by which a stage has to change to be reported',
+    )
+    args = parser.parse_args(argv)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    calibration = calibrate(args.repeat)
+    results = run(args.sizes, args.stages, repeat=args.repeat, log=print)
+    # the machine might have been busier at the end
+    calibration = (calibration + calibrate(args.repeat)) / 2
+    if args.save:
+        save_baseline(args.baseline, results, calibration, args.repeat)
+        print(f'Baseline saved to {args.baseline}.')
+        return
+    baseline = read_baseline(args.baseline)
+    if baseline is None:
+        print(f'There is no baseline in {args.baseline}, use --save to store one.')
+        return
+    scale = calibration / baseline['calibration']
+    lines, regressions = compare(
+        results, baseline['results'], args.tolerance, scale, min_difference=args.min_difference / 1000,
+    )
+    print(f'\ncalibration {calibration * 1000:.2f} ms, {baseline["calibration"] * 1000:.2f} ms for the baseline '
+          f'(its times are multiplied by {scale:.2f})')
+    print('\n'.join(lines))
+    if regressions:
+        print(f'\n{len(regressions)} regressions: {", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
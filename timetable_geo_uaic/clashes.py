@@ -0,0 +1,110 @@
+"""Detection of the lectures which clash: a room or a professor booked twice at the same time,
+or a group having two lectures at the same time (counting the lectures of its aggregates)."""
+from __future__ import annotations
+
+from attrs import define, field
+
+from .objects import GroupHierarchy
+
+
+CLASH_KINDS = ('rooms', 'professors', 'groups')
+
+
+@define(frozen=True)
+class Clash:
+    """Two or more lectures of a cell which share a room, a professor or related groups.
+    positions are the positions of the lectures in the cell."""
+    kind: str
+    weekday: str
+    interval: str
+    names: tuple[str, ...]
+    positions: tuple[int, ...]
+
+
+    def describe(self) -> str:
+        if self.kind == 'rooms':
+            return f'Sala {self.names[0]} este ocupată de {len(self.positions)} ore'
+        if self.kind == 'professors':
+            return f'{self.names[0]} predă {len(self.positions)} ore'
+        if self.names[0] == self.names[1]:
+            return f'Grupa {self.names[0]} are {len(self.positions)} ore'
+        return f'Grupele {self.names[0]} și {self.names[1]} au ore în același timp'
+
+
+@define
+class ClashReport:
+    clashes: list[Clash] = field(factory=list)
+
+
+    def __len__(self) -> int:
+        return len(self.clashes)
+
+
+    @property
+    def cells(self) -> dict[tuple[str, str], list[Clash]]:
+        cells: dict[tuple[str, str], list[Clash]] = {}
+        for clash in self.clashes:
+            cells.setdefault((clash.weekday, clash.interval), []).append(clash)
+        return cells
+
+
+    def count(self, kind: str) -> int:
+        return sum(1 for clash in self.clashes if clash.kind == kind)
+
+
+    def to_text(self) -> str:
+        if not self.clashes:
+            return 'Nu există suprapuneri.'
+        lines = [', '.join(f'{kind}: {self.count(kind)}' for kind in CLASH_KINDS)]
+        for (weekday, interval), clashes in self.cells.items():
+            lines.append(f'{weekday} {interval}')
+            lines.extend(f'  {clash.describe()}' for clash in clashes)
+        return '\n'.join(lines)
+
+
+def _find_shared(kind: str, weekday: str, interval: str, lectures: list, clashes: list[Clash]) -> None:
+    """Finds the names used by several lectures of a cell."""
+    positions: dict[str, list[int]] = {}
+    for position, objects in enumerate(lectures):
+        for name in set(objects.names):
+            if name:
+                positions.setdefault(name, []).append(position)
+    for name, shared in positions.items():
+        if len(shared) > 1:
+            clashes.append(Clash(kind, weekday, interval, (name, ), tuple(shared)))
+
+
+def _find_group_clashes(weekday: str, interval: str, lectures: list, hierarchy: GroupHierarchy, clashes: list[Clash]) -> None:
+    """Finds the lectures whose groups are the same, or where one is an aggregate of the other
+    (e.g. GM2 and GM22), with the belonging groups used to filter the timetable."""
+    positions: dict[str, set[int]] = {}
+    for position, objects in enumerate(lectures):
+        for name in objects.names:
+            positions.setdefault(name, set()).add(position)
+    seen = set()
+    for name, own in positions.items():
+        for related in hierarchy.belonging(name):
+            other = positions.get(related)
+            if other is None:
+                continue
+            pair = tuple(sorted((name, related)))
+            shared = own | other
+            # a lecture of both groups is not a clash, e.g. GM2 and GM22 listed together
+            if len(shared) < 2 or (related != name and own == other) or pair in seen:
+                continue
+            seen.add(pair)
+            clashes.append(Clash('groups', weekday, interval, pair, tuple(sorted(shared))))
+
+
+def find_clashes(timetable: dict, hierarchy: GroupHierarchy) -> ClashReport:
+    """Checks every cell of a converted timetable once. Every check uses dictionaries keyed by name,
+    so the time grows linearly with the number of lectures."""
+    clashes: list[Clash] = []
+    for weekday, intervals in timetable.items():
+        for interval, lectures in intervals.items():
+            if len(lectures['groups']) < 2:
+                continue
+            _find_shared('rooms', weekday, interval, lectures['rooms'], clashes)
+            _find_shared('professors', weekday, interval, lectures['professors'], clashes)
+            _find_group_clashes(weekday, interval, lectures['groups'], hierarchy, clashes)
+    return ClashReport(clashes)
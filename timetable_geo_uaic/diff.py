@@ -0,0 +1,59 @@
+"""Structural difference between two versions of a timetable."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from attrs import define, field
+
+from .index import Posting
+
+if TYPE_CHECKING:
+    from .store import ColumnarTimetable
+
+
+# (weekday, interval)
+Cell = tuple[str, str]
+
+
+@define
+class ChangeSet:
+    """Describes what changed after a timetable was downloaded again.
+    The names are the catalog names (for subjects, the full name, e.g. 'Geomorfologie (LP)')."""
+    cells: set[Cell] = field(factory=set)
+    lectures: set[Posting] = field(factory=set)
+    added: dict[str, set[str]] = field(factory=dict)
+    removed: dict[str, set[str]] = field(factory=dict)
+    # True if the weekdays or the intervals changed, in which case everything was converted again
+    full: bool = False
+
+
+    @property
+    def empty(self) -> bool:
+        return not self.full and not self.cells
+
+
+def get_lecture_key(store: ColumnarTimetable, lecture: int) -> tuple:
+    return (
+        tuple(store.group_names(lecture)),
+        tuple(store.professor_names(lecture)),
+        store.room_name(lecture),
+        store.subject_name(lecture),
+    )
+
+
+def diff_timetables(old: ColumnarTimetable, new: ColumnarTimetable) -> tuple[set[Cell], set[Posting]] | None:
+    """Returns the cells and the lecture positions which differ between two timetables.
+    Returns None if the timetables do not have the same weekdays and intervals."""
+    if old.weekdays != new.weekdays or old.intervals != new.intervals:
+        return None
+    cells = set()
+    lectures = set()
+    for w, weekday in enumerate(new.weekdays):
+        for i, interval in enumerate(new.intervals):
+            old_range, new_range = old.cell_range(w, i), new.cell_range(w, i)
+            for position in range(max(len(old_range), len(new_range))):
+                if position >= len(old_range) or position >= len(new_range) \
+                        or get_lecture_key(old, old_range[position]) != get_lecture_key(new, new_range[position]):
+                    cells.add((weekday, interval))
+                    lectures.add((weekday, interval, position))
+    return cells, lectures
@@ -0,0 +1,324 @@
+"""A small language for timetable filters, compiled to bitwise operations over the posting bitsets of an index.
+
+    prof:"Minea I" AND (group:GM22 OR group:GR31) AND NOT room:B8
+
+A term is a timetable key and a name, quoted if it contains spaces, parentheses or quotes. NOT binds tighter
+than AND, which binds tighter than OR, and terms written one after the other are joined by AND. The keys are
+group, prof, room and subject (also their plurals and their Romanian names: grupa, profesor, sala, materie).
+As in the dialog, a group also matches its aggregates and a subject is given by its timetable name."""
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import Iterable, Union
+
+from attrs import define
+
+from .index import TIMETABLE_KEYS, SlotIndex
+
+
+KEYS = {
+    'group': 'groups',
+    'groups': 'groups',
+    'grupa': 'groups',
+    'grupă': 'groups',
+    'prof': 'professors',
+    'professor': 'professors',
+    'professors': 'professors',
+    'profesor': 'professors',
+    'room': 'rooms',
+    'rooms': 'rooms',
+    'sala': 'rooms',
+    'sală': 'rooms',
+    'subject': 'subjects',
+    'subjects': 'subjects',
+    'materie': 'subjects',
+}
+# the key written by to_text
+PREFIXES = {'groups': 'group', 'professors': 'prof', 'rooms': 'room', 'subjects': 'subject'}
+OPERATORS = ('AND', 'OR', 'NOT')
+# the parentheses and the NOTs which can be nested, so a long chain fails with a syntax error
+MAX_DEPTH = 100
+_TOKEN = re.compile(r'''
+    \s*(?:
+        (?P<open>\() | (?P<close>\))
+        | (?P<key>[^\W\d_]+):(?:"(?P<quoted>(?:[^"\\]|\\.)*)" | (?P<bare>[^\s()"]+))
+        | (?P<word>[^\s()"]+)
+        | (?P<error>\S)
+    )''', re.VERBOSE)
+_BARE = re.compile(r'[^\s()"]+')
+
+
+class FilterSyntaxError(ValueError):
+    """Raised when a filter expression can not be parsed. The position is the index of the character at fault."""
+
+    def __init__(self, message: str, position: int) -> None:
+        super().__init__(f'{message} (position {position})')
+        self.position = position
+
+
+def quote(name: str) -> str:
+    if _BARE.fullmatch(name) and name.upper() not in OPERATORS:
+        return name
+    return '"{}"'.format(name.replace('\\', '\\\\').replace('"', '\\"'))
+
+
+@define(frozen=True)
+class Bits:
+    """A compiled term: the postings of its names, already read from the index."""
+    value: int
+
+
+    def evaluate(self) -> int:
+        return self.value
+
+
+@define(frozen=True)
+class Conjunction:
+    """A compiled AND. The negated operands are removed at the end (AND NOT), without computing their complement."""
+    include: tuple[Plan, ...]
+    exclude: tuple[Plan, ...]
+    all: int
+
+
+    def evaluate(self) -> int:
+        bits = self.include[0].evaluate() if self.include else self.all
+        for plan in self.include[1:]:
+            if not bits:
+                return 0
+            bits &= plan.evaluate()
+        for plan in self.exclude:
+            if not bits:
+                return 0
+            bits &= ~plan.evaluate()
+        return bits
+
+
+@define(frozen=True)
+class Disjunction:
+    operands: tuple[Plan, ...]
+
+
+    def evaluate(self) -> int:
+        bits = 0
+        for plan in self.operands:
+            bits |= plan.evaluate()
+        return bits
+
+
+Plan = Union[Bits, Conjunction, Disjunction]
+
+
+def _selectivity(plan: Plan) -> tuple[bool, int]:
+    # the terms matching the fewest lectures are intersected first, so an empty result stops early
+    if isinstance(plan, Bits):
+        return False, plan.value.bit_count()
+    return True, 0
+
+
+@define(frozen=True)
+class Term:
+    timetable_key: str
+    name: str
+
+
+    def to_text(self) -> str:
+        return f'{PREFIXES[self.timetable_key]}:{quote(self.name)}'
+
+
+    def compile(self, index: SlotIndex) -> Plan:
+        return Bits(index.get_bits(self.timetable_key, [self.name]))
+
+
+@define(frozen=True)
+class Not:
+    operand: Expression
+
+
+    def to_text(self) -> str:
+        return f'NOT {_to_operand_text(self.operand)}'
+
+
+    def compile(self, index: SlotIndex) -> Plan:
+        return Conjunction((), (self.operand.compile(index), ), index.bitsets.all)
+
+
+@define(frozen=True)
+class And:
+    operands: tuple[Expression, ...]
+
+
+    def to_text(self) -> str:
+        return ' AND '.join(_to_operand_text(operand) for operand in self.operands)
+
+
+    def compile(self, index: SlotIndex) -> Plan:
+        include = [operand.compile(index) for operand in self.operands if not isinstance(operand, Not)]
+        exclude = [operand.operand.compile(index) for operand in self.operands if isinstance(operand, Not)]
+        include.sort(key=_selectivity)
+        return Conjunction(tuple(include), tuple(exclude), index.bitsets.all)
+
+
+@define(frozen=True)
+class Or:
+    operands: tuple[Expression, ...]
+
+
+    def to_text(self) -> str:
+        return ' OR '.join(_to_operand_text(operand) for operand in self.operands)
+
+
+    def compile(self, index: SlotIndex) -> Plan:
+        return Disjunction(tuple(operand.compile(index) for operand in self.operands))
+
+
+Expression = Union[Term, Not, And, Or]
+
+
+def _to_operand_text(expression: Expression) -> str:
+    if isinstance(expression, (And, Or)):
+        return f'({expression.to_text()})'
+    return expression.to_text()
+
+
+def _tokenize(text: str) -> list[tuple[str, str, int]]:
+    """Returns the (kind, value, position) of the tokens, the last one being ('end', '', len(text))."""
+    tokens = []
+    for match in _TOKEN.finditer(text):
+        kind = match.lastgroup
+        if kind is None:
+            # only spaces were left
+            break
+        position = match.start(kind)
+        if kind == 'error':
+            raise FilterSyntaxError(f'Unexpected "{match.group(kind)}"', position)
+        if kind in ('quoted', 'bare'):
+            timetable_key = KEYS.get(match.group('key').lower())
+            if timetable_key is None:
+                raise FilterSyntaxError(f'Unknown key "{match.group("key")}", expected one of {", ".join(KEYS)}', match.start('key'))
+            name = match.group('bare')
+            if name is None:
+                name = re.sub(r'\\(.)', r'\1', match.group('quoted'))
+            tokens.append(('term', (timetable_key, name), match.start('key')))
+        elif kind == 'word':
+            word = match.group(kind)
+            if word.upper() not in OPERATORS:
+                raise FilterSyntaxError(f'Expected key:name or an operator, got "{word}"', position)
+            tokens.append((word.upper(), word, position))
+        else:
+            tokens.append((kind, match.group(kind), position))
+    tokens.append(('end', '', len(text)))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser of the grammar:
+
+        or      := and (OR and)*
+        and     := unary ([AND] unary)*
+        unary   := NOT unary | primary
+        primary := ( or ) | key:name
+    """
+
+    def __init__(self, text: str) -> None:
+        self.tokens = _tokenize(text)
+        self.position = 0
+        self.depth = 0
+
+
+    @property
+    def kind(self) -> str:
+        return self.tokens[self.position][0]
+
+
+    def advance(self) -> tuple[str, str, int]:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+
+    def enter(self, position: int) -> None:
+        self.depth += 1
+        if self.depth > MAX_DEPTH:
+            raise FilterSyntaxError(f'The expression is nested more than {MAX_DEPTH} times', position)
+
+
+    def parse(self) -> Expression:
+        expression = self.parse_or()
+        if self.kind != 'end':
+            raise FilterSyntaxError(f'Unexpected "{self.tokens[self.position][1]}"', self.tokens[self.position][2])
+        return expression
+
+
+    def parse_or(self) -> Expression:
+        operands = [self.parse_and()]
+        while self.kind == 'OR':
+            self.advance()
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else Or(tuple(operands))
+
+
+    def parse_and(self) -> Expression:
+        operands = [self.parse_unary()]
+        while self.kind in ('AND', 'NOT', 'term', 'open'):
+            if self.kind == 'AND':
+                self.advance()
+            operands.append(self.parse_unary())
+        return operands[0] if len(operands) == 1 else And(tuple(operands))
+
+
+    def parse_unary(self) -> Expression:
+        if self.kind == 'NOT':
+            self.enter(self.advance()[2])
+            operand = self.parse_unary()
+            self.depth -= 1
+            return Not(operand)
+        return self.parse_primary()
+
+
+    def parse_primary(self) -> Expression:
+        kind, value, position = self.advance()
+        if kind == 'term':
+            return Term(*value)
+        if kind == 'open':
+            self.enter(position)
+            expression = self.parse_or()
+            if self.kind != 'close':
+                raise FilterSyntaxError('Expected ")"', self.tokens[self.position][2])
+            self.advance()
+            self.depth -= 1
+            return expression
+        if kind == 'end':
+            raise FilterSyntaxError('The expression ends too early', position)
+        raise FilterSyntaxError(f'Unexpected "{value}"', position)
+
+
+@lru_cache(maxsize=256)
+def parse(text: str) -> Expression | None:
+    """Parses a filter expression. Returns None for an empty expression, which matches every lecture."""
+    if not text.strip():
+        return None
+    return _Parser(text).parse()
+
+
+def from_criteria(criteria: dict[str, Iterable[str] | None]) -> Expression | None:
+    """Returns the expression of the filters of the dialog (OR within a timetable key, AND across timetable keys)."""
+    operands = []
+    for timetable_key in TIMETABLE_KEYS:
+        terms = tuple(Term(timetable_key, name) for name in criteria.get(timetable_key) or ())
+        if terms:
+            operands.append(terms[0] if len(terms) == 1 else Or(terms))
+    return combine(*operands)
+
+
+def combine(*expressions: Expression | None) -> Expression | None:
+    """Joins expressions by AND, ignoring the empty ones."""
+    operands = []
+    for expression in expressions:
+        if isinstance(expression, And):
+            operands.extend(expression.operands)
+        elif expression is not None:
+            operands.append(expression)
+    if not operands:
+        return None
+    return operands[0] if len(operands) == 1 else And(tuple(operands))
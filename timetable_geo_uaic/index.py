@@ -0,0 +1,206 @@
+"""Inverted index from the lecture objects to the timetable positions they occupy."""
+from __future__ import annotations
+
+from typing import Iterable
+
+from attrs import define, field
+
+from .objects import Catalog
+from .tracing import traced
+
+
+TIMETABLE_KEYS = ('groups', 'professors', 'rooms', 'subjects')
+# (weekday, interval, lecture position)
+Posting = tuple[str, str, int]
+
+
+@define
+class PostingBitsets:
+    """This class numbers the postings of an index in timetable order and stores the postings of every
+    (timetable key, name) pair as the bits of an integer, so that filters become bitwise operations."""
+    postings: list[Posting] = field(factory=list)
+    bitsets: dict[tuple[str, str], int] = field(factory=dict)
+
+
+    @classmethod
+    @traced('PostingBitsets.from_index')
+    def from_index(cls, index: SlotIndex) -> PostingBitsets:
+        postings = [
+            (weekday, interval, position)
+            for weekday, intervals in index.timetable.items()
+            for interval, lectures in intervals.items()
+            for position in range(len(lectures['groups']))
+        ]
+        ids = {posting: i for i, posting in enumerate(postings)}
+        bitsets = {}
+        for key, key_postings in index.postings.items():
+            bitmap = bytearray((len(postings) + 7) // 8)
+            for posting in key_postings:
+                id_ = ids[posting]
+                bitmap[id_ >> 3] |= 1 << (id_ & 7)
+            bitsets[key] = int.from_bytes(bitmap, 'little')
+        return cls(postings, bitsets)
+
+
+    @property
+    def all(self) -> int:
+        return (1 << len(self.postings)) - 1
+
+
+    def decode(self, bits: int) -> list[Posting]:
+        """Returns the postings of the bits set, in timetable order."""
+        postings = []
+        for i, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+            while byte:
+                lowest = byte & -byte
+                postings.append(self.postings[i * 8 + lowest.bit_length() - 1])
+                byte ^= lowest
+        return postings
+
+
+@define
+class SlotIndex:
+    """This class maps a (timetable key, name) pair to the set of postings where it appears.
+    It is built once for a converted timetable, so filtering does not have to scan every lecture."""
+    timetable: dict = field(factory=dict)
+    catalog: Catalog = field(factory=Catalog)
+    postings: dict[tuple[str, str], set[Posting]] = field(factory=dict)
+    _bitsets: PostingBitsets | None = field(init=False, default=None, eq=False, repr=False)
+
+
+    def __attrs_post_init__(self) -> None:
+        if not self.postings:
+            self.build()
+
+
+    @staticmethod
+    def get_names(objects, timetable_key: str) -> list[str]:
+        """Returns the names a lecture is indexed by. Subjects are filtered by their timetable name."""
+        if timetable_key == 'subjects':
+            return [subject.timetable_name for subject in objects]
+        return objects.names
+
+
+    @traced('SlotIndex.build')
+    def build(self) -> None:
+        self.postings.clear()
+        for weekday, intervals in self.timetable.items():
+            for interval, lectures in intervals.items():
+                self.add_cell(weekday, interval, lectures)
+
+
+    def add_cell(self, weekday: str, interval: str, lectures: dict) -> None:
+        for timetable_key in TIMETABLE_KEYS:
+            for position, objects in enumerate(lectures[timetable_key]):
+                for name in self.get_names(objects, timetable_key):
+                    self.postings.setdefault((timetable_key, name), set()).add((weekday, interval, position))
+
+
+    @traced('SlotIndex.updated')
+    def updated(self, timetable: dict, catalog: Catalog, cells: Iterable[tuple[str, str]]) -> SlotIndex:
+        """Returns the index of a new version of the timetable in which only the given cells changed.
+        This index is not modified, the postings which did not change are shared with the new one."""
+        postings = dict(self.postings)
+        copied = set()
+
+        def get_postings(key: tuple[str, str]) -> set[Posting]:
+            if key not in copied:
+                postings[key] = set(postings.get(key, ()))
+                copied.add(key)
+            return postings[key]
+
+        for weekday, interval in cells:
+            for lectures, add in ((self.timetable[weekday][interval], False), (timetable[weekday][interval], True)):
+                for timetable_key in TIMETABLE_KEYS:
+                    for position, objects in enumerate(lectures[timetable_key]):
+                        for name in self.get_names(objects, timetable_key):
+                            if add:
+                                get_postings((timetable_key, name)).add((weekday, interval, position))
+                            else:
+                                get_postings((timetable_key, name)).discard((weekday, interval, position))
+        for key in copied:
+            if not postings[key]:
+                del postings[key]
+        return SlotIndex(timetable=timetable, catalog=catalog, postings=postings)
+
+
+    @property
+    def bitsets(self) -> PostingBitsets:
+        """The bitsets are created on the first filter, unless they were created beforehand on a worker thread
+        (see load_timetable). Two threads might both create them, which is harmless."""
+        if self._bitsets is None:
+            self._bitsets = PostingBitsets.from_index(self)
+        return self._bitsets
+
+
+    def expand(self, timetable_key: str, name: str) -> Iterable[str]:
+        """Returns the indexed names which match a filter value.
+        A group also matches the lectures of its aggregates (e.g. GM22 matches GM2, GM221 and GM222)."""
+        if timetable_key == 'groups':
+            return self.catalog.hierarchy.belonging(name)
+        return [name]
+
+
+    def get(self, timetable_key: str, names: Iterable[str]) -> set[Posting]:
+        """Returns the postings matching any of the names."""
+        postings = set()
+        for name in names:
+            for expanded in self.expand(timetable_key, name):
+                postings |= self.postings.get((timetable_key, expanded), set())
+        return postings
+
+
+    def get_bits(self, timetable_key: str, names: Iterable[str]) -> int:
+        """Returns the bitset of the postings matching any of the names."""
+        bitsets = self.bitsets.bitsets
+        bits = 0
+        for name in names:
+            for expanded in self.expand(timetable_key, name):
+                bits |= bitsets.get((timetable_key, expanded), 0)
+        return bits
+
+
+    def query(self, criteria: dict[str, list[str] | None]) -> list[Posting] | None:
+        """Returns the postings matching the criteria (OR within a timetable key, AND across timetable keys),
+        in timetable order. Returns None if there is no criteria, meaning that every lecture matches."""
+        if not any(criteria.values()):
+            return None
+        bits = self.bitsets.all
+        for timetable_key, names in criteria.items():
+            if names:
+                bits &= self.get_bits(timetable_key, names)
+                if not bits:
+                    break
+        return self.bitsets.decode(bits)
+
+
+    def select(self, expression) -> list[Posting] | None:
+        """Returns the postings matching a filter expression (see expressions.py), in timetable order.
+        Returns None if the expression is empty, meaning that every lecture matches."""
+        if expression is None:
+            return None
+        return self.bitsets.decode(expression.compile(self).evaluate())
+
+
+    def materialize(self, postings: Iterable[Posting]) -> dict:
+        """Returns a timetable with the same structure as the indexed one, containing only the given postings."""
+        cells: dict[tuple[str, str], list[int]] = {}
+        for weekday, interval, position in postings:
+            cells.setdefault((weekday, interval), []).append(position)
+        filtered = {}
+        for weekday, intervals in self.timetable.items():
+            filtered[weekday] = {}
+            for interval, lectures in intervals.items():
+                positions = sorted(cells.get((weekday, interval), []))
+                filtered[weekday][interval] = {
+                    timetable_key: [objects[i] for i in positions]
+                    for timetable_key, objects in lectures.items()
+                }
+        return filtered
+
+
+    def filter(self, criteria: dict[str, list[str] | None]) -> dict:
+        postings = self.query(criteria)
+        if postings is None:
+            return self.timetable
+        return self.materialize(postings)
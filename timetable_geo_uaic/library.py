@@ -0,0 +1,224 @@
+"""The timetables of several websites, academic years and semesters, kept side by side.
+
+Every timetable has its own json file and snapshot (see HTMLElementsToJson), so downloading another semester
+never overwrites the ones already saved. The timetables used most recently are kept in memory, converted and
+indexed, so switching back to one of them is instant; the others are read again from their snapshot.
+The groups, professors, rooms and subjects are shared by all of them (see EntityPool)."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+from attrs import define, field
+
+from .assets import TIMETABLE, TIMETABLE_SNAPSHOT, TIMETABLES
+from .diff import ChangeSet
+from .index import SlotIndex
+from .objects import Catalog
+from .occupancy import RoomOccupancy
+from .query import FilterSpec, MatchedLecture, QueryEngine
+from .request import BASE_URL, Fetcher, get_fetcher
+from .store import ColumnarTimetable, ColumnarToObjects
+from .tracing import count
+from .utils.utils import HTMLElementsToJson, Table, TimetableNotFound
+
+
+@define(frozen=True, order=True)
+class TimetableKey:
+    """Identifies a timetable: the website it is downloaded from, the academic year (e.g. 2023_2024) and the semester."""
+    years: str = '2023_2024'
+    semester: str = '1'
+    source: str = BASE_URL
+
+
+    @classmethod
+    def from_table(cls, table: Table) -> TimetableKey:
+        # the shared fetcher downloads from the website of the app, even if it was pointed to a mirror
+        if table.fetcher is None or table.fetcher is get_fetcher():
+            source = BASE_URL
+        else:
+            source = table.fetcher.base_url
+        return cls(years=table.years, semester=table.semester, source=source)
+
+
+    @classmethod
+    def from_dict(cls, values: dict) -> TimetableKey:
+        return cls(years=values['years'], semester=values['semester'], source=values.get('source', BASE_URL))
+
+
+    def to_dict(self) -> dict[str, str]:
+        return {'years': self.years, 'semester': self.semester, 'source': self.source}
+
+
+    @property
+    def slug(self) -> str:
+        """The name of the files of the timetable, e.g. 2023_2024_sem1."""
+        slug = f'{self.years}_sem{self.semester}'
+        if self.source != BASE_URL:
+            slug += '_' + hashlib.sha256(self.source.encode()).hexdigest()[:8]
+        return slug
+
+
+    @property
+    def label(self) -> str:
+        """The name shown in the dialog, e.g. 2023-2024, semestrul 1."""
+        label = f'{self.years.replace("_", "-")}, semestrul {self.semester}'
+        if self.source != BASE_URL:
+            label += f' ({self.source})'
+        return label
+
+
+DEFAULT_KEY = TimetableKey()
+
+
+@define
+class LoadedTimetable:
+    """A timetable which was loaded (on any thread) and is ready to replace the current one."""
+    html_elements_to_json: HTMLElementsToJson
+    store: ColumnarTimetable
+    store_to_objects: ColumnarToObjects
+    changes: ChangeSet | None
+    timetable: dict
+    catalog: Catalog
+    index: SlotIndex | None = None
+    occupancy: RoomOccupancy | None = None
+    key: TimetableKey = DEFAULT_KEY
+
+
+@define
+class TimetableLibrary:
+    """Keeps at most capacity loaded timetables in memory, the least recently used one is dropped first
+    (it is still saved on disk). The timetables saved so far are listed in the index file of the directory.
+    The timetable saved by older versions keeps the files it always had, so it is not downloaded again."""
+    directory: str = TIMETABLES
+    capacity: int = 3
+    _loaded: OrderedDict[TimetableKey, LoadedTimetable] = field(init=False, factory=OrderedDict)
+    _saved: dict[str, dict[str, str]] = field(init=False, default=None)
+    _fetchers: dict[str, Fetcher] = field(init=False, factory=dict)
+    _legacy_key: TimetableKey = field(init=False, default=None)
+    _lock: threading.RLock = field(init=False, factory=threading.RLock)
+
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, 'index.json')
+
+
+    @property
+    def saved(self) -> dict[str, dict[str, str]]:
+        """The keys of the timetables saved so far, by their slug."""
+        if self._saved is None:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._saved = json.load(f)
+            except (OSError, ValueError):
+                self._saved = {}
+        return self._saved
+
+
+    def save_index(self) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{self.index_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.saved, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+
+
+    @property
+    def legacy_key(self) -> TimetableKey:
+        """The timetable kept in the files of older versions, known from the semester it was last checked for.
+        It is the default timetable if it was never checked."""
+        if self._legacy_key is None:
+            cache = get_fetcher().cache
+            validation = cache.get_validation(TIMETABLE) if cache is not None else None
+            if validation is None:
+                self._legacy_key = DEFAULT_KEY
+            else:
+                self._legacy_key = TimetableKey(years=validation['years'], semester=validation['semester'])
+        return self._legacy_key
+
+
+    def get_paths(self, key: TimetableKey) -> tuple[str, str]:
+        """Returns the paths of the json file and of the snapshot of a timetable."""
+        if key == self.legacy_key:
+            return TIMETABLE, TIMETABLE_SNAPSHOT
+        path = os.path.join(self.directory, key.slug)
+        return f'{path}.json', f'{path}.snapshot'
+
+
+    def get_table(self, key: TimetableKey) -> Table:
+        """Returns the table to download a timetable from. The fetchers of the other websites are reused too."""
+        if key.source == BASE_URL:
+            fetcher = get_fetcher()
+        else:
+            with self._lock:
+                fetcher = self._fetchers.get(key.source)
+                if fetcher is None:
+                    fetcher = self._fetchers[key.source] = Fetcher(base_url=key.source)
+        return Table(years=key.years.split('_'), semester=key.semester, fetcher=fetcher)
+
+
+    def create_html_elements_to_json(self, key: TimetableKey, **kwargs) -> HTMLElementsToJson:
+        json_file_path, snapshot_file_path = self.get_paths(key)
+        return HTMLElementsToJson(json_file_path=json_file_path, snapshot_file_path=snapshot_file_path, **kwargs)
+
+
+    def keys(self) -> list[TimetableKey]:
+        """Returns the timetables saved on disk, the most recent academic year first."""
+        with self._lock:
+            keys = {TimetableKey.from_dict(values) for values in self.saved.values()}
+        keys.add(self.legacy_key)
+        keys = [key for key in keys if os.path.isfile(self.get_paths(key)[0])]
+        return sorted(keys, key=lambda key: (key.years, key.semester, key.source), reverse=True)
+
+
+    def get(self, key: TimetableKey) -> LoadedTimetable | None:
+        """Returns the timetable if it is still in memory, marking it as the most recently used."""
+        with self._lock:
+            loaded = self._loaded.get(key)
+            if loaded is not None:
+                self._loaded.move_to_end(key)
+            return loaded
+
+
+    def put(self, loaded: LoadedTimetable) -> None:
+        with self._lock:
+            self._loaded[loaded.key] = loaded
+            self._loaded.move_to_end(loaded.key)
+            while len(self._loaded) > self.capacity:
+                self._loaded.popitem(last=False)
+                count('timetables dropped from memory')
+            # the timetable of the older versions is always listed, if its json file exists
+            if loaded.key != self.legacy_key and loaded.store.weekdays and loaded.key.slug not in self.saved:
+                self.saved[loaded.key.slug] = loaded.key.to_dict()
+                self.save_index()
+
+
+    def get_engine(self, key: TimetableKey) -> QueryEngine:
+        """Returns an engine for a saved timetable, reusing the index of the timetable if it is in memory.
+        Raises TimetableNotFound if the timetable was never saved."""
+        loaded = self.get(key)
+        if loaded is not None and loaded.index is not None:
+            return QueryEngine(loaded.timetable, loaded.catalog, loaded.index)
+        return QueryEngine.from_store(self.create_html_elements_to_json(key).read_snapshot(download=False))
+
+
+    def query(
+        self,
+        spec: FilterSpec | dict | str,
+        keys: Iterable[TimetableKey] | None = None,
+    ) -> Iterator[tuple[TimetableKey, list[MatchedLecture]]]:
+        """Answers a filter in every saved timetable (or in the given ones), e.g. the lectures of a professor
+        in every semester. The timetables without any matching lecture are skipped."""
+        for key in self.keys() if keys is None else keys:
+            try:
+                lectures = self.get_engine(key).query(spec)
+            except TimetableNotFound:
+                continue
+            if lectures:
+                yield key, lectures
@@ -0,0 +1,143 @@
+"""Load test of the HTTP API (see server.py), reporting the latency percentiles and the requests per second.
+
+    python -m timetable_geo_uaic.loadtest --connections 50 --requests 20000
+    python -m timetable_geo_uaic.loadtest --url http://127.0.0.1:8000 --revalidate
+
+Without --url, a server is started in the same process on a free port. The requests are spread over
+the catalog and the timetable of every group. With --revalidate, the clients send the ETag they got
+back in If-None-Match, as a browser would.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from urllib.parse import quote, urlsplit
+
+from attrs import define, field
+
+
+@define
+class LoadTestResult:
+    latencies: list[float] = field(factory=list)
+    statuses: dict[int, int] = field(factory=dict)
+    errors: int = 0
+    duration: float = 0
+
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies:
+            return 0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+
+    @property
+    def requests_per_second(self) -> float:
+        return len(self.latencies) / self.duration if self.duration else 0
+
+
+    def report(self) -> str:
+        statuses = ', '.join(f'{status}: {count}' for status, count in sorted(self.statuses.items()))
+        return '\n'.join((
+            f'requests   {len(self.latencies)} in {self.duration:.2f} s ({statuses}), {self.errors} errors',
+            f'rps        {self.requests_per_second:.0f}',
+            f'p50        {self.percentile(50) * 1000:.2f} ms',
+            f'p99        {self.percentile(99) * 1000:.2f} ms',
+            f'max        {max(self.latencies, default=0) * 1000:.2f} ms',
+        ))
+
+
+async def read_response(reader: asyncio.StreamReader) -> tuple[int, dict[str, str], bytes]:
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+
+async def client(host: str, port: int, targets: list[str], queue: asyncio.Queue, result: LoadTestResult, revalidate: bool) -> None:
+    """Sends requests over a single keep-alive connection until the queue is empty."""
+    reader, writer = await asyncio.open_connection(host, port)
+    etags: dict[str, str] = {}
+    try:
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            target = targets[i % len(targets)]
+            request = f'GET {target} HTTP/1.1\r\nHost: {host}\r\n'
+            if revalidate and target in etags:
+                request += f'If-None-Match: {etags[target]}\r\n'
+            start = time.perf_counter()
+            try:
+                writer.write((request + '\r\n').encode('latin-1'))
+                status, headers, _ = await read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                result.errors += 1
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+                continue
+            result.latencies.append(time.perf_counter() - start)
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+            if 'etag' in headers:
+                etags[target] = headers['etag']
+    finally:
+        writer.close()
+
+
+async def get_targets(host: str, port: int) -> list[str]:
+    """Returns the catalog and the timetable of every group shown in the dialog."""
+    import json
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f'GET /catalog HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n'.encode('latin-1'))
+    _, _, body = await read_response(reader)
+    writer.close()
+    catalog = json.loads(body)
+    return ['/catalog'] + [f'/timetable?groups={quote(group)}' for group in catalog['groups']]
+
+
+async def run(host: str, port: int, connections: int, requests: int, revalidate: bool) -> LoadTestResult:
+    targets = await get_targets(host, port)
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    result = LoadTestResult()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, targets, queue, result, revalidate) for _ in range(connections)))
+    result.duration = time.perf_counter() - start
+    return result
+
+
+async def run_with_server(connections: int, requests: int, revalidate: bool) -> LoadTestResult:
+    from .server import TimetableServer
+    server = TimetableServer.from_files()
+    tcp_server = await server.start('127.0.0.1', 0)
+    port = tcp_server.sockets[0].getsockname()[1]
+    async with tcp_server:
+        return await run('127.0.0.1', port, connections, requests, revalidate)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Load test of the timetable HTTP API.')
+    parser.add_argument('--url', default=None, help='the server to test, by default one is started in this process')
+    parser.add_argument('--connections', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=10000)
+    parser.add_argument('--revalidate', action='store_true', help='send If-None-Match with the last ETag')
+    args = parser.parse_args(argv)
+    if args.url is None:
+        result = asyncio.run(run_with_server(args.connections, args.requests, args.revalidate))
+    else:
+        url = urlsplit(args.url)
+        result = asyncio.run(run(url.hostname, url.port or 80, args.connections, args.requests, args.revalidate))
+    print(result.report())
+
+
+if __name__ == '__main__':
+    main()
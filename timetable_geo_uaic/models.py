@@ -1,47 +1,92 @@
 from __future__ import annotations
 
+import threading
+from bisect import bisect
 from collections import OrderedDict
+from functools import partial
+from typing import Iterable
 
 from attrs import define, field
+from PyQt6.QtCore import QThreadPool, QTimer
 from PyQt6.QtWidgets import (
     QHeaderView,
     QComboBox,
+    QListWidgetItem,
+    QMessageBox,
 )
 
+from .startup import timer, FirstPaintWatcher
+from .tracing import count, span, traced
 from .ui.dialog import Main
+from .clashes import ClashReport, find_clashes
+from .diff import ChangeSet
+from .expressions import FilterSyntaxError, combine, from_criteria, parse
+from .index import SlotIndex
+from .library import LoadedTimetable, TimetableKey, TimetableLibrary
+from .occupancy import RoomOccupancy
+from .store import ColumnarTimetable, ColumnarToObjects
+from .views import CatalogViews
 from .objects import (
     Weekdays,
     TimeIntervals,
     Group,
     Groups,
+    Subject,
     Professors,
     Rooms,
     Subjects,
-    ObjectCreator
+    Catalog,
+    ObjectCreator,
+    entities,
 )
 from .utils.pyqt_utils import (
     combobox_add_completer,
-    create_scroll_label,
-    create_tab_widget,
     CheckableComboBox
 )
+from .utils.pyqt_workers import (
+    Cancelled,
+    Job,
+    LatestJobRunner,
+    StagedJob,
+)
+from .utils.table_model import (
+    TimetableTableModel,
+    LectureStackDelegate,
+)
 from .utils.utils import (
     Table,
-    HTMLTableParser,
     HTMLElementsToJson,
-    JsonToObjects,
+    TimetableNotFound,
 )
+from .utils.streaming import StreamingTableParser
 
 
 @define
 class VerticalTimeHorizontalDays:
-    row_count: int = 6
-    column_count: int = 5
     html_elements_to_json: HTMLElementsToJson = field(init=False)
-    json_to_objects: JsonToObjects = field(init=False)
+    # the timetable shown
+    key: TimetableKey | None = field(init=False, default=None)
+    library: TimetableLibrary = field(init=False, factory=TimetableLibrary)
+    store: ColumnarTimetable = field(init=False, default=None)
+    store_to_objects: ColumnarToObjects = field(init=False, default=None)
     creator: ObjectCreator = field(init=False)
+    catalog: Catalog = field(init=False, default=None)
+    index: SlotIndex = field(init=False, default=None)
+    occupancy: RoomOccupancy = field(init=False, factory=RoomOccupancy)
+    views: CatalogViews = field(init=False, factory=CatalogViews)
     timetable: dict = field(factory=dict, init=False)
+    # the timetable shown in the table, after filtering
+    filtered_timetable: dict = field(factory=dict, init=False)
     ui: Main = field(init=False, default=None)
+    table_model: TimetableTableModel = field(init=False, default=None)
+    filter_runner: LatestJobRunner = field(init=False, default=None)
+    # milliseconds without a filter change after which the table is filtered again
+    filter_delay: int = 150
+    # seconds after which the timetable shown at startup is checked against the website in the background,
+    # None to never check it
+    revalidate_max_age: float | None = 24 * 60 * 60
+    download_job: StagedJob | None = field(init=False, default=None)
+    _convert_lock: threading.Lock = field(init=False, factory=threading.Lock)
     comboBox_lectures: dict[str, QComboBox] = field(init=False)
     _weekdays: Weekdays = field(init=False, default=None)
     _time_intervals: TimeIntervals = field(init=False, default=None)
@@ -56,25 +101,49 @@ class VerticalTimeHorizontalDays:
             rooms=self.ui.comboBoxRoom,
             subjects=self.ui.comboBoxSubject
         )
-        # Populate dialog
-        self.load_table(download=False, update_table=False)
-        self.style_tableWidgetMain_row_col_count()
-        self.style_tableWidgetMain_stretch()
-        self.add_weekdays_to_tableWidgetMain()
-        self.add_time_intervals_to_tableWidgetMain()
+        self.table_model = TimetableTableModel(self.ui)
+        self.ui.tableViewMain.setModel(self.table_model)
+        self.ui.tableViewMain.setItemDelegate(LectureStackDelegate(self.ui.tableViewMain))
+        FirstPaintWatcher(self.ui.tableViewMain.viewport(), timer.finish)
+        timer.mark('ui')
+        self.filter_runner = LatestJobRunner(
+            prepare=self.prepare_filter_job,
+            apply=self.apply_filtered_timetable,
+            delay=self.filter_delay,
+            parent=self.ui,
+        )
+        self.filter_runner.failed.connect(self.handle_filter_failed)
+        # Populate dialog from the local timetable, the website is only checked in the background
+        self.load_cached_table()
+        timer.mark('data')
+        self.style_tableViewMain_stretch()
+        self.add_headers_to_tableViewMain()
         self.add_lecture_objects_to_comboBox()
         self.style_comboBox_completer()
-        self.update_tableWidgetMain()
+        self.add_slots_to_comboBoxFree()
+        self.update_tableViewMain()
+        timer.mark('populate')
         # Signals for comboboxes
         self.add_comboBox_signals()
         # Signals for push buttons
-        self.ui.pushButtonDownloadTimetable.pressed.connect(self.load_table)
+        self.hide_download_progress()
+        self.ui.pushButtonDownloadTimetable.pressed.connect(self.download_table)
+        self.ui.pushButtonCancelDownload.pressed.connect(self.cancel_download)
+        self.ui.comboBoxTimetable.activated.connect(self.handle_comboBoxTimetable)
         self.ui.pushButtonResetGroup.pressed.connect(self.reset_comboBoxGroup)
         self.ui.pushButtonResetProfessor.pressed.connect(self.reset_comboBoxProfessor)
         self.ui.pushButtonResetRoom.pressed.connect(self.reset_comboBoxRoom)
         self.ui.pushButtonResetSubject.pressed.connect(self.reset_comboBoxSubject)
         # Signals for check box
         self.ui.checkBoxCheckOverlaps.stateChanged.connect(self.handle_checkBoxCheckOverlaps)
+        self.ui.pushButtonClashReport.pressed.connect(self.show_clash_report)
+        # Signals for line edit
+        self.ui.lineEditExpression.textChanged.connect(self.schedule_update_tableViewMain)
+        # Signals for the free rooms
+        self.ui.comboBoxFreeWeekday.currentIndexChanged.connect(self.update_listWidgetFreeRooms)
+        self.ui.comboBoxFreeInterval.currentIndexChanged.connect(self.update_listWidgetFreeRooms)
+        # once the event loop runs, i.e. after the dialog is shown
+        QTimer.singleShot(0, self.revalidate_table)
 
 
     @property
@@ -93,22 +162,22 @@ class VerticalTimeHorizontalDays:
 
     @property
     def groups(self) -> Groups:
-        return self.creator.get_all_unique(aggregate_object=Groups, timetable_key='groups')
+        return self.catalog.groups
     
 
     @property
     def professors(self) -> Professors:
-        return self.creator.get_all_unique(aggregate_object=Professors, timetable_key='professors')
+        return self.catalog.professors
     
 
     @property
     def rooms(self) -> Rooms:
-        return self.creator.get_all_unique(aggregate_object=Rooms, timetable_key='rooms')
+        return self.catalog.rooms
     
     
     @property
     def subjects(self) -> Subjects:
-        return self.creator.get_all_unique(aggregate_object=Subjects, timetable_key='subjects')
+        return self.catalog.subjects
 
 
     @property
@@ -119,6 +188,13 @@ class VerticalTimeHorizontalDays:
             return Table()
         return Table(years=years.split('-'), semester=semester)
 
+
+    def set_table_parser(self, key: TimetableKey) -> None:
+        """Writes the academic year and the semester of a timetable in the dialog."""
+        self.ui.lineEditYears.setText(key.years.replace('_', '-'))
+        self.ui.lineEditSemester.setText(key.semester)
+
+
     @staticmethod
     def filter_by_iterable_object(timetable: dict, comboBox_lecture: str, timetable_key: str) -> dict:
         filtered = {}
@@ -136,18 +212,246 @@ class VerticalTimeHorizontalDays:
         return filtered
 
 
-    def load_table(self, download=True, update_table=True) -> None:
-        parser = HTMLTableParser(table=self.table_parser)
-        self.html_elements_to_json = HTMLElementsToJson(parser=parser)
+    def load_table(self, download=True, update_table=True) -> ChangeSet | None:
+        """Loads the timetable on the GUI thread. If a timetable was already loaded, only the cells which
+        changed are converted and indexed again. Returns the changes, or None for the first load."""
+        loaded = self.load_timetable(self.table_parser, download=download)
+        self.swap_timetable(loaded, update_table=update_table)
+        return loaded.changes
+
+
+    def load_cached_table(self) -> None:
+        """Loads the timetable saved on disk, without ever downloading it. If there is none,
+        an empty timetable is shown until revalidate_table downloads one."""
+        # the timetable saved by older versions is shown, whichever semester it is
+        self.set_table_parser(self.library.legacy_key)
+        loaded = self.load_timetable(self.table_parser, download=False, missing_ok=True)
+        self.swap_timetable(loaded, update_table=False)
+
+
+    def revalidate_table(self) -> None:
+        """Checks the website in the background for a newer version of the timetable shown,
+        if it was last checked more than revalidate_max_age seconds ago or it is not known when it was checked
+        (e.g. a file saved by an older version). The changes are applied incrementally."""
+        if self.download_job is not None:
+            return
+        if not self.store.weekdays:
+            # nothing was saved yet
+            self.download_table(silent=True)
+            return
+        if self.revalidate_max_age is None:
+            return
+        age = self.html_elements_to_json.get_age()
+        if age is not None and age < self.revalidate_max_age:
+            return
+        table = self.html_elements_to_json.get_source_table()
+        if table is None:
+            # the timetable was never checked, it is downloaded again from where its key says
+            table = self.library.get_table(self.key)
+        self.download_table(table=table, silent=True)
+
+
+    @traced('load_timetable')
+    def load_timetable(self, table: Table, download=True, job: StagedJob | None = None, missing_ok=False) -> LoadedTimetable:
+        """Downloads (optionally), parses, converts and indexes a timetable without touching the UI,
+        so that it can run on a worker thread. The current timetable is only replaced by swap_timetable.
+        If missing_ok is True and there is no local timetable, an empty one is loaded instead of downloading it."""
+        report = job.report if job is not None else lambda stage, text: None
+        key = TimetableKey.from_table(table)
+        parser = StreamingTableParser(table=table)
+        html_elements_to_json = self.library.create_html_elements_to_json(key, parser=parser)
         if download:
-            self.html_elements_to_json.save_json()
-        json = self.html_elements_to_json.read_json()
-        self.timetable = JsonToObjects(json).convert_timetable()
+            report(0, 'Descărcare')
+            table.result  # the page is downloaded here
+            report(1, 'Procesare')
+            # the job can no longer be cancelled once the files are written
+            html_elements_to_json.save_json(commit=job.commit if job is not None else None)
+        try:
+            store = html_elements_to_json.read_snapshot(download=not missing_ok)
+        except TimetableNotFound:
+            store = ColumnarTimetable()
+        # only one timetable at a time is converted, since the converter of a timetable keeps its previous version
+        with self._convert_lock:
+            if job is not None:
+                job.commit()
+            report(2, 'Conversie')
+            # the last version of the same timetable, which might not be shown yet
+            previous = self.library.get(key)
+            if previous is None:
+                store_to_objects = ColumnarToObjects(store)
+                store_to_objects.convert_timetable()
+                changes = None
+            else:
+                store_to_objects = previous.store_to_objects
+                changes = store_to_objects.update(store)
+            loaded = LoadedTimetable(
+                html_elements_to_json=html_elements_to_json,
+                store=store,
+                store_to_objects=store_to_objects,
+                changes=changes,
+                timetable=store_to_objects.timetable,
+                catalog=store_to_objects.catalog,
+                key=key,
+            )
+            if changes is not None and changes.empty:
+                loaded.index, loaded.occupancy = previous.index, previous.occupancy
+            else:
+                report(3, 'Indexare')
+                if changes is None or changes.full:
+                    loaded.index = SlotIndex(loaded.timetable, loaded.catalog)
+                else:
+                    loaded.index = previous.index.updated(loaded.timetable, loaded.catalog, changes.cells)
+                # the bitsets are created here, so the first filter after the swap does not create them on the GUI thread
+                loaded.index.bitsets
+                loaded.occupancy = RoomOccupancy.from_timetable(loaded.timetable)
+            self.library.put(loaded)
+        return loaded
+
+
+    @traced('swap_timetable')
+    def swap_timetable(self, loaded: LoadedTimetable, update_table=True) -> None:
+        """Replaces the current timetable with a loaded one, on the GUI thread.
+        Another timetable (e.g. of another semester) replaces everything, as if its weekdays and intervals changed."""
+        switched = self.key is not None and loaded.key != self.key
+        self.key = loaded.key
+        self.html_elements_to_json = loaded.html_elements_to_json
+        self.store = loaded.store
+        self.store_to_objects = loaded.store_to_objects
+        self.update_comboBoxTimetable()
+        if not switched and loaded.changes is not None and loaded.changes.empty:
+            return
+        self.timetable = loaded.timetable
+        if loaded.catalog is not self.catalog:
+            # the catalog is only created again when names were added or removed
+            self.views.invalidate(loaded.catalog)
+        self.catalog = loaded.catalog
+        self.index = loaded.index
+        self.occupancy = loaded.occupancy
         self.creator = ObjectCreator(self.timetable)
+        self.update_listWidgetFreeRooms()
         if update_table:
-            self.update_tableWidgetMain()
+            self.apply_changes(ChangeSet(full=True) if switched else loaded.changes)
+
+
+    def download_table(self, table: Table | None = None, silent=False) -> None:
+        """Downloads a timetable (by default, the one written in the dialog) on a worker thread, showing the progress.
+        If silent is True, a failed download is not reported, the current timetable is simply kept."""
+        if self.download_job is not None:
+            return
+        if table is None:
+            table = self.table_parser
+        job = StagedJob(lambda job: self.load_timetable(table, download=True, job=job))
+        # a cancelled job might still be running when another one starts, its signals only affect itself
+        job.progress.connect(partial(self.show_download_progress, job=job))
+        job.finished.connect(partial(self.handle_download_finished, job=job, silent=silent))
+        job.failed.connect(partial(self.handle_download_failed, job=job, silent=silent))
+        job.cancelled.connect(partial(self.hide_download_progress, job=job))
+        self.download_job = job
+        self.show_download_progress(0, 'Descărcare')
+        QThreadPool.globalInstance().start(job)
+
+
+    def cancel_download(self) -> None:
+        if self.download_job is not None and self.download_job.cancel():
+            # the job stops by itself at its next stage, its result is never applied
+            self.hide_download_progress()
+
+
+    def show_download_progress(self, stage: int, text: str, job: StagedJob | None = None) -> None:
+        if job is not None and job is not self.download_job:
+            return
+        self.ui.pushButtonDownloadTimetable.setEnabled(False)
+        self.ui.progressBarDownload.setValue(stage)
+        self.ui.progressBarDownload.setFormat(f'{text}...')
+        self.ui.progressBarDownload.setVisible(True)
+        # the conversion cannot be cancelled, it changes the converter of the current timetable
+        self.ui.pushButtonCancelDownload.setEnabled(stage < 2)
+        self.ui.pushButtonCancelDownload.setVisible(True)
+
+
+    def hide_download_progress(self, job: StagedJob | None = None) -> None:
+        """Hides the progress of the current download. The signals of a job which is no longer the current one are ignored."""
+        if job is not None and job is not self.download_job:
+            return
+        self.download_job = None
+        self.ui.pushButtonDownloadTimetable.setEnabled(True)
+        self.ui.progressBarDownload.setVisible(False)
+        self.ui.pushButtonCancelDownload.setVisible(False)
+
+
+    def handle_download_finished(self, loaded: LoadedTimetable, job: StagedJob | None = None, silent=False) -> None:
+        if job is not None and job is not self.download_job:
+            # a job which could not be cancelled any more, its timetable is only kept in the library
+            return
+        self.hide_download_progress()
+        if silent and loaded.key != self.key:
+            # checked in the background while another timetable was chosen, it is only kept in the library
+            self.update_comboBoxTimetable()
+            return
+        self.swap_timetable(loaded)
+
+
+    def update_comboBoxTimetable(self) -> None:
+        """Lists the saved timetables, selecting the one shown."""
+        comboBox = self.ui.comboBoxTimetable
+        keys = self.library.keys()
+        if self.key is not None and self.key not in keys:
+            # e.g. the empty timetable shown before the first download
+            keys.append(self.key)
+        comboBox.clear()
+        for key in keys:
+            comboBox.addItem(key.label, key)
+        comboBox.setCurrentIndex(keys.index(self.key) if self.key in keys else -1)
+
+
+    def handle_comboBoxTimetable(self, index: int) -> None:
+        self.switch_timetable(self.ui.comboBoxTimetable.itemData(index))
+
+
+    def switch_timetable(self, key: TimetableKey) -> None:
+        """Shows another saved timetable. The ones used recently are still in memory, so the switch is instant,
+        the others are read from their snapshot. A timetable which is not saved is downloaded."""
+        if key == self.key or self.download_job is not None:
+            self.update_comboBoxTimetable()
+            return
+        # the download button downloads the timetable shown
+        self.set_table_parser(key)
+        loaded = self.library.get(key)
+        if loaded is None and key not in self.library.keys():
+            self.download_table(table=self.library.get_table(key))
+            return
+        if loaded is None:
+            loaded = self.load_timetable(self.library.get_table(key), download=False)
+        self.swap_timetable(loaded)
+
+
+    def handle_download_failed(self, error: Exception, job: StagedJob | None = None, silent=False) -> None:
+        if job is not None and job is not self.download_job:
+            return
+        self.hide_download_progress()
+        if silent:
+            return
+        QMessageBox.warning(self.ui, 'Eroare', f'Tabelul nu a putut fi descărcat:\n{error}')
+
+
+    def handle_filter_failed(self, error: Exception) -> None:
+        QMessageBox.warning(self.ui, 'Eroare', f'Tabelul nu a putut fi filtrat:\n{error}')
+
+
+    def apply_changes(self, changes: ChangeSet | None) -> None:
+        """Refreshes only the cells and the combobox entries affected by the changes.
+        Everything is refreshed if there are no changes to go by (e.g. the intervals changed)."""
+        if changes is None or changes.full:
+            if changes is not None:
+                self._weekdays = self._time_intervals = None
+                self.add_headers_to_tableViewMain()
+                self.add_slots_to_comboBoxFree()
+            self.update_tableViewMain()
             self.add_lecture_objects_to_comboBox()
             self.style_comboBox_completer()
+            return
+        self.update_tableViewMain_cells(cells=changes.cells)
+        self.update_comboBox_items(changes)
         
 
     def convert_combobox_to(self, object_: QComboBox | CheckableComboBox):
@@ -156,27 +460,48 @@ class VerticalTimeHorizontalDays:
             self.comboBox_lectures[lecture_element] = object_()
             layout.replaceWidget(comboBox, self.comboBox_lectures[lecture_element])
             comboBox.close()
+        count('widgets created', len(self.comboBox_lectures))
 
 
     def add_groups_to_comboBoxGroup(self) -> None:
         # only add non-aggretate type group to combobox
-        items = [group.name for group in self.groups if not group.aggregate]
-        self.comboBox_lectures['groups'].addItems(items)
+        self.comboBox_lectures['groups'].addItems(self.views.combobox_items('groups'))
         
 
     def add_professors_to_comboBoxProfessor(self) -> None:
-        items = [professor.name for professor in self.professors]
-        self.comboBox_lectures['professors'].addItems(items)
+        self.comboBox_lectures['professors'].addItems(self.views.combobox_items('professors'))
 
 
     def add_rooms_to_comboBoxRoom(self) -> None:
-        items = [room.name for room in self.rooms]
-        self.comboBox_lectures['rooms'].addItems(items)
+        self.comboBox_lectures['rooms'].addItems(self.views.combobox_items('rooms'))
 
 
     def add_subjects_to_comboBoxSubject(self) -> None:
-        items = sorted(list({subject.timetable_name for subject in self.subjects}))
-        self.comboBox_lectures['subjects'].addItems(items)
+        self.comboBox_lectures['subjects'].addItems(self.views.combobox_items('subjects'))
+
+
+    def update_comboBox_items(self, changes: ChangeSet) -> None:
+        """Removes the names which disappeared from the comboboxes and inserts the new ones in order."""
+        subjects_changed = changes.added.get('subjects') or changes.removed.get('subjects')
+        subject_names = self.views.subject_timetable_name_set() if subjects_changed else frozenset()
+        for timetable_key, comboBox in self.comboBox_lectures.items():
+            added = changes.added.get(timetable_key, set())
+            removed = changes.removed.get(timetable_key, set())
+            if timetable_key == 'groups':
+                added = {name for name in added if not entities.get(Group, name).aggregate}
+            elif timetable_key == 'subjects':
+                # a subject is shown by its timetable name, which might still be used by other subjects
+                added = {entities.get(Subject, name).timetable_name for name in added}
+                removed = {entities.get(Subject, name).timetable_name for name in removed} - subject_names
+            for name in removed:
+                index = comboBox.findText(name)
+                if index != -1:
+                    comboBox.removeItem(index)
+            for name in sorted(added):
+                if comboBox.findText(name) != -1:
+                    continue
+                items = [comboBox.itemText(i) for i in range(comboBox.count())]
+                comboBox.insertItem(bisect(items, name), name)
 
 
     def clear_lecture_objects_from_comboBox(self) -> None:
@@ -184,93 +509,69 @@ class VerticalTimeHorizontalDays:
             comboBox.clear()
 
 
+    @traced('add_lecture_objects_to_comboBox')
     def add_lecture_objects_to_comboBox(self) -> None:
         self.clear_lecture_objects_from_comboBox() # first clear the contents of the comboboxes
         self.add_groups_to_comboBoxGroup()
         self.add_professors_to_comboBoxProfessor()
         self.add_rooms_to_comboBoxRoom()
         self.add_subjects_to_comboBoxSubject()
+        count('combobox items created', sum(comboBox.count() for comboBox in self.comboBox_lectures.values()))
 
 
     def add_comboBox_signals(self):
         for comboBox in self.comboBox_lectures.values():
             if isinstance(comboBox, CheckableComboBox):
-                comboBox.currentTextChanged.connect(self.update_tableWidgetMain)
+                comboBox.currentTextChanged.connect(self.schedule_update_tableViewMain)
             elif isinstance(comboBox, QComboBox):
-                comboBox.activated.connect(self.update_tableWidgetMain)
+                comboBox.activated.connect(self.schedule_update_tableViewMain)
 
 
     def reset_comboBoxGroup(self) -> None:
         if isinstance(self.comboBox_lectures['groups'], CheckableComboBox):
             self.comboBox_lectures['groups'].deselect_items()
         combobox_add_completer(self.comboBox_lectures['groups'])
-        self.update_tableWidgetMain()
+        self.schedule_update_tableViewMain()
 
 
     def reset_comboBoxProfessor(self) -> None:
         if isinstance(self.comboBox_lectures['professors'], CheckableComboBox):
             self.comboBox_lectures['professors'].deselect_items()
         combobox_add_completer(self.comboBox_lectures['professors'])
-        self.update_tableWidgetMain()
+        self.schedule_update_tableViewMain()
 
 
     def reset_comboBoxRoom(self) -> None:
         if isinstance(self.comboBox_lectures['rooms'], CheckableComboBox):
             self.comboBox_lectures['rooms'].deselect_items()
         combobox_add_completer(self.comboBox_lectures['rooms'])
-        self.update_tableWidgetMain()
+        self.schedule_update_tableViewMain()
 
 
     def reset_comboBoxSubject(self) -> None:
         if isinstance(self.comboBox_lectures['subjects'], CheckableComboBox):
             self.comboBox_lectures['subjects'].deselect_items()
         combobox_add_completer(self.comboBox_lectures['subjects'])
-        self.update_tableWidgetMain()
+        self.schedule_update_tableViewMain()
 
 
-    def style_tableWidgetMain_row_col_count(self) -> None:
-        self.ui.tableWidgetMain.setRowCount(self.row_count)
-        self.ui.tableWidgetMain.setColumnCount(self.column_count)
-
-
-    def style_tableWidgetMain_stretch(self) -> None:
-        h_header = self.ui.tableWidgetMain.horizontalHeader()
-        v_header = self.ui.tableWidgetMain.verticalHeader()    
-        for i in range(self.row_count):
-            v_header.setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch)
-        for i in range(self.column_count):
-            h_header.setSectionResizeMode(i, QHeaderView.ResizeMode.Stretch)
+    def style_tableViewMain_stretch(self) -> None:
+        self.ui.tableViewMain.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.ui.tableViewMain.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
 
 
     def style_comboBox_completer(self) -> None:
-        for comboBox in self.comboBox_lectures.values():
-            combobox_add_completer(comboBox)
+        for timetable_key, comboBox in self.comboBox_lectures.items():
+            combobox_add_completer(comboBox, search=partial(self.search_comboBox, timetable_key))
 
 
-    def add_weekdays_to_tableWidgetMain(self) -> None:
-        self.ui.tableWidgetMain.setHorizontalHeaderLabels(self.weekdays)
+    def search_comboBox(self, timetable_key: str, query: str) -> list[str]:
+        """Returns the items of a combobox matching the text typed, whatever the diacritics, the case or the word order."""
+        return self.views.search_index().search(query, timetable_key)
 
 
-    def add_time_intervals_to_tableWidgetMain(self) -> None:
-        self.ui.tableWidgetMain.setVerticalHeaderLabels(self.time_intervals)
-
-
-    def add_scroll_label_to_tableWidgetMain_cells(self, filtered_timetable: dict) -> None:
-        for c, day in enumerate(self.weekdays):
-            for r, interval in enumerate(self.time_intervals):
-                cell_widget_w_tabs = create_tab_widget()
-                self.ui.tableWidgetMain.setCellWidget(r, c, cell_widget_w_tabs)
-                for v in filtered_timetable[day][interval].values():
-                    if not v:
-                        continue
-                    for i, lecture in enumerate(v):
-                        text = ', '.join(lecture.names)
-                        if not isinstance(lecture, Subjects):
-                            text += '\n'
-                        if cell_widget_w_tabs.count() < i+1:
-                            cell_widget_w_tabs.addTab(create_scroll_label(), str(i))
-                        label = cell_widget_w_tabs.widget(i)
-                        label.setText(label.text() + text)
+    def add_headers_to_tableViewMain(self) -> None:
+        self.table_model.set_headers(weekdays=self.weekdays, intervals=self.time_intervals)
 
 
     def get_comboBox_lectures_current_data(self) -> list[str] | None:
@@ -282,13 +583,105 @@ class VerticalTimeHorizontalDays:
                 yield [text] if text else None
 
 
-    def update_tableWidgetMain(self) -> None:
-        filtered_timetable = self.timetable.copy()
-        for lecture_element, timetable_key in zip(self.get_comboBox_lectures_current_data(), self.comboBox_lectures):
-            if not lecture_element:
-                continue
-            filtered_timetable = self.filter_by_iterable_object(timetable=filtered_timetable, comboBox_lecture=lecture_element, timetable_key=timetable_key)
-        self.add_scroll_label_to_tableWidgetMain_cells(filtered_timetable=filtered_timetable)
+    def update_tableViewMain(self) -> None:
+        self.update_tableViewMain_cells(cells=None)
+
+
+    def update_tableViewMain_cells(self, cells: Iterable[tuple[str, str]] | None) -> None:
+        """Shows the filtered timetable right away. If cells is given, only those cells are updated."""
+        self.filter_runner.run_now(cells=cells)
+
+
+    def schedule_update_tableViewMain(self) -> None:
+        """Filters the timetable on a worker thread once the selection stops changing."""
+        self.filter_runner.request()
+
+
+    def get_lineEditExpression_expression(self):
+        """Returns the expression written in the dialog. An invalid one is ignored and its error is shown as tooltip."""
+        try:
+            expression = parse(self.ui.lineEditExpression.text())
+        except FilterSyntaxError as e:
+            self.ui.lineEditExpression.setStyleSheet('background-color: rgb(255, 205, 205)')
+            self.ui.lineEditExpression.setToolTip(str(e))
+            return None
+        self.ui.lineEditExpression.setStyleSheet('')
+        self.ui.lineEditExpression.setToolTip('')
+        return expression
+
+
+    def prepare_filter_job(self) -> Job:
+        """Reads the filters on the GUI thread. The job only uses the index it was given,
+        which is never modified (a new one is created when the timetable changes)."""
+        criteria = dict(zip(self.comboBox_lectures, self.get_comboBox_lectures_current_data()))
+        # the comboboxes are an expression too, joined by AND to the one written
+        expression = combine(from_criteria(criteria), self.get_lineEditExpression_expression())
+        index = self.index
+        check_clashes = self.ui.checkBoxCheckOverlaps.isChecked()
+
+        def job(is_cancelled) -> tuple[dict, ClashReport | None]:
+            with span('filter'):
+                postings = index.select(expression)
+                if postings is None:
+                    filtered_timetable = index.timetable
+                else:
+                    if is_cancelled():
+                        raise Cancelled()
+                    filtered_timetable = index.materialize(postings)
+                    count('lectures filtered', len(postings))
+            if not check_clashes:
+                return filtered_timetable, None
+            if is_cancelled():
+                raise Cancelled()
+            with span('find_clashes'):
+                return filtered_timetable, find_clashes(filtered_timetable, index.catalog.hierarchy)
+
+        return job
+
+
+    @traced('apply_filtered_timetable')
+    def apply_filtered_timetable(self, result: tuple[dict, ClashReport | None], cells: set[tuple[str, str]] | None) -> None:
+        filtered_timetable, clash_report = result
+        self.filtered_timetable = filtered_timetable
+        self.table_model.set_timetable(filtered_timetable, cells=cells)
+        clashes = clash_report.cells if clash_report is not None else {}
+        self.table_model.set_clashes({
+            cell: [clash.describe() for clash in cell_clashes] for cell, cell_clashes in clashes.items()
+        })
+
+
+    def show_clash_report(self) -> None:
+        """Shows the clashes of the timetable shown, whether the overlaps are checked or not."""
+        report = find_clashes(self.filtered_timetable, self.catalog.hierarchy)
+        QMessageBox.information(self.ui, 'Raport suprapuneri', report.to_text())
+
+
+    def add_slots_to_comboBoxFree(self) -> None:
+        self.ui.comboBoxFreeWeekday.clear()
+        self.ui.comboBoxFreeInterval.clear()
+        self.ui.comboBoxFreeWeekday.addItems(self.weekdays)
+        # the first item selects the whole day
+        self.ui.comboBoxFreeInterval.addItems(['Toată ziua', *self.time_intervals])
+        self.update_listWidgetFreeRooms()
+
+
+    def update_listWidgetFreeRooms(self) -> None:
+        """Lists the rooms which are free in the chosen slot (or during the whole day), with their other free slots as tooltip."""
+        self.ui.listWidgetFreeRooms.clear()
+        weekday = self.ui.comboBoxFreeWeekday.currentText()
+        if weekday not in self.occupancy.weekdays:
+            return
+        interval = self.ui.comboBoxFreeInterval.currentText()
+        if interval in self.occupancy.intervals:
+            slots = [(weekday, interval)]
+        else:
+            slots = self.occupancy.get_day(weekday)
+        for room in self.occupancy.free_rooms_in(slots):
+            item = QListWidgetItem(room)
+            free_slots = [interval for weekday_, interval in self.occupancy.free_slots(room) if weekday_ == weekday]
+            item.setToolTip(f'{weekday}: {", ".join(free_slots)}')
+            self.ui.listWidgetFreeRooms.addItem(item)
+        count('free room items created', self.ui.listWidgetFreeRooms.count())
 
 
     def handle_checkBoxCheckOverlaps(self) -> None:
@@ -299,3 +692,5 @@ class VerticalTimeHorizontalDays:
         self.add_lecture_objects_to_comboBox()
         self.add_comboBox_signals()
         self.style_comboBox_completer()
+        # the clashes are only highlighted while the overlaps are checked
+        self.update_tableViewMain()
@@ -2,29 +2,51 @@ from __future__ import annotations
 
 import re
 from collections import UserList
+from typing import Iterable
 
-from attrs import define, field
+from attrs import define, field, Factory
 
+from .tracing import traced
 
 
-@define
+_NUMBER = re.compile(r'\d+')
+_NON_DIGITS = re.compile(r'\D+')
+_TIMETABLE_NAME = re.compile(r'^([^\(]+)')
+_CATEGORY = re.compile(r'\(([^)]*)\)')
+
+
+def _find_first(pattern: re.Pattern, string: str) -> str:
+    """Same as pattern.findall(string)[0], without finding the other matches."""
+    match = pattern.search(string)
+    if match is None:
+        raise IndexError(f'{pattern.pattern!r} does not match {string!r}')
+    return match.group()
+
+
+@define(frozen=True)
 class Group:
-    """This object describes an University group."""
+    """This object describes an University group. It is immutable, so a single instance
+    of every name can be shared (see EntityPool)."""
     name: str
     year: int = field(init=False)
     programme: str = field(init=False)
     aggregate: bool = field(init=False)
+    _code: str = field(init=False, eq=False, repr=False)
 
 
     def __attrs_post_init__(self) -> None:
-        self.name = self.name.strip()
-        self.year = self._get_group_year()
-        self.programme = self._get_group_programme()
-        self.aggregate = self._is_group_aggregate()
+        # the class is frozen, so the parsed values are set through object.__setattr__
+        name = self.name.strip()
+        code = _find_first(_NUMBER, name)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, '_code', code)
+        object.__setattr__(self, 'year', code[0])
+        object.__setattr__(self, 'programme', _find_first(_NON_DIGITS, name))
+        object.__setattr__(self, 'aggregate', len(code) in (1, 3))
 
 
-    def _get_group_numerical_code(self) -> int:
-        return re.findall(r'\d+', self.name)[0]
+    def _get_group_numerical_code(self) -> str:
+        return self._code
 
 
     def _get_group_length(self) -> int:
@@ -34,16 +56,16 @@ class Group:
 
     def _get_group_year(self) -> int:
         """Returns the year of a group."""
-        return re.findall(r'\d', self.name)[0]
+        return self.year
     
 
     def _get_group_programme(self) -> int:
         """Returns the programme of a group (e.g. GR or GM)."""
-        return re.findall(r'\D+', self.name)[0]
+        return self.programme
     
 
     def _is_group_aggregate(self) -> bool:
-        return self._get_group_length() == 1 or self._get_group_length() == 3
+        return self.aggregate
     
 
 @define(frozen=True)
@@ -51,6 +73,7 @@ class Groups(UserList):
     """This class describes a collection of Group objects. There cannot be duplicate Group objects."""
     data: list[Group] = field(factory=list)
     sort_values: bool = True
+    hierarchy: GroupHierarchy | None = field(default=None, eq=False, repr=False)
     _names: list[str] = field(init=False)
     
 
@@ -60,8 +83,10 @@ class Groups(UserList):
 
 
     def __contains__(self, group: Group | str) -> bool:
+        if self.hierarchy is not None:
+            return self.hierarchy.belongs_to(group, self.names)
         if isinstance(group, str):
-            group = Group(group)
+            group = entities.lookup(Group, group)
         belonging_groups = self.get_belonging_groups(group=group)
         return any(x in self.names for x in belonging_groups.names)
 
@@ -98,12 +123,114 @@ class Groups(UserList):
 
 
 @define
+class GroupHierarchy:
+    """This class describes the hierarchy of the groups of a timetable (programme -> year -> group -> subgroup).
+    The belonging groups of every group are computed once, so that membership checks become set lookups."""
+    groups: Groups = field(factory=Groups)
+    _belonging: dict[str, frozenset[str]] = field(init=False, factory=dict)
+    _children: dict[str, set[str]] = field(init=False, factory=dict)
+
+
+    def __attrs_post_init__(self) -> None:
+        self.build()
+
+
+    def build(self) -> None:
+        # the mappings are replaced at once, so the hierarchy can be read by another thread meanwhile
+        belonging: dict[str, frozenset[str]] = {}
+        children: dict[str, set[str]] = {}
+        aggregates: dict[tuple[str, str], list[Group]] = {}
+        for group in self.groups:
+            if group.aggregate:
+                aggregates.setdefault((group.programme, group.year), []).append(group)
+        for group in self.groups:
+            belonging[group.name] = self._get_belonging_names(group, aggregates)
+            parent = self.parent(group)
+            if parent is not None:
+                children.setdefault(parent, set()).add(group.name)
+        self._belonging, self._children = belonging, children
+
+
+    def update(self, groups: Groups) -> None:
+        self.groups = groups
+        self.build()
+
+
+    @staticmethod
+    def _get_belonging_names(group: Group, aggregates: dict[tuple[str, str], list[Group]]) -> frozenset[str]:
+        """Same rule as Groups.get_belonging_groups, applied to the aggregates of the group's programme and year."""
+        names = {group.name}
+        for aggregate in aggregates.get((group.programme, group.year), []):
+            if aggregate._get_group_length() == 3 and not group.name in aggregate.name:
+                continue
+            names.add(aggregate.name)
+        return frozenset(names)
+
+
+    @staticmethod
+    def parent(group: Group | str) -> str | None:
+        """Returns the name of the group one level above (e.g. GM22 for GM221, GM2 for GM22)."""
+        if isinstance(group, str):
+            group = entities.lookup(Group, group)
+        code = group._get_group_numerical_code()
+        if len(code) not in (2, 3):
+            return None
+        return group.programme + code[:-1]
+
+
+    def belonging(self, group: Group | str) -> frozenset[str]:
+        """Returns the names of the group and of its belonging aggregates (e.g. GM22, GM2, GM221, GM222 for GM22)."""
+        name = group if isinstance(group, str) else group.name
+        belonging = self._belonging.get(name)
+        if belonging is None:
+            # a group which is not part of the timetable, e.g. one typed by the user or sent to the server.
+            # It is not cached, so that arbitrary names do not accumulate
+            try:
+                if isinstance(group, str):
+                    group = entities.lookup(Group, group)
+                belonging = frozenset(self.groups.get_belonging_groups(group).names)
+            except IndexError:
+                # not a group name (e.g. a half typed one without digits), it only matches itself
+                belonging = frozenset((name, ))
+        return belonging
+
+
+    def belongs_to(self, group: Group | str, names: Iterable[str]) -> bool:
+        """Checks if the group, or any of its belonging aggregates, is part of the names."""
+        return not self.belonging(group).isdisjoint(names)
+
+
+    def ancestors(self, group: Group | str) -> list[str]:
+        ancestors = []
+        parent = self.parent(group)
+        while parent is not None:
+            ancestors.append(parent)
+            parent = self.parent(parent)
+        return ancestors
+
+
+    def children(self, group: Group | str) -> set[str]:
+        name = group if isinstance(group, str) else group.name
+        return self._children.get(name, set())
+
+
+    def descendants(self, group: Group | str) -> set[str]:
+        descendants = set()
+        stack = list(self.children(group))
+        while stack:
+            name = stack.pop()
+            descendants.add(name)
+            stack.extend(self.children(name))
+        return descendants
+
+
+@define(frozen=True)
 class Professor:
     name: str
 
 
     def __attrs_post_init__(self) -> None:
-        self.name = self.name.strip()
+        object.__setattr__(self, 'name', self.name.strip())
 
 
 @define(frozen=True)
@@ -138,14 +265,14 @@ class Professors(UserList):
         self.sort()
 
 
-@define
+@define(frozen=True)
 class Room:
     """This object describes a Room where lectures/seminars take place."""
     name: str
 
 
     def __attrs_post_init__(self) -> None:
-        self.name = self.name.strip()
+        object.__setattr__(self, 'name', self.name.strip())
 
 
 @define(frozen=True)
@@ -180,12 +307,12 @@ class Rooms(UserList):
         self.sort()
 
 
-@define
+@define(frozen=True)
 class Subject:
     """This object describes an University subject."""
     name: str
     timetable_name: str = field(init=False)
-    categories: list[str] = field(init=False, factory=list)
+    categories: tuple[str, ...] = field(init=False, default=())
 
     def __attrs_post_init__(self):
         self._set_timetable_name_from_name()
@@ -195,17 +322,16 @@ class Subject:
     @staticmethod
     def _split_braces(string: str) -> str:
         """Splits the values of the 'categories' by the braces (e.g. an input of (F) will return F)."""
-        return re.split('( )', string)[0]
+        return string.split(' ', 1)[0]
 
 
     def _set_categories(self):
-        categories = re.findall(r'\(([^)]*)\)', self.timetable_name)
-        for match in categories:
-            self.categories.append(self._split_braces(match))
+        categories = _CATEGORY.findall(self.timetable_name)
+        object.__setattr__(self, 'categories', tuple(self._split_braces(match) for match in categories))
 
 
     def _set_timetable_name_from_name(self):
-        self.timetable_name = re.match(r'^([^\(]+)', self.name).group(1).strip()
+        object.__setattr__(self, 'timetable_name', _TIMETABLE_NAME.match(self.name).group(1).strip())
 
 
 
@@ -214,7 +340,7 @@ class Subjects(UserList):
     data: list[Subject] = field(factory=list)
     sort_values: bool = True
     _names: list[str] = field(init=False)
-    _timetable_names: list[str] = field(init=False)
+    _timetable_names: frozenset[str] | None = field(init=False, default=None, eq=False, repr=False)
 
 
     def __attrs_post_init__(self) -> None:
@@ -224,8 +350,16 @@ class Subjects(UserList):
 
     def __contains__(self, subject: Subject | str) -> bool:
         if isinstance(subject, str):
-            return subject in self.timetable_names
-        return subject.timetable_name in self.timetable_names
+            return subject in self.timetable_name_set
+        return subject.timetable_name in self.timetable_name_set
+
+
+    @property
+    def timetable_name_set(self) -> frozenset[str]:
+        # the class is frozen, so the cache is set through object.__setattr__; append clears it
+        if self._timetable_names is None:
+            object.__setattr__(self, '_timetable_names', frozenset(subject.timetable_name for subject in self.data))
+        return self._timetable_names
 
 
     @property
@@ -235,7 +369,7 @@ class Subjects(UserList):
 
     @property
     def timetable_names(self) -> list[str]:
-        return sorted(list(set(subject.timetable_name for subject in self.data)))
+        return sorted(self.timetable_name_set)
 
 
     def sort(self) -> None:
@@ -244,9 +378,48 @@ class Subjects(UserList):
 
     def append(self, subject: Subject) -> None:
         super().append(subject)
+        object.__setattr__(self, '_timetable_names', None)
         self.sort()
 
 
+@define
+class EntityPool:
+    """Flyweight factory of the groups, professors, rooms and subjects. Every name is parsed only once,
+    the same immutable instance is then shared by every cell (and every timetable) it appears in."""
+    _entities: dict[tuple[type, str], Group | Professor | Room | Subject] = field(init=False, factory=dict)
+
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+
+    def get(self, class_: type, name: str):
+        key = (class_, name)
+        entity = self._entities.get(key)
+        if entity is None:
+            # setdefault keeps a single instance if two threads create the same entity
+            entity = self._entities.setdefault(key, class_(name))
+        return entity
+
+
+    def get_many(self, class_: type, names: Iterable[str]) -> list:
+        return [self.get(class_, name) for name in names]
+
+
+    def lookup(self, class_: type, name: str):
+        """Returns the shared instance of a name, if it was found in a timetable. Any other name (e.g. typed by
+        the user) gets a new instance which is not kept, so the pool only grows with the converted timetables."""
+        entity = self._entities.get((class_, name))
+        return entity if entity is not None else class_(name)
+
+
+    def clear(self) -> None:
+        self._entities.clear()
+
+
+entities = EntityPool()
+
+
 # To refactor the code at some point to include this object
 @define
 class Lecture:
@@ -302,7 +475,7 @@ class ObjectCreator:
     
 
     def get_time_intervals(self) -> TimeIntervals:
-        time_intervals = self.timetable['LUNI']
+        time_intervals = self.timetable.get('LUNI', {})
         return TimeIntervals([TimeInterval(time_interval) for time_interval in time_intervals])
     
 
@@ -310,12 +483,27 @@ class ObjectCreator:
         return Weekdays([Weekday(weekday) for weekday in self.timetable])
     
 
+    @traced('ObjectCreator.get_all_unique')
     def get_all_unique(self, aggregate_object: type, timetable_key: str) -> type:
-        unique = aggregate_object()
+        unique = {}
         for time_intervals in self.timetable.values():
             for v in time_intervals.values():
                 for objects in v[timetable_key]:
                     for object_ in objects:
-                        if object_.name not in unique.names:
-                            unique.append(object_)
-        return unique
+                        unique.setdefault(object_.name, object_)
+        return aggregate_object(list(unique.values()))
+
+
+@define
+class Catalog:
+    """This class describes the unique objects of a timetable, one sorted collection for each timetable key.
+    It is built by JsonToObjects while converting the timetable, so it does not have to be searched again."""
+    groups: Groups = field(factory=Groups)
+    professors: Professors = field(factory=Professors)
+    rooms: Rooms = field(factory=Rooms)
+    subjects: Subjects = field(factory=Subjects)
+    hierarchy: GroupHierarchy = field(default=Factory(lambda self: GroupHierarchy(self.groups), takes_self=True))
+
+
+    def __getitem__(self, timetable_key: str) -> Groups | Professors | Rooms | Subjects:
+        return getattr(self, timetable_key)
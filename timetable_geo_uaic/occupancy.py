@@ -0,0 +1,116 @@
+"""Room occupancy as bitmasks, to find the free rooms without scanning the timetable."""
+from __future__ import annotations
+
+from typing import Iterable
+
+from attrs import define, field
+
+from .tracing import traced
+
+
+# (weekday, interval)
+Slot = tuple[str, str]
+
+
+def _bits(mask: int) -> Iterable[int]:
+    """Returns the positions of the bits set in a mask, lowest first."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
+@define
+class RoomOccupancy:
+    """This class stores the occupancy of every room twice: one mask of slots for every room
+    (bit w * len(intervals) + i is set if the room is used on weekday w, interval i) and one mask of rooms
+    for every slot (bit r is set if room r is used). Every query is then a few integer operations."""
+    weekdays: list[str] = field(factory=list)
+    intervals: list[str] = field(factory=list)
+    rooms: list[str] = field(factory=list)
+    room_masks: list[int] = field(factory=list)
+    slot_masks: list[int] = field(factory=list)
+    _room_ids: dict[str, int] = field(init=False, factory=dict)
+
+
+    def __attrs_post_init__(self) -> None:
+        self._room_ids = {room: i for i, room in enumerate(self.rooms)}
+
+
+    @classmethod
+    @traced('RoomOccupancy.from_timetable')
+    def from_timetable(cls, timetable: dict) -> RoomOccupancy:
+        """Builds the masks from a converted timetable, in a single pass."""
+        weekdays = list(timetable)
+        intervals = list(next(iter(timetable.values()), {}))
+        rooms = sorted({
+            name
+            for intervals_ in timetable.values() for lectures in intervals_.values()
+            for objects in lectures['rooms'] for name in objects.names if name
+        })
+        room_ids = {room: i for i, room in enumerate(rooms)}
+        room_masks = [0] * len(rooms)
+        slot_masks = [0] * (len(weekdays) * len(intervals))
+        for w, (weekday, intervals_) in enumerate(timetable.items()):
+            for i, lectures in enumerate(intervals_.values()):
+                slot = w * len(intervals) + i
+                for objects in lectures['rooms']:
+                    for name in objects.names:
+                        if name:
+                            room_masks[room_ids[name]] |= 1 << slot
+                            slot_masks[slot] |= 1 << room_ids[name]
+        return cls(weekdays, intervals, rooms, room_masks, slot_masks)
+
+
+    @property
+    def all_rooms(self) -> int:
+        return (1 << len(self.rooms)) - 1
+
+
+    @property
+    def all_slots(self) -> int:
+        return (1 << len(self.slot_masks)) - 1
+
+
+    def get_slot(self, weekday: str, interval: str) -> int:
+        return self.weekdays.index(weekday) * len(self.intervals) + self.intervals.index(interval)
+
+
+    def get_slots(self, slots: Iterable[Slot]) -> int:
+        """Returns the mask of a set of (weekday, interval) slots."""
+        mask = 0
+        for weekday, interval in slots:
+            mask |= 1 << self.get_slot(weekday, interval)
+        return mask
+
+
+    def get_day(self, weekday: str) -> list[Slot]:
+        return [(weekday, interval) for interval in self.intervals]
+
+
+    def free_rooms(self, weekday: str, interval: str) -> list[str]:
+        """Returns the rooms which are not used in a slot."""
+        return self.free_rooms_in([(weekday, interval)])
+
+
+    def free_rooms_in(self, slots: Iterable[Slot]) -> list[str]:
+        """Returns the rooms which are free during every slot."""
+        used = 0
+        for weekday, interval in slots:
+            used |= self.slot_masks[self.get_slot(weekday, interval)]
+        return [self.rooms[r] for r in _bits(self.all_rooms & ~used)]
+
+
+    def free_slots(self, room: str) -> list[Slot]:
+        """Returns the slots in which a room is not used. An unknown room is free all the time."""
+        room_id = self._room_ids.get(room)
+        used = self.room_masks[room_id] if room_id is not None else 0
+        return [
+            (self.weekdays[slot // len(self.intervals)], self.intervals[slot % len(self.intervals)])
+            for slot in _bits(self.all_slots & ~used)
+        ]
+
+
+    def is_free(self, room: str, weekday: str, interval: str) -> bool:
+        room_id = self._room_ids.get(room)
+        return room_id is None or not self.room_masks[room_id] >> self.get_slot(weekday, interval) & 1
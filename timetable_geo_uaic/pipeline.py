@@ -0,0 +1,95 @@
+"""Concurrent download and parsing of several timetables (academic years and semesters)."""
+from __future__ import annotations
+
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+    FIRST_COMPLETED,
+)
+from typing import Iterable
+
+from attrs import define, field
+
+from .request import Fetcher, get_fetcher
+from .utils.utils import (
+    Table,
+    HTMLElementsToJson,
+)
+from .utils.streaming import StreamingTableParser
+
+
+# (academic years, semester), e.g. ('2023_2024', '1')
+TimetableKey = tuple[str, str]
+
+
+@define
+class PipelineResult:
+    """Describes the outcome of the download and parsing of one timetable."""
+    key: TimetableKey
+    timetable: dict | None = None
+    error: Exception | None = field(default=None, eq=False)
+
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def normalize_key(key: tuple[str, str]) -> TimetableKey:
+    """Accepts the academic years written as in the UI (e.g. 2023-2024) or as in the URL (e.g. 2023_2024)."""
+    years, semester = key
+    return years.strip().replace('-', '_'), str(semester).strip()
+
+
+def parse_page(content: bytes) -> dict:
+    """Returns the dictionary created by HTMLElementsToJson from a downloaded page.
+    This is a module level function so that it can be run in a worker process."""
+    html_elements_to_json = HTMLElementsToJson(parser=StreamingTableParser(table=Table.from_content(content)))
+    html_elements_to_json.create_json_attribute()
+    return html_elements_to_json.timetable
+
+
+def fetch_timetables(
+    keys: Iterable[tuple[str, str]],
+    fetcher: Fetcher | None = None,
+    max_fetch_workers: int = 4,
+    parse_executor: Executor | None = None,
+) -> dict[TimetableKey, PipelineResult]:
+    """Downloads the timetables concurrently and parses each page in a worker process as soon as it arrives.
+    An error of one timetable does not stop the others, it is returned in its PipelineResult.
+    On Windows, this must be called under an `if __name__ == '__main__'` guard, because of the worker processes."""
+    keys = list(dict.fromkeys(normalize_key(key) for key in keys))
+    if fetcher is None:
+        fetcher = get_fetcher()
+    results = {key: PipelineResult(key) for key in keys}
+    if not keys:
+        return results
+    own_parse_executor = parse_executor is None
+    if own_parse_executor:
+        parse_executor = ProcessPoolExecutor(max_workers=min(len(keys), 4))
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(len(keys), max_fetch_workers))) as fetch_executor:
+            pending: dict[Future, tuple[str, TimetableKey]] = {
+                fetch_executor.submit(fetcher.fetch_table, years=years, semester=semester): ('fetch', (years, semester))
+                for years, semester in keys
+            }
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key = pending.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        results[key].error = e
+                        continue
+                    if stage == 'fetch':
+                        pending[parse_executor.submit(parse_page, value.content)] = ('parse', key)
+                    else:
+                        results[key].timetable = value
+    finally:
+        if own_parse_executor:
+            parse_executor.shutdown()
+    return results
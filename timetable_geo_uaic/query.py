@@ -0,0 +1,174 @@
+"""Filtering of the timetable without Qt, e.g. for scripts and for the command line (see cli.py)."""
+from __future__ import annotations
+
+from typing import Iterable, Iterator
+
+from attrs import define, field
+
+from .expressions import Expression, combine, from_criteria, parse
+from .index import TIMETABLE_KEYS, Posting, SlotIndex
+from .objects import Catalog
+from .store import ColumnarTimetable, ColumnarToObjects
+
+
+def _to_names(value: str | Iterable[str] | None) -> tuple[str, ...]:
+    """Raises TypeError if a name is not a string, e.g. a number in a json filter."""
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value, )
+    if not isinstance(value, Iterable):
+        raise TypeError(f'Expected a name or a list of names, not {value!r}.')
+    names = tuple(value)
+    for name in names:
+        if not isinstance(name, str):
+            raise TypeError(f'Expected a name, not {name!r}.')
+    return names
+
+
+def _to_expression(value: str | Iterable[str] | None) -> str:
+    """Several expressions (e.g. repeated in a query string) are joined by AND."""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if not isinstance(value, Iterable) or not all(isinstance(expression, str) for expression in value):
+        raise TypeError(f'Expected an expression or a list of expressions, not {value!r}.')
+    value = [expression for expression in value if expression.strip()]
+    return value[0] if len(value) == 1 else ' AND '.join(f'({expression})' for expression in value)
+
+
+@define(frozen=True)
+class FilterSpec:
+    """Describes a filter, the same way as the comboboxes of the dialog: a lecture matches if it matches
+    any of the names of every timetable key which has names (OR within a key, AND across keys).
+    Groups also match their aggregates and subjects are given by their timetable name.
+    The lectures can be filtered further by an expression, see expressions.py."""
+    groups: tuple[str, ...] = field(default=(), converter=_to_names)
+    professors: tuple[str, ...] = field(default=(), converter=_to_names)
+    rooms: tuple[str, ...] = field(default=(), converter=_to_names)
+    subjects: tuple[str, ...] = field(default=(), converter=_to_names)
+    expression: str = field(default='', converter=_to_expression)
+
+
+    @classmethod
+    def from_dict(cls, values: dict) -> FilterSpec:
+        """Raises ValueError for unknown keys or an invalid expression."""
+        unknown = set(values) - {*TIMETABLE_KEYS, 'expression'}
+        if unknown:
+            raise ValueError(f'Unknown filter keys: {", ".join(sorted(unknown))}.')
+        spec = cls(**values)
+        spec.parsed
+        return spec
+
+
+    @property
+    def criteria(self) -> dict[str, tuple[str, ...]]:
+        return {timetable_key: getattr(self, timetable_key) for timetable_key in TIMETABLE_KEYS}
+
+
+    @property
+    def parsed(self) -> Expression | None:
+        """The whole filter as a single expression, None if it is empty."""
+        return combine(from_criteria(self.criteria), parse(self.expression))
+
+
+    def to_dict(self) -> dict[str, list[str] | str]:
+        values = {timetable_key: list(names) for timetable_key, names in self.criteria.items() if names}
+        if self.expression:
+            values['expression'] = self.expression
+        return values
+
+
+@define(frozen=True)
+class MatchedLecture:
+    weekday: str
+    interval: str
+    groups: tuple[str, ...]
+    professors: tuple[str, ...]
+    rooms: tuple[str, ...]
+    subjects: tuple[str, ...]
+
+
+    def to_dict(self) -> dict:
+        return {
+            'weekday': self.weekday,
+            'interval': self.interval,
+            'groups': list(self.groups),
+            'professors': list(self.professors),
+            'rooms': list(self.rooms),
+            'subjects': list(self.subjects),
+        }
+
+
+@define
+class QueryEngine:
+    """Answers filters on a converted timetable with the same index as the dialog. It does not need Qt,
+    so it can answer many filters in one process."""
+    timetable: dict
+    catalog: Catalog
+    index: SlotIndex = field(default=None)
+
+
+    def __attrs_post_init__(self) -> None:
+        if self.index is None:
+            self.index = SlotIndex(self.timetable, self.catalog)
+
+
+    @classmethod
+    def from_store(cls, store: ColumnarTimetable) -> QueryEngine:
+        store_to_objects = ColumnarToObjects(store)
+        store_to_objects.convert_timetable()
+        return cls(store_to_objects.timetable, store_to_objects.catalog)
+
+
+    @classmethod
+    def from_files(cls, download: bool = False) -> QueryEngine:
+        """Creates an engine for the timetable saved by the app (the snapshot, or the json file).
+        Raises TimetableNotFound if there is none and download is False."""
+        from .utils.utils import HTMLElementsToJson
+        return cls.from_store(HTMLElementsToJson().read_snapshot(download=download))
+
+
+    def get_lecture(self, posting: Posting) -> MatchedLecture:
+        weekday, interval, position = posting
+        lectures = self.timetable[weekday][interval]
+        return MatchedLecture(
+            weekday,
+            interval,
+            *(tuple(lectures[timetable_key][position].names) for timetable_key in TIMETABLE_KEYS),
+        )
+
+
+    def get_postings(self) -> Iterator[Posting]:
+        for weekday, intervals in self.timetable.items():
+            for interval, lectures in intervals.items():
+                for position in range(len(lectures['groups'])):
+                    yield weekday, interval, position
+
+
+    def query(self, spec: FilterSpec | dict | str) -> list[MatchedLecture]:
+        """Returns the lectures matching a filter or an expression, in timetable order.
+        An empty filter matches every lecture."""
+        if isinstance(spec, dict):
+            spec = FilterSpec.from_dict(spec)
+        elif isinstance(spec, str):
+            spec = FilterSpec(expression=spec)
+        postings = self.index.select(spec.parsed)
+        if postings is None:
+            postings = self.get_postings()
+        return [self.get_lecture(posting) for posting in postings]
+
+
+    def query_many(self, specs: Iterable[FilterSpec | dict | str]) -> Iterator[tuple[FilterSpec, list[MatchedLecture]]]:
+        for spec in specs:
+            if isinstance(spec, dict):
+                spec = FilterSpec.from_dict(spec)
+            elif isinstance(spec, str):
+                spec = FilterSpec(expression=spec)
+            yield spec, self.query(spec)
+
+
+    def get_group_specs(self) -> list[FilterSpec]:
+        """Returns a filter for every group shown in the dialog (the groups which are not aggregates)."""
+        return [FilterSpec(groups=group.name) for group in self.catalog.groups if not group.aggregate]
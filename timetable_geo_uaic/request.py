@@ -1,18 +1,213 @@
 from __future__ import annotations
 
-import requests
-from bs4 import BeautifulSoup, Tag
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
 
+from attrs import define, field
 
-def request_table(years='2023_2024', semester='1') -> Tag:
-    """This function will be used to collect the table from the URL."""
-    url = f'https://geomorphologyonline.com/orar/{years}_sem{semester}/{years}_sem{semester}_activities_days_horizontal.html'
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.12; rv:55.0) Gecko/20100101 Firefox/55.0',
-    }
-    r = requests.get(url, headers=headers, verify=False)
-    c = r.content
-    c = BeautifulSoup(c, features='html.parser')
+from .assets import HTML_CACHE
+from .tracing import traced
+
+if TYPE_CHECKING:
+    # requests and bs4 are slow to import, they are only imported when a page is downloaded or parsed
+    import requests
+    from bs4 import Tag
+
+
+BASE_URL = 'https://geomorphologyonline.com/orar'
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.12; rv:55.0) Gecko/20100101 Firefox/55.0',
+}
+
+
+@define
+class FetchResult:
+    """Describes a downloaded page."""
+    url: str
+    content: bytes
+    digest: str
+    # False if the server answered with 304 Not Modified
+    downloaded: bool = True
+
+
+@define
+class HTMLCache:
+    """An on-disk cache of the raw pages, each one stored under the sha256 of its content.
+    The index keeps the validators (ETag, Last-Modified) and the digest of the last page of every URL.
+    The cache can be shared by several download threads."""
+    directory: str = HTML_CACHE
+    _index: dict[str, dict[str, str]] = field(init=False, default=None)
+    _lock: threading.RLock = field(init=False, factory=threading.RLock)
+
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.directory, 'index.json')
+
+
+    @property
+    def index(self) -> dict[str, dict[str, str]]:
+        if self._index is None:
+            try:
+                with open(self.index_path, 'r') as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+
+    def save_index(self) -> None:
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f'{self.index_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, f'{digest}.html')
+
+
+    def get(self, digest: str) -> bytes | None:
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+
+    def put(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            if not os.path.isfile(self.path(digest)):
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self.path(digest), 'wb') as f:
+                    f.write(content)
+        return digest
+
+
+    def get_entry(self, url: str) -> dict[str, str] | None:
+        return self.index.get(url)
+
+
+    def set_entry(self, url: str, digest: str, etag: str | None, last_modified: str | None) -> None:
+        with self._lock:
+            self.index[url] = {'digest': digest, 'etag': etag, 'last_modified': last_modified}
+            self.save_index()
+
+
+    def get_source(self, path: str) -> str | None:
+        """Returns the digest of the page a file (e.g. timetable.json) was last created from."""
+        return self.index.get('sources', {}).get(os.path.abspath(path))
+
+
+    def set_source(self, path: str, digest: str) -> None:
+        with self._lock:
+            self.index.setdefault('sources', {})[os.path.abspath(path)] = digest
+            self.save_index()
+
+
+    def get_validation(self, path: str) -> dict | None:
+        """Returns when a file was last checked against the website and for which timetable (years and semester)."""
+        return self.index.get('validations', {}).get(os.path.abspath(path))
+
+
+    def set_validation(self, path: str, years: str, semester: str) -> None:
+        with self._lock:
+            self.index.setdefault('validations', {})[os.path.abspath(path)] = {
+                'years': years, 'semester': semester, 'time': time.time()
+            }
+            self.save_index()
+
+
+@define
+class Fetcher:
+    """Downloads the timetable pages with a reusable session (connection pooling) and conditional GETs.
+    When the server answers with 304 Not Modified, the page is read from the cache."""
+    base_url: str = BASE_URL
+    cache: HTMLCache | None = field(factory=HTMLCache)
+    timeout: float = 30
+    verify: bool = False
+    _session: requests.Session | None = None
+
+
+    def __attrs_post_init__(self) -> None:
+        if self._session is not None:
+            self._session.headers.update(HEADERS)
+
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers.update(HEADERS)
+        return self._session
+
+
+    def get_url(self, years='2023_2024', semester='1') -> str:
+        return f'{self.base_url}/{years}_sem{semester}/{years}_sem{semester}_activities_days_horizontal.html'
+
+
+    def _get_conditional_headers(self, entry: dict[str, str] | None) -> dict[str, str]:
+        headers = {}
+        if entry is None or self.cache.get(entry['digest']) is None:
+            return headers
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+
+    def fetch(self, url: str) -> FetchResult:
+        entry = self.cache.get_entry(url) if self.cache is not None else None
+        headers = self._get_conditional_headers(entry) if self.cache is not None else {}
+        r = self.session.get(url, headers=headers, timeout=self.timeout, verify=self.verify)
+        if r.status_code == 304 and headers:
+            return FetchResult(url=url, content=self.cache.get(entry['digest']), digest=entry['digest'], downloaded=False)
+        r.raise_for_status()
+        content = r.content
+        if self.cache is None:
+            return FetchResult(url=url, content=content, digest=hashlib.sha256(content).hexdigest())
+        digest = self.cache.put(content)
+        self.cache.set_entry(url, digest, r.headers.get('ETag'), r.headers.get('Last-Modified'))
+        return FetchResult(url=url, content=content, digest=digest)
+
+
+    @traced('Fetcher.fetch_table')
+    def fetch_table(self, years='2023_2024', semester='1') -> FetchResult:
+        return self.fetch(self.get_url(years=years, semester=semester))
+
+
+_fetcher: Fetcher | None = None
+
+
+def get_fetcher() -> Fetcher:
+    """Returns the fetcher shared by all the downloads, so its connections are reused."""
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = Fetcher()
+    return _fetcher
+
+
+@traced('parse_table')
+def parse_table(content: bytes) -> Tag:
+    from bs4 import BeautifulSoup
+    c = BeautifulSoup(content, features='html.parser')
     # get the last table on the page, which corresponds to all the activities
-    table = c.find_all('table')[2] 
+    table = c.find_all('table')[2]
     return table
+
+
+@traced('request_table')
+def request_table(years='2023_2024', semester='1', fetcher: Fetcher | None = None) -> Tag:
+    """This function will be used to collect the table from the URL."""
+    if fetcher is None:
+        fetcher = get_fetcher()
+    return parse_table(fetcher.fetch_table(years=years, semester=semester).content)
@@ -0,0 +1,123 @@
+"""Search of the names shown in the comboboxes, insensitive to case, diacritics and word order.
+
+Every name is folded (e.g. "Știința Solului" -> " stiinta solului", a space marks the start of every word)
+and its n-grams of 1 to 3 characters are stored as bitsets of the names containing them. The words of a query
+are then found by AND-ing the bitsets of their n-grams, only the candidates left are compared to the query."""
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Iterable, Iterator
+
+from attrs import define, field
+
+
+GRAM_SIZE = 3
+_SEPARATORS = re.compile(r'[\W_]+')
+
+
+def fold(text: str) -> str:
+    """Returns the text without diacritics (both ş and ș become s), in lowercase, with single spaces between words."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(_SEPARATORS.sub(' ', text.casefold()).split())
+
+
+def _get_grams(text: str) -> set[str]:
+    return {text[i:i + n] for n in range(1, GRAM_SIZE + 1) for i in range(len(text) - n + 1)}
+
+
+def _to_bits(ids: Iterable[int], size: int) -> int:
+    bitmap = bytearray((size + 7) // 8)
+    for id_ in ids:
+        bitmap[id_ >> 3] |= 1 << (id_ & 7)
+    return int.from_bytes(bitmap, 'little')
+
+
+def _iter_bits(bits: int) -> Iterator[int]:
+    """Yields the positions of the bits set, lowest first, so the caller can stop early."""
+    for i, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, 'little')):
+        while byte:
+            lowest = byte & -byte
+            yield i * 8 + lowest.bit_length() - 1
+            byte ^= lowest
+
+
+@define
+class SearchIndex:
+    """An n-gram index over the names of every timetable key, shared by the comboboxes.
+    The names keep the order they were given in, which is also the order of the results of equal rank."""
+    entries: list[tuple[str, str]] = field(factory=list)
+    # the folded name of every entry, starting with a space
+    _texts: list[str] = field(init=False, factory=list)
+    _grams: dict[str, int] = field(init=False, factory=dict)
+    _keys: dict[str, int] = field(init=False, factory=dict)
+
+
+    def __attrs_post_init__(self) -> None:
+        grams: dict[str, list[int]] = {}
+        keys: dict[str, list[int]] = {}
+        self._texts = []
+        for id_, (timetable_key, name) in enumerate(self.entries):
+            text = f' {fold(name)}'
+            self._texts.append(text)
+            for gram in _get_grams(text):
+                grams.setdefault(gram, []).append(id_)
+            keys.setdefault(timetable_key, []).append(id_)
+        self._grams = {gram: _to_bits(ids, len(self.entries)) for gram, ids in grams.items()}
+        self._keys = {timetable_key: _to_bits(ids, len(self.entries)) for timetable_key, ids in keys.items()}
+
+
+    @classmethod
+    def from_items(cls, items: dict[str, Iterable[str]]) -> SearchIndex:
+        return cls([(timetable_key, name) for timetable_key, names in items.items() for name in names])
+
+
+    def get_bits(self, word: str) -> int:
+        """Returns the names which might contain the word: every one of its n-grams is in the name."""
+        if len(word) <= GRAM_SIZE:
+            return self._grams.get(word, 0)
+        bits = -1
+        for i in range(len(word) - GRAM_SIZE + 1):
+            bits &= self._grams.get(word[i:i + GRAM_SIZE], 0)
+            if not bits:
+                break
+        return bits
+
+
+    def search(self, query: str, timetable_key: str | None = None, limit: int | None = None) -> list[str]:
+        """Returns the names containing every word of the query, in any order. The names in which the first word
+        starts a word come first (e.g. "geo" finds "Geografie umana" before "Biogeografie")."""
+        words = fold(query).split()
+        if timetable_key is not None:
+            candidates = self._keys.get(timetable_key, 0)
+        else:
+            candidates = (1 << len(self.entries)) - 1
+        for word in words:
+            if not candidates:
+                break
+            candidates &= self.get_bits(word)
+        if not words:
+            first = candidates
+        else:
+            first = candidates & self.get_bits(f' {words[0]}'[:GRAM_SIZE])
+        names = []
+        rest = candidates & ~first
+        for id_ in _iter_bits(first):
+            if words and f' {words[0]}' not in self._texts[id_]:
+                # the n-grams matched, but not at the start of a word
+                rest |= 1 << id_
+            elif self.add_match(names, id_, words) and len(names) == limit:
+                return names
+        for id_ in _iter_bits(rest):
+            if self.add_match(names, id_, words) and len(names) == limit:
+                return names
+        return names
+
+
+    def add_match(self, names: list[str], id_: int, words: list[str]) -> bool:
+        text = self._texts[id_]
+        if all(word in text for word in words):
+            names.append(self.entries[id_][1])
+            return True
+        return False
@@ -0,0 +1,288 @@
+"""Local HTTP API serving the catalog and the filtered timetable as json, built on asyncio only.
+
+    python -m timetable_geo_uaic.server --port 8000 --watch 5
+
+Endpoints (GET):
+
+    /catalog                                    the names shown in the comboboxes of the dialog
+    /timetable?groups=GM22&professors=Minea+I   the lectures matching a filter, see query.FilterSpec
+    /health                                     the generation of the timetable served
+
+A filter can also be written as an expression (see expressions.py), alone or with the other keys:
+/timetable?expression=room:B8+AND+NOT+group:GT3
+
+POST /reload reads the saved timetable again. The responses of a generation are cached in memory and
+carry its ETag, so a client sending If-None-Match gets 304 Not Modified until the timetable changes.
+The new generation is built aside and swapped in at once, so the requests are never dropped meanwhile.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import traceback
+from collections import OrderedDict
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
+
+from attrs import define, field
+
+from . import snapshot
+from .index import TIMETABLE_KEYS
+from .query import FilterSpec, QueryEngine
+from .store import ColumnarTimetable
+from .views import CatalogViews
+
+
+REASONS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+MAX_HEADER_SIZE = 64 * 1024
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+@define
+class Response:
+    status: int
+    body: bytes = b''
+    etag: str | None = None
+
+
+def encode(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+@define
+class Generation:
+    """A version of the served timetable. It is never modified, a reload creates a new one."""
+    engine: QueryEngine
+    digest: str
+    views: CatalogViews = field(init=False)
+    responses: OrderedDict[str, bytes] = field(init=False, factory=OrderedDict)
+    max_responses: int = 4096
+
+
+    def __attrs_post_init__(self) -> None:
+        self.views = CatalogViews(self.engine.catalog)
+
+
+    @classmethod
+    def from_store(cls, store: ColumnarTimetable) -> Generation:
+        return cls(QueryEngine.from_store(store), snapshot.digest(store))
+
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.digest[:32]}"'
+
+
+    def get_catalog(self) -> dict:
+        return {timetable_key: self.views.combobox_items(timetable_key) for timetable_key in TIMETABLE_KEYS}
+
+
+    def get_timetable(self, query: str) -> dict:
+        values = parse_qs(query, keep_blank_values=False)
+        # an invalid filter is an error of the client, e.g. an expression which is nested too deeply
+        try:
+            spec = FilterSpec.from_dict(values)
+            lectures = self.engine.query(spec)
+        except (ValueError, TypeError) as e:
+            raise HTTPError(400, str(e))
+        return {'query': spec.to_dict(), 'lectures': [lecture.to_dict() for lecture in lectures]}
+
+
+    def get_body(self, key: str, create: Callable[[], object]) -> bytes:
+        """Returns a cached response body. The least recently used bodies are dropped past max_responses."""
+        body = self.responses.get(key)
+        if body is None:
+            body = encode(create())
+            self.responses[key] = body
+            if len(self.responses) > self.max_responses:
+                self.responses.popitem(last=False)
+        else:
+            self.responses.move_to_end(key)
+        return body
+
+
+@define
+class TimetableServer:
+    """Serves one generation of the timetable at a time. The generation is read once per request,
+    so a request being answered during a reload is answered with the generation it started with."""
+    load: Callable[[], ColumnarTimetable]
+    generation: Generation | None = None
+    reloads: int = 0
+    # the task of watch, kept since the event loop only holds weak references to its tasks
+    watcher: asyncio.Task | None = field(init=False, default=None)
+    _reload_lock: asyncio.Lock = field(init=False, factory=asyncio.Lock)
+
+
+    @classmethod
+    def from_files(cls) -> TimetableServer:
+        from .utils.utils import HTMLElementsToJson
+        return cls(lambda: HTMLElementsToJson().read_snapshot(download=False))
+
+
+    async def reload(self) -> bool:
+        """Loads the timetable again in a thread. Returns True if it changed."""
+        async with self._reload_lock:
+            store = await asyncio.to_thread(self.load)
+            digest = await asyncio.to_thread(snapshot.digest, store)
+            if self.generation is not None and digest == self.generation.digest:
+                return False
+            generation = await asyncio.to_thread(lambda: Generation(QueryEngine.from_store(store), digest))
+            self.generation = generation
+            self.reloads += 1
+            return True
+
+
+    def respond(self, method: str, target: str, headers: dict[str, str]) -> Response:
+        generation = self.generation
+        url = urlsplit(target)
+        if url.path in ('/catalog', '/timetable', '/health') and method != 'GET':
+            raise HTTPError(405, f'{method} is not allowed on {url.path}.')
+        if url.path == '/health':
+            return Response(200, encode({'generation': generation.digest, 'reloads': self.reloads}))
+        if url.path == '/catalog':
+            create = generation.get_catalog
+        elif url.path == '/timetable':
+            create = lambda: generation.get_timetable(url.query)
+        else:
+            raise HTTPError(404, f'{url.path} does not exist.')
+        if headers.get('if-none-match') == generation.etag:
+            return Response(304, etag=generation.etag)
+        # the query string is part of the key as it was sent, equal filters written differently are cached twice
+        return Response(200, generation.get_body(target, create), etag=generation.etag)
+
+
+    async def handle_reload(self) -> Response:
+        changed = await self.reload()
+        return Response(200, encode({'generation': self.generation.digest, 'changed': changed}))
+
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                keep_alive = True
+                try:
+                    lines = head.decode('latin-1').split('\r\n')
+                    method, target, version = lines[0].split(' ', 2)
+                    headers = {}
+                    for line in lines[1:]:
+                        if line:
+                            name, _, value = line.partition(':')
+                            headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get('content-length', 0))
+                    if length:
+                        await reader.readexactly(length)
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+                    if method == 'POST' and urlsplit(target).path == '/reload':
+                        response = await self.handle_reload()
+                    else:
+                        response = self.respond(method, target, headers)
+                except HTTPError as e:
+                    response = Response(e.status, encode({'error': str(e)}))
+                except ValueError:
+                    response = Response(400, encode({'error': 'Malformed request.'}))
+                    keep_alive = False
+                except Exception:
+                    # the details are only printed for the one running the server, never sent to the client
+                    traceback.print_exc()
+                    response = Response(500, encode({'error': 'Internal server error.'}))
+                writer.write(self.serialize(response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    return
+        finally:
+            writer.close()
+
+
+    @staticmethod
+    def serialize(response: Response, keep_alive: bool) -> bytes:
+        lines = [
+            f'HTTP/1.1 {response.status} {REASONS[response.status]}',
+            f'Content-Length: {len(response.body)}',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        if response.body:
+            lines.append('Content-Type: application/json; charset=utf-8')
+        if response.etag is not None:
+            lines.append(f'ETag: {response.etag}')
+            lines.append('Cache-Control: no-cache')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + response.body
+
+
+    async def watch(self, paths: list[str], interval: float) -> None:
+        """Reloads the timetable when one of the files changes (e.g. after a download by the app)."""
+        def get_stamps():
+            return [os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths]
+
+        stamps = get_stamps()
+        while True:
+            await asyncio.sleep(interval)
+            current = get_stamps()
+            if current != stamps:
+                stamps = current
+                try:
+                    await self.reload()
+                except Exception:
+                    # e.g. a file being written, the next change is tried again
+                    stamps = None
+
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8000) -> asyncio.Server:
+        if self.generation is None:
+            await self.reload()
+        return await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_SIZE)
+
+
+async def serve(host: str, port: int, watch: float | None) -> None:
+    from .assets import TIMETABLE, TIMETABLE_SNAPSHOT
+    server = TimetableServer.from_files()
+    tcp_server = await server.start(host, port)
+    print(f'serving generation {server.generation.digest[:12]} on http://{host}:{port}')
+    if watch:
+        server.watcher = asyncio.create_task(server.watch([TIMETABLE, TIMETABLE_SNAPSHOT], watch))
+    try:
+        async with tcp_server:
+            await tcp_server.serve_forever()
+    finally:
+        if server.watcher is not None:
+            server.watcher.cancel()
+            # an exception raised by the watcher is raised here, instead of being lost
+            with contextlib.suppress(asyncio.CancelledError):
+                await server.watcher
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='Serves the saved timetable as json.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                        help='reload the timetable when its files change, checking every SECONDS')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.watch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Binary snapshot of a converted timetable, used to start the app without parsing the json file.
+
+The snapshot is a little-endian file made of a fixed header and a payload:
+
+    header  magic, version, payload length, source size, source mtime, sha256 of the payload
+    payload counts, the string table (the strings separated by NUL characters),
+            the weekday and interval names (string ids) and the ColumnarTimetable arrays
+
+Each array in the payload starts at a 4 byte boundary, so it can be used directly from a memory map."""
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from .store import (
+    ColumnarTimetable,
+    StringTable,
+)
+
+
+MAGIC = b'TGUS'
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct('<4sHHQQq32s')
+_COUNTS = struct.Struct('<8I')
+_COLUMNS = (
+    ('weekday', 'B'),
+    ('interval', 'B'),
+    ('subject', 'I'),
+    ('room', 'I'),
+    ('group_offsets', 'I'),
+    ('group_ids', 'I'),
+    ('professor_offsets', 'I'),
+    ('professor_ids', 'I'),
+    ('cell_offsets', 'I'),
+)
+
+
+class SnapshotError(Exception):
+    """Raised when a snapshot is missing, corrupted, outdated or of another version."""
+
+
+def _source_stamp(source_path: str | None) -> tuple[int, int] | None:
+    """Returns the size and the modification time of the source json file, if it exists."""
+    if source_path is None or not os.path.isfile(source_path):
+        return None
+    stat = os.stat(source_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _pad(data: bytearray) -> None:
+    data.extend(b'\0' * (-len(data) % 4))
+
+
+def _to_little_endian(values: array) -> bytes:
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def dumps(store: ColumnarTimetable, source_path: str | None = None) -> bytes:
+    """Returns the snapshot of the store. The source path is the json file the store was created from."""
+    # the weekday and interval names are added to the string table before it is encoded
+    names = array('I', [store.strings.intern(name) for name in store.weekdays + store.intervals])
+    strings = '\0'.join(store.strings.strings).encode('utf-8')
+    payload = bytearray(_COUNTS.pack(
+        len(store.strings), len(strings), len(store.weekdays), len(store.intervals),
+        len(store), len(store.group_ids), len(store.professor_ids), 0,
+    ))
+    payload += strings
+    _pad(payload)
+    payload += _to_little_endian(names)
+    for name, _ in _COLUMNS:
+        payload += _to_little_endian(getattr(store, name))
+        _pad(payload)
+    size, mtime = _source_stamp(source_path) or (0, 0)
+    header = _HEADER.pack(MAGIC, SNAPSHOT_VERSION, 0, len(payload), size, mtime, hashlib.sha256(payload).digest())
+    return header + bytes(payload)
+
+
+def digest(store: ColumnarTimetable) -> str:
+    """Returns the sha256 of the content of a store, which does not depend on its source file."""
+    return dumps(store)[_HEADER.size - 32:_HEADER.size].hex()
+
+
+def loads(data: bytes | memoryview, source_path: str | None = None, copy: bool = True) -> ColumnarTimetable:
+    """Creates a store from a snapshot. If copy is False, the arrays of the store are read-only
+    memoryviews over the data (e.g. a memory map), which must be kept open while the store is used."""
+    data = memoryview(data)
+    if len(data) < _HEADER.size:
+        raise SnapshotError('The snapshot is truncated.')
+    magic, version, _, length, size, mtime, checksum = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError('The file is not a timetable snapshot.')
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f'The snapshot version is {version}, expected {SNAPSHOT_VERSION}.')
+    stamp = _source_stamp(source_path)
+    if stamp is not None and (size, mtime) != stamp:
+        raise SnapshotError('The snapshot is older than its json file.')
+    payload = data[_HEADER.size:_HEADER.size + length]
+    if len(payload) != length or hashlib.sha256(payload).digest() != checksum:
+        raise SnapshotError('The snapshot checksum does not match.')
+    n_strings, strings_length, n_weekdays, n_intervals, n_lectures, n_groups, n_professors, _ = _COUNTS.unpack(payload[:_COUNTS.size])
+    lengths = {
+        'weekday': n_lectures,
+        'interval': n_lectures,
+        'subject': n_lectures,
+        'room': n_lectures,
+        'group_offsets': n_lectures + 1,
+        'group_ids': n_groups,
+        'professor_offsets': n_lectures + 1,
+        'professor_ids': n_professors,
+        'cell_offsets': n_weekdays * n_intervals + 1,
+    }
+    offset = _COUNTS.size
+    strings = str(payload[offset:offset + strings_length], 'utf-8').split('\0') if n_strings else []
+    offset += strings_length + (-strings_length % 4)
+
+    def read(typecode: str, count: int) -> array | memoryview:
+        nonlocal offset
+        itemsize = array(typecode).itemsize
+        chunk = payload[offset:offset + count * itemsize]
+        offset += count * itemsize
+        offset += -offset % 4
+        if copy or sys.byteorder == 'big':
+            values = array(typecode)
+            values.frombytes(chunk)
+            if sys.byteorder == 'big':
+                values.byteswap()
+            return values
+        return chunk.cast(typecode)
+
+    names = read('I', n_weekdays + n_intervals)
+    columns = {name: read(typecode, lengths[name]) for name, typecode in _COLUMNS}
+    if offset > len(payload) or len(strings) != n_strings:
+        raise SnapshotError('The snapshot is truncated.')
+    return ColumnarTimetable(
+        weekdays=[strings[id_] for id_ in names[:n_weekdays]],
+        intervals=[strings[id_] for id_ in names[n_weekdays:]],
+        strings=StringTable(strings),
+        **columns,
+    )
+
+
+def save(store: ColumnarTimetable, path: str, source_path: str | None = None) -> None:
+    """Writes the snapshot to a temporary file first, so a crash never leaves a half written snapshot."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps(store, source_path))
+    os.replace(tmp_path, path)
+
+
+def load(path: str, source_path: str | None = None, use_mmap: bool = False) -> ColumnarTimetable:
+    """Reads a snapshot with a single read. If use_mmap is True, the arrays of the store are backed by a memory map."""
+    try:
+        with open(path, 'rb') as f:
+            if not use_mmap:
+                return loads(f.read(), source_path)
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise SnapshotError(f'The snapshot could not be read: {e}') from e
+    return loads(mapped, source_path, copy=False)
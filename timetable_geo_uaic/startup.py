@@ -0,0 +1,92 @@
+"""Startup timing report.
+
+Run main.py with --startup-report to print how long each startup step took and quit after the first paint,
+or set the TIMETABLE_STARTUP_REPORT environment variable to print the report and keep the app running.
+The report also lists the download and parsing modules which were imported, since they should only be
+imported when a download is requested.
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from typing import Callable
+
+from attrs import define, field
+from PyQt6.QtCore import (
+    QEvent,
+    QObject,
+    QTimer,
+)
+
+
+STARTUP_REPORT_VARIABLE = 'TIMETABLE_STARTUP_REPORT'
+DEFERRED_MODULES = ('requests', 'bs4', 'unidecode')
+
+
+@define
+class StartupTimer:
+    """Records the time at which each startup step ended, relative to the creation of the timer."""
+    start: float = field(factory=time.perf_counter)
+    marks: list[tuple[str, float]] = field(factory=list)
+    enabled: bool = field(factory=lambda: bool(os.environ.get(STARTUP_REPORT_VARIABLE)))
+    finished: bool = False
+    # called after the report, e.g. to quit the app
+    callbacks: list[Callable[[], None]] = field(factory=list)
+
+
+    def mark(self, step: str) -> None:
+        self.marks.append((step, time.perf_counter()))
+
+
+    def get_durations(self) -> dict[str, float]:
+        """Returns the duration of every step, in seconds."""
+        durations = {}
+        previous = self.start
+        for step, end in self.marks:
+            durations[step] = end - previous
+            previous = end
+        return durations
+
+
+    def report(self) -> str:
+        lines = ['startup:']
+        for step, duration in self.get_durations().items():
+            lines.append(f'  {step:<12}{duration * 1000:8.1f} ms')
+        total = self.marks[-1][1] - self.start if self.marks else 0
+        lines.append(f'  {"total":<12}{total * 1000:8.1f} ms')
+        imported = [module for module in DEFERRED_MODULES if module in sys.modules]
+        lines.append(f'  deferred modules imported: {", ".join(imported) or "none"}')
+        return '\n'.join(lines)
+
+
+    def finish(self, step: str = 'first paint') -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self.mark(step)
+        if self.enabled:
+            print(self.report(), file=sys.stderr)
+        for callback in self.callbacks:
+            callback()
+
+
+class FirstPaintWatcher(QObject):
+    """Calls a function once the widget it watches has been painted for the first time."""
+
+
+    def __init__(self, widget: QObject, callback: Callable[[], None]) -> None:
+        super().__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
+
+
+    def eventFilter(self, object: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.Paint:
+            object.removeEventFilter(self)
+            # after the paint event is handled
+            QTimer.singleShot(0, self.callback)
+        return False
+
+
+timer = StartupTimer()
@@ -0,0 +1,298 @@
+"""Compact columnar storage for a timetable."""
+from __future__ import annotations
+
+from array import array
+from collections import Counter
+from functools import partial
+
+from attrs import define, field
+
+from .diff import ChangeSet, diff_timetables
+from .tracing import count, traced
+from .objects import (
+    Group,
+    Groups,
+    GroupHierarchy,
+    Professor,
+    Professors,
+    Room,
+    Rooms,
+    Subject,
+    Subjects,
+    Catalog,
+    entities,
+)
+
+
+# used for the lectures without a room or a subject
+NO_ID = 2 ** 32 - 1
+
+
+@define
+class StringTable:
+    """This class describes a table of interned strings, each one identified by its position."""
+    strings: list[str] = field(factory=list)
+    _ids: dict[str, int] = field(init=False, factory=dict)
+
+
+    def __attrs_post_init__(self) -> None:
+        self._ids = {string: i for i, string in enumerate(self.strings)}
+
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+    def __getitem__(self, id_: int) -> str:
+        return self.strings[id_]
+
+
+    def __contains__(self, string: str) -> bool:
+        return string in self._ids
+
+
+    def intern(self, string: str) -> int:
+        id_ = self._ids.get(string)
+        if id_ is None:
+            id_ = self._ids[string] = len(self.strings)
+            self.strings.append(string)
+        return id_
+
+
+    def get(self, string: str) -> int | None:
+        return self._ids.get(string)
+
+
+@define
+class ColumnarTimetable:
+    """This class stores a timetable as parallel integer arrays, one position for each lecture.
+    The lectures are stored in weekday, interval, lecture order, so every cell is a contiguous range
+    described by cell_offsets. Groups and professors are lists, stored as offsets into a flat id array."""
+    weekdays: list[str] = field(factory=list)
+    intervals: list[str] = field(factory=list)
+    strings: StringTable = field(factory=StringTable)
+    weekday: array = field(factory=partial(array, 'B'))
+    interval: array = field(factory=partial(array, 'B'))
+    subject: array = field(factory=partial(array, 'I'))
+    room: array = field(factory=partial(array, 'I'))
+    group_offsets: array = field(factory=partial(array, 'I', [0]))
+    group_ids: array = field(factory=partial(array, 'I'))
+    professor_offsets: array = field(factory=partial(array, 'I', [0]))
+    professor_ids: array = field(factory=partial(array, 'I'))
+    cell_offsets: array = field(factory=partial(array, 'I', [0]))
+
+
+    def __len__(self) -> int:
+        return len(self.weekday)
+
+
+    @classmethod
+    def from_json(cls, timetable: dict) -> ColumnarTimetable:
+        """Creates the store from the dictionary created with the HTMLElementsToJson class.
+        The names are split the same way JsonToObjects splits them."""
+        store = cls()
+        for w, (weekday, intervals) in enumerate(timetable.items()):
+            store.weekdays.append(weekday)
+            for i, (interval, lectures) in enumerate(intervals.items()):
+                if w == 0:
+                    store.intervals.append(interval)
+                store.add_cell(w, i, lectures)
+        return store
+
+
+    def _intern_single(self, value: str) -> int:
+        names = value.split(None, 0)
+        return self.strings.intern(names[0]) if names else NO_ID
+
+
+    def add_cell(self, weekday: int, interval: int, lectures: dict) -> None:
+        keys = ('groups', 'professors', 'rooms', 'subjects')
+        if len({len(lectures[key]) for key in keys}) > 1:
+            raise ValueError(f'The lectures of {self.weekdays[weekday]} {self.intervals[interval]} have different lengths.')
+        for groups, professors, room, subject in zip(*(lectures[key] for key in keys)):
+            self.weekday.append(weekday)
+            self.interval.append(interval)
+            self.group_ids.extend(self.strings.intern(name.strip()) for name in groups.split(','))
+            self.group_offsets.append(len(self.group_ids))
+            self.professor_ids.extend(self.strings.intern(name.strip()) for name in professors.split(','))
+            self.professor_offsets.append(len(self.professor_ids))
+            self.room.append(self._intern_single(room))
+            self.subject.append(self._intern_single(subject))
+        self.cell_offsets.append(len(self.weekday))
+
+
+    def cell_range(self, weekday: int, interval: int) -> range:
+        cell = weekday * len(self.intervals) + interval
+        return range(self.cell_offsets[cell], self.cell_offsets[cell + 1])
+
+
+    def group_names(self, lecture: int) -> list[str]:
+        ids = self.group_ids[self.group_offsets[lecture]:self.group_offsets[lecture + 1]]
+        return [self.strings[id_] for id_ in ids]
+
+
+    def professor_names(self, lecture: int) -> list[str]:
+        ids = self.professor_ids[self.professor_offsets[lecture]:self.professor_offsets[lecture + 1]]
+        return [self.strings[id_] for id_ in ids]
+
+
+    def room_name(self, lecture: int) -> str | None:
+        id_ = self.room[lecture]
+        return None if id_ == NO_ID else self.strings[id_]
+
+
+    def subject_name(self, lecture: int) -> str | None:
+        id_ = self.subject[lecture]
+        return None if id_ == NO_ID else self.strings[id_]
+
+
+    def to_json(self) -> dict:
+        """Returns the dictionary the store was created from, with the names joined back."""
+        timetable = {}
+        for w, weekday in enumerate(self.weekdays):
+            timetable[weekday] = {}
+            for i, interval in enumerate(self.intervals):
+                lectures = self.cell_range(w, i)
+                timetable[weekday][interval] = {
+                    'groups': [', '.join(self.group_names(j)) for j in lectures],
+                    'professors': [', '.join(self.professor_names(j)) for j in lectures],
+                    'rooms': [self.room_name(j) or '' for j in lectures],
+                    'subjects': [self.subject_name(j) or '' for j in lectures],
+                }
+        return timetable
+
+
+@define
+class ColumnarToObjects:
+    """Adapter which creates the timetable of objects used by the UI from a ColumnarTimetable,
+    the same way JsonToObjects does from a dictionary. Each name is converted to an object only once.
+    The occurrences of every name are counted, so that a new version of the store can be applied
+    by converting only the cells that changed (see update)."""
+    store: ColumnarTimetable = field(factory=ColumnarTimetable)
+    timetable: dict = field(init=False, factory=dict)
+    catalog: Catalog = field(init=False, default=None)
+    hierarchy: GroupHierarchy = field(init=False, factory=GroupHierarchy)
+    _objects: dict[tuple[type, str], object] = field(init=False, factory=dict)
+    _counts: dict[str, Counter] = field(init=False, factory=dict)
+
+
+    def get_object(self, object: type, id_: int):
+        key = (object, self.store.strings[id_])
+        object_ = self._objects.get(key)
+        if object_ is None:
+            object_ = self._objects[key] = entities.get(object, key[1])
+        return object_
+
+
+    def get_lecture(self, lecture: int) -> dict:
+        store = self.store
+        groups = store.group_ids[store.group_offsets[lecture]:store.group_offsets[lecture + 1]]
+        professors = store.professor_ids[store.professor_offsets[lecture]:store.professor_offsets[lecture + 1]]
+        room, subject = store.room[lecture], store.subject[lecture]
+        return {
+            'groups': Groups([self.get_object(Group, id_) for id_ in groups], hierarchy=self.hierarchy),
+            'professors': Professors([self.get_object(Professor, id_) for id_ in professors]),
+            'rooms': Rooms([] if room == NO_ID else [self.get_object(Room, room)]),
+            'subjects': Subjects([] if subject == NO_ID else [self.get_object(Subject, subject)]),
+        }
+
+
+    def get_cell(self, weekday: int, interval: int) -> dict:
+        cell = {'groups': [], 'professors': [], 'rooms': [], 'subjects': []}
+        for lecture in self.store.cell_range(weekday, interval):
+            for timetable_key, objects in self.get_lecture(lecture).items():
+                cell[timetable_key].append(objects)
+        return cell
+
+
+    def count_cell(self, cell: dict, delta: int, touched: dict[str, dict[str, int]] | None = None) -> None:
+        """Adds delta to the occurrences of the names of a cell. The counts before the first change
+        of every name are saved in touched."""
+        for timetable_key, lectures in cell.items():
+            counts = self._counts.setdefault(timetable_key, Counter())
+            for objects in lectures:
+                for object_ in objects:
+                    if touched is not None:
+                        touched.setdefault(timetable_key, {}).setdefault(object_.name, counts[object_.name])
+                    counts[object_.name] += delta
+
+
+    def create_catalog(self) -> Catalog:
+        """Creates the catalog, with the hierarchy referenced by the cells converted since the last catalog.
+        The hierarchy is a new one (see convert_timetable and update), so the shown timetable keeps its own."""
+        unique = {}
+        for (object, name), object_ in self._objects.items():
+            unique.setdefault(object, []).append(object_)
+        groups = Groups(unique.get(Group, []))
+        self.hierarchy.update(groups)
+        self.catalog = Catalog(
+            groups=groups,
+            professors=Professors(unique.get(Professor, [])),
+            rooms=Rooms(unique.get(Room, [])),
+            subjects=Subjects(unique.get(Subject, [])),
+            hierarchy=self.hierarchy,
+        )
+        return self.catalog
+
+
+    @traced('ColumnarToObjects.convert_timetable')
+    def convert_timetable(self) -> dict:
+        self._objects.clear()
+        self._counts.clear()
+        self.timetable = {}
+        self.hierarchy = GroupHierarchy()
+        for w, weekday in enumerate(self.store.weekdays):
+            self.timetable[weekday] = {}
+            for i, interval in enumerate(self.store.intervals):
+                self.timetable[weekday][interval] = self.get_cell(w, i)
+                self.count_cell(self.timetable[weekday][interval], 1)
+        self.create_catalog()
+        count('lectures converted', len(self.store))
+        return self.timetable
+
+
+    @traced('ColumnarToObjects.update')
+    def update(self, store: ColumnarTimetable) -> ChangeSet:
+        """Applies a new version of the store, converting only the cells which changed.
+        The previous timetable dictionary is not modified, a new one sharing the unchanged cells is created."""
+        difference = diff_timetables(self.store, store)
+        self.store = store
+        if difference is None:
+            old_catalog = self.catalog
+            self.convert_timetable()
+            changes = ChangeSet(cells={(w, i) for w in store.weekdays for i in store.intervals}, full=True)
+            for timetable_key in ('groups', 'professors', 'rooms', 'subjects'):
+                old_names, new_names = set(old_catalog[timetable_key].names), set(self.catalog[timetable_key].names)
+                changes.added[timetable_key] = new_names - old_names
+                changes.removed[timetable_key] = old_names - new_names
+            return changes
+        cells, lectures = difference
+        changes = ChangeSet(cells=cells, lectures=lectures)
+        if not cells:
+            return changes
+        count('cells converted', len(cells))
+        # the hierarchy of the current catalog might be in use on another thread, the converted cells get a new one
+        self.hierarchy = GroupHierarchy()
+        touched: dict[str, dict[str, int]] = {}
+        timetable = {weekday: dict(intervals) for weekday, intervals in self.timetable.items()}
+        for weekday, interval in cells:
+            self.count_cell(self.timetable[weekday][interval], -1, touched)
+            cell = self.get_cell(store.weekdays.index(weekday), store.intervals.index(interval))
+            self.count_cell(cell, 1, touched)
+            timetable[weekday][interval] = cell
+        self.timetable = timetable
+        classes = {'groups': Group, 'professors': Professor, 'rooms': Room, 'subjects': Subject}
+        for timetable_key, names in touched.items():
+            counts = self._counts[timetable_key]
+            for name, before in names.items():
+                if before == 0 and counts[name] > 0:
+                    changes.added.setdefault(timetable_key, set()).add(name)
+                elif before > 0 and counts[name] == 0:
+                    changes.removed.setdefault(timetable_key, set()).add(name)
+                    del counts[name]
+                    del self._objects[(classes[timetable_key], name)]
+        if changes.added or changes.removed:
+            self.create_catalog()
+        else:
+            self.hierarchy.update(self.catalog.groups)
+        return changes
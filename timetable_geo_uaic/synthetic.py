@@ -0,0 +1,186 @@
+"""Synthetic timetables of any size, as the json file saved by the app and as the page of the website.
+
+    python -m timetable_geo_uaic.synthetic --html large.html --json large.json --groups 320 --lectures 64
+
+The page has the format of the timetables exported by FET, as read by HTMLTableParser: the weekdays and
+the intervals are xAxis and yAxis headers and every cell is a table whose rows (studentsset line0, line1,
+teacher line2 and room line3) hold the groups, subjects, professors and rooms of its lectures.
+The names have the format of the real ones, so that they are converted the same way (e.g. GM22 is a group
+of the second year of GM, GM2 its aggregate)."""
+from __future__ import annotations
+
+import argparse
+import random
+from html import escape
+
+from attrs import define, field
+
+
+WEEKDAYS = ['LUNI', 'MARTI', 'MIERCURI', 'JOI', 'VINERI']
+INTERVALS = ['08-10', '10-12', '12-14', '14-16', '16-18', '18-20']
+PROGRAMMES = ['GM', 'GR', 'GT', 'HM', 'PT', 'GTF']
+SURNAMES = ['Popescu', 'Ionescu', 'Minea', 'Groza', 'Bulai', 'Niacsu', 'Istrate', 'Grozavu', 'Breaban', 'Leontie']
+TOPICS = ['Geografie', 'Hidrologie', 'Meteorologie', 'Geomorfologie', 'Cartografie', 'Turism', 'Pedologie', 'Geologie']
+QUALIFIERS = ['fizica', 'umana', 'generala', 'aplicata', 'regionala', 'economica', 'a mediului', 'a Romaniei']
+TYPES = ['(C)', '(LP)', '(S)', '(Op)(C)', '(Op)(LP)']
+ROW_CLASSES = (
+    ('studentsset line0', 'groups'),
+    ('line1', 'subjects'),
+    ('teacher line2', 'professors'),
+    ('room line3', 'rooms'),
+)
+
+
+@define
+class SyntheticTimetable:
+    """Generates a timetable with the given number of groups (of two digits, e.g. GM22), professors, rooms,
+    subjects and lectures in every cell. The same seed always gives the same timetable."""
+    groups: int = 40
+    professors: int = 60
+    rooms: int = 30
+    subjects: int = 80
+    lectures_per_cell: int = 8
+    weekdays: list[str] = field(factory=lambda: list(WEEKDAYS))
+    intervals: list[str] = field(factory=lambda: list(INTERVALS))
+    seed: int = 0
+    _timetable: dict = field(init=False, default=None)
+
+
+    def get_group_names(self) -> list[str]:
+        # the groups are spread over the programmes and their three years, with up to 9 groups per year.
+        # Once every programme is full, the same programmes are used again with another letter (e.g. GMA11)
+        names = []
+        per_cycle = len(PROGRAMMES) * 3 * 9
+        for i in range(self.groups):
+            cycle, rest = divmod(i, per_cycle)
+            programme = PROGRAMMES[rest % len(PROGRAMMES)] + (chr(ord('A') + cycle - 1) if cycle else '')
+            year, number = divmod(rest // len(PROGRAMMES), 9)
+            names.append(f'{programme}{year + 1}{number + 1}')
+        return names
+
+
+    def get_professor_names(self) -> list[str]:
+        return [
+            f'{SURNAMES[i % len(SURNAMES)]}{i // len(SURNAMES) or ""} {chr(ord("A") + i % 26)}'
+            for i in range(self.professors)
+        ]
+
+
+    def get_room_names(self) -> list[str]:
+        return [f'B{600 + i}' if i % 5 else f'C{400 + i}' for i in range(self.rooms)]
+
+
+    def get_subject_names(self) -> list[str]:
+        return [
+            f'{TOPICS[i % len(TOPICS)]} {QUALIFIERS[i // len(TOPICS) % len(QUALIFIERS)]} {i}'
+            for i in range(self.subjects)
+        ]
+
+
+    def get_lecture_groups(self, rng: random.Random, groups: list[str]) -> str:
+        """Returns the groups of a lecture: a group, one of its subgroups, a few groups or the whole year."""
+        group = rng.choice(groups)
+        kind = rng.random()
+        if kind < 0.5:
+            return group
+        if kind < 0.7:
+            return f'{group}{rng.randint(1, 2)}'
+        if kind < 0.9:
+            return ', '.join(sorted({group, *rng.sample(groups, min(2, len(groups)))}))
+        return group[:-1]
+
+
+    def create_timetable(self) -> dict:
+        rng = random.Random(self.seed)
+        groups = self.get_group_names()
+        professors = self.get_professor_names()
+        rooms = self.get_room_names()
+        subjects = self.get_subject_names()
+        timetable = {}
+        for weekday in self.weekdays:
+            timetable[weekday] = {}
+            for interval in self.intervals:
+                lectures = {'groups': [], 'professors': [], 'rooms': [], 'subjects': []}
+                for _ in range(self.lectures_per_cell):
+                    lectures['groups'].append(self.get_lecture_groups(rng, groups))
+                    lectures['professors'].append(rng.choice(professors))
+                    lectures['rooms'].append(rng.choice(rooms))
+                    lectures['subjects'].append(f'{rng.choice(subjects)} {rng.choice(TYPES)}')
+                timetable[weekday][interval] = lectures
+        return timetable
+
+
+    @property
+    def timetable(self) -> dict:
+        """The timetable in the format of the json file saved by the app."""
+        if self._timetable is None:
+            self._timetable = self.create_timetable()
+        return self._timetable
+
+
+    def to_html(self) -> str:
+        """Returns the page of the timetable, the way the website shows it."""
+        lines = [
+            '<html><head><meta charset="utf-8"><title>Orar</title></head><body>',
+            '<table><tr><td>Facultatea de Geografie și Geologie</td></tr></table>',
+            '<table><tr><td>Orar</td></tr></table>',
+            '<table id="table" border="1">',
+            '<thead>',
+            f'<tr><td rowspan="2"></td><th colspan="{len(self.weekdays)}">Zile</th></tr>',
+            '<tr>',
+            *(f'<th class="xAxis">{escape(weekday)}</th>' for weekday in self.weekdays),
+            '</tr>',
+            '</thead>',
+            '<tbody>',
+        ]
+        for interval in self.intervals:
+            lines.append(f'<tr><th class="yAxis">{escape(interval)}</th>')
+            for weekday in self.weekdays:
+                lectures = self.timetable[weekday][interval]
+                rows = [
+                    f'<tr class="{class_}">'
+                    + ''.join(f'<td class="detailed">{escape(name)}</td>' for name in lectures[timetable_key])
+                    + '</tr>'
+                    for class_, timetable_key in ROW_CLASSES
+                ]
+                lines.append('<td><table class="detailed">' + ''.join(rows) + '</table></td>')
+            lines.append('</tr>')
+        # the last row of the table is its footer, which the parsers skip
+        lines.append(f'<tr class="foot"><td></td><td colspan="{len(self.weekdays)}">Orar generat cu FET</td></tr>')
+        lines += ['</tbody>', '</table>', '</body></html>']
+        return '\n'.join(lines)
+
+
+def main(argv=None) -> None:
+    import json
+
+    parser = argparse.ArgumentParser(description='Writes a synthetic timetable.')
+    parser.add_argument('--html', help='path of the page')
+    parser.add_argument('--json', help='path of the json file')
+    parser.add_argument('--groups', type=int, default=40)
+    parser.add_argument('--professors', type=int, default=60)
+    parser.add_argument('--rooms', type=int, default=30)
+    parser.add_argument('--subjects', type=int, default=80)
+    parser.add_argument('--lectures', type=int, default=8, help='lectures in every cell')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    if args.html is None and args.json is None:
+        parser.error('give --html, --json or both')
+    synthetic = SyntheticTimetable(
+        groups=args.groups,
+        professors=args.professors,
+        rooms=args.rooms,
+        subjects=args.subjects,
+        lectures_per_cell=args.lectures,
+        seed=args.seed,
+    )
+    if args.html is not None:
+        with open(args.html, 'w', encoding='utf-8') as f:
+            f.write(synthetic.to_html())
+    if args.json is not None:
+        with open(args.json, 'w') as f:
+            f.write(json.dumps(synthetic.timetable, indent=2))
+
+
+if __name__ == '__main__':
+    main()
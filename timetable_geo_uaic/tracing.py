@@ -0,0 +1,209 @@
+"""Optional instrumentation of the slow paths: timing spans, counters and memory peaks, exported as a Chrome trace.
+
+Set the TIMETABLE_TRACE environment variable to the path of a json file before starting the app,
+
+    TIMETABLE_TRACE=trace.json python main.py
+
+and open the file, written when the app quits, in chrome://tracing or https://ui.perfetto.dev. A summary of
+the spans and the counters is printed too. Set TIMETABLE_TRACE_MEMORY as well to record the memory allocated
+by Python (with tracemalloc, which makes everything slower) at the end of every span, with the peak reached
+during the span. The peak of tracemalloc is shared by the whole process, so it is also counted in every span
+open meanwhile: the enclosing ones and those of the other threads.
+
+When the variable is not set, the functions decorated with traced are left as they are and span returns
+a shared context which does nothing, so the instrumentation costs close to nothing."""
+from __future__ import annotations
+
+import atexit
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, ContextManager, Iterator, TypeVar
+
+from attrs import define, field
+
+
+TRACE_VARIABLE = 'TIMETABLE_TRACE'
+TRACE_MEMORY_VARIABLE = 'TIMETABLE_TRACE_MEMORY'
+_NULL_SPAN = nullcontext()
+Function = TypeVar('Function', bound=Callable)
+
+
+@define
+class Tracer:
+    """Collects trace events (in the Chrome trace event format) from every thread."""
+    path: str | None = None
+    memory: bool = False
+    start: float = field(factory=time.perf_counter)
+    events: list[dict] = field(factory=list)
+    counters: dict[str, float] = field(factory=dict)
+    _lock: threading.Lock = field(init=False, factory=threading.Lock)
+    _threads: dict[int, str] = field(init=False, factory=dict)
+    # the peaks of the open spans (by their number) and the highest one so far, in bytes
+    _peaks: dict[int, int] = field(init=False, factory=dict)
+    _max_peak: int = field(init=False, default=0)
+    _span_numbers: Iterator[int] = field(init=False, factory=itertools.count)
+
+
+    def __attrs_post_init__(self) -> None:
+        if self.memory:
+            import tracemalloc
+            tracemalloc.start()
+
+
+    @classmethod
+    def from_environment(cls) -> Tracer:
+        return cls(path=os.environ.get(TRACE_VARIABLE) or None, memory=bool(os.environ.get(TRACE_MEMORY_VARIABLE)))
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+
+    def get_timestamp(self) -> float:
+        """Returns the microseconds since the tracer was created."""
+        return (time.perf_counter() - self.start) * 1e6
+
+
+    def add_event(self, event: dict) -> None:
+        thread = threading.current_thread()
+        event.setdefault('pid', os.getpid())
+        event.setdefault('tid', thread.ident)
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self.events.append(event)
+
+
+    def update_peaks(self) -> int:
+        """Adds the peak reached since the last reset to every open span and resets it.
+        Returns the memory allocated now. The lock has to be held."""
+        import tracemalloc
+        current, peak = tracemalloc.get_traced_memory()
+        for number, span_peak in self._peaks.items():
+            self._peaks[number] = max(span_peak, peak)
+        self._max_peak = max(self._max_peak, peak)
+        tracemalloc.reset_peak()
+        return current
+
+
+    def start_peak(self) -> int:
+        """Starts measuring the peak of a new span, returns its number."""
+        with self._lock:
+            current = self.update_peaks()
+            number = next(self._span_numbers)
+            self._peaks[number] = current
+        return number
+
+
+    def get_memory(self, number: int | None = None) -> dict[str, int]:
+        """Returns the memory allocated now and the peak of a span (which stops being measured),
+        or the highest peak so far."""
+        with self._lock:
+            current = self.update_peaks()
+            peak = self._max_peak if number is None else self._peaks.pop(number)
+        return {'current_kb': current // 1024, 'peak_kb': peak // 1024}
+
+
+    @contextmanager
+    def record_span(self, name: str, args: dict) -> Iterator[dict]:
+        """Records a complete event. The arguments can still be added to inside the block."""
+        number = self.start_peak() if self.memory else None
+        start = self.get_timestamp()
+        try:
+            yield args
+        finally:
+            end = self.get_timestamp()
+            if self.memory:
+                memory = self.get_memory(number)
+                args.update(memory)
+                self.add_event({'name': 'memory', 'ph': 'C', 'ts': end, 'args': memory})
+            self.add_event({'name': name, 'ph': 'X', 'ts': start, 'dur': end - start, 'args': args})
+
+
+    def span(self, name: str, **args) -> ContextManager[dict]:
+        if not self.enabled:
+            return _NULL_SPAN
+        return self.record_span(name, args)
+
+
+    def count(self, name: str, value: float = 1) -> None:
+        """Adds to a counter, which is shown as a graph of its running total."""
+        if not self.enabled:
+            return
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + value
+        self.add_event({'name': name, 'ph': 'C', 'ts': self.get_timestamp(), 'args': {name: total}})
+
+
+    def traced(self, name: str | None = None) -> Callable[[Function], Function]:
+        """Decorates a function to record a span for every call. If the tracer is disabled
+        (when the function is defined), the function is returned as it is."""
+        def decorator(function: Function) -> Function:
+            if not self.enabled:
+                return function
+            span_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.record_span(span_name, {}):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+    def to_json(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': ident, 'args': {'name': thread_name}}
+            for ident, thread_name in threads.items()
+        ]
+        other_data = {'counters': dict(self.counters)}
+        if self.memory:
+            other_data['memory'] = self.get_memory()
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms', 'otherData': other_data}
+
+
+    def export(self, path: str | None = None) -> None:
+        with open(path or self.path, 'w') as f:
+            json.dump(self.to_json(), f)
+
+
+    def summary(self) -> str:
+        """Returns the number of calls, the total and the longest duration of every span, and the counters."""
+        spans: dict[str, list[float]] = {}
+        with self._lock:
+            for event in self.events:
+                if event['ph'] == 'X':
+                    spans.setdefault(event['name'], []).append(event['dur'] / 1000)
+            counters = dict(self.counters)
+        lines = [f'{"span":<44}{"calls":>7}{"total ms":>11}{"max ms":>10}']
+        for span_name, durations in sorted(spans.items(), key=lambda item: -sum(item[1])):
+            lines.append(f'{span_name:<44}{len(durations):>7}{sum(durations):>11.1f}{max(durations):>10.1f}')
+        for counter, total in counters.items():
+            lines.append(f'{counter:<44}{total:>7g}')
+        return '\n'.join(lines)
+
+
+    def finish(self) -> None:
+        """Writes the trace and prints the summary, if the tracer is enabled."""
+        if not self.enabled:
+            return
+        self.export()
+        print(self.summary(), file=sys.stderr)
+        print(f'trace written to {self.path}', file=sys.stderr)
+
+
+tracer = Tracer.from_environment()
+span = tracer.span
+count = tracer.count
+traced = tracer.traced
+if tracer.enabled:
+    atexit.register(tracer.finish)
@@ -0,0 +1,46 @@
+"""Generates main_ui.py, the Python code of main.ui, which is faster to load than parsing the .ui file.
+
+Run it after every change of main.ui:
+
+    python -m timetable_geo_uaic.ui.build
+
+The digest of main.ui is written in main_ui.py. When they do not match, the dialog falls back to
+loading main.ui at runtime, so a forgotten build is only slower, never wrong.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+from pathlib import Path
+
+
+UI_PATH = Path(__file__).with_name('main.ui')
+PY_PATH = Path(__file__).with_name('main_ui.py')
+
+
+def get_ui_digest(path: Path = UI_PATH) -> str | None:
+    """Returns the sha256 of a .ui file, ignoring the line endings. Returns None if it does not exist."""
+    try:
+        content = path.read_bytes()
+    except OSError:
+        return None
+    return hashlib.sha256(content.replace(b'\r\n', b'\n')).hexdigest()
+
+
+def build(ui_path: Path = UI_PATH, py_path: Path = PY_PATH) -> None:
+    from PyQt6.uic import compileUi
+    code = io.StringIO()
+    compileUi(str(ui_path), code)
+    lines = code.getvalue().splitlines()
+    # without the absolute path of the .ui file, so the generated file does not depend on the machine
+    lines[0] = f"# Form implementation generated from reading ui file '{ui_path.name}'"
+    # the digest goes after the header comments, so pyuic's warning stays first
+    position = next(i for i, line in enumerate(lines) if line.startswith('from PyQt6'))
+    lines[position:position] = [f"UI_DIGEST = '{get_ui_digest(ui_path)}'", '', '']
+    with open(py_path, 'w', encoding='utf-8', newline='\r\n') as f:
+        f.write('\n'.join(lines) + '\n')
+
+
+if __name__ == '__main__':
+    build()
+    print(f'{PY_PATH.name} generated from {UI_PATH.name}')
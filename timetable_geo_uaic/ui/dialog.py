@@ -1,6 +1,5 @@
 from pathlib import Path
 
-from PyQt6 import uic
 from PyQt6.QtGui import (
     QIcon
 )
@@ -9,14 +8,28 @@ from PyQt6.QtWidgets import (
 )
 
 from ..assets import MAIN_UI, DIALOG_ICON
+from .build import get_ui_digest
+from .main_ui import Ui_Dialog, UI_DIGEST
 
 
 
-class Main(QDialog):
+def is_generated_ui_up_to_date() -> bool:
+    """Checks if main_ui.py was generated from the current main.ui.
+    Without main.ui (e.g. in a frozen build), the generated class is the only one available."""
+    digest = get_ui_digest(Path(MAIN_UI))
+    return digest is None or digest == UI_DIGEST
+
+
+class Main(QDialog, Ui_Dialog):
 
 
     def __init__(self):
         super(Main, self).__init__()
-        uic.loadUi(MAIN_UI, self)
+        if is_generated_ui_up_to_date():
+            self.setupUi(self)
+        else:
+            # main.ui was edited without running `python -m timetable_geo_uaic.ui.build`
+            from PyQt6 import uic
+            uic.loadUi(MAIN_UI, self)
         self.setWindowIcon(QIcon(DIALOG_ICON))
         
@@ -0,0 +1,232 @@
+# Form implementation generated from reading ui file 'main.ui'
+#
+# Created by: PyQt6 UI code generator 6.11.0
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic6 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+UI_DIGEST = 'deaf7e30ef31714d0e8c09b9214b608f1faef1881615a64c9f74cc4dd1eee803'
+
+
+from PyQt6 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.resize(1378, 689)
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout(Dialog)
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.splitter = QtWidgets.QSplitter(parent=Dialog)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Preferred, QtWidgets.QSizePolicy.Policy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.splitter.sizePolicy().hasHeightForWidth())
+        self.splitter.setSizePolicy(sizePolicy)
+        self.splitter.setMaximumSize(QtCore.QSize(250, 16777215))
+        self.splitter.setOrientation(QtCore.Qt.Orientation.Vertical)
+        self.splitter.setObjectName("splitter")
+        self.frameFilters = QtWidgets.QFrame(parent=self.splitter)
+        self.frameFilters.setMinimumSize(QtCore.QSize(0, 0))
+        self.frameFilters.setMaximumSize(QtCore.QSize(250, 16777215))
+        self.frameFilters.setFrameShape(QtWidgets.QFrame.Shape.StyledPanel)
+        self.frameFilters.setFrameShadow(QtWidgets.QFrame.Shadow.Raised)
+        self.frameFilters.setObjectName("frameFilters")
+        self.verticalLayout = QtWidgets.QVBoxLayout(self.frameFilters)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.labelGroup = QtWidgets.QLabel(parent=self.frameFilters)
+        self.labelGroup.setObjectName("labelGroup")
+        self.verticalLayout.addWidget(self.labelGroup)
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.comboBoxGroup = QtWidgets.QComboBox(parent=self.frameFilters)
+        self.comboBoxGroup.setMinimumSize(QtCore.QSize(0, 0))
+        self.comboBoxGroup.setPlaceholderText("")
+        self.comboBoxGroup.setObjectName("comboBoxGroup")
+        self.horizontalLayout.addWidget(self.comboBoxGroup)
+        self.pushButtonResetGroup = QtWidgets.QPushButton(parent=self.frameFilters)
+        self.pushButtonResetGroup.setMaximumSize(QtCore.QSize(40, 16777215))
+        self.pushButtonResetGroup.setObjectName("pushButtonResetGroup")
+        self.horizontalLayout.addWidget(self.pushButtonResetGroup)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.labelProfessor = QtWidgets.QLabel(parent=self.frameFilters)
+        self.labelProfessor.setObjectName("labelProfessor")
+        self.verticalLayout.addWidget(self.labelProfessor)
+        self.horizontalLayout_2 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.comboBoxProfessor = QtWidgets.QComboBox(parent=self.frameFilters)
+        self.comboBoxProfessor.setMinimumSize(QtCore.QSize(0, 0))
+        self.comboBoxProfessor.setObjectName("comboBoxProfessor")
+        self.horizontalLayout_2.addWidget(self.comboBoxProfessor)
+        self.pushButtonResetProfessor = QtWidgets.QPushButton(parent=self.frameFilters)
+        self.pushButtonResetProfessor.setMaximumSize(QtCore.QSize(40, 16777215))
+        self.pushButtonResetProfessor.setObjectName("pushButtonResetProfessor")
+        self.horizontalLayout_2.addWidget(self.pushButtonResetProfessor)
+        self.verticalLayout.addLayout(self.horizontalLayout_2)
+        self.labelRoom = QtWidgets.QLabel(parent=self.frameFilters)
+        self.labelRoom.setObjectName("labelRoom")
+        self.verticalLayout.addWidget(self.labelRoom)
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.comboBoxRoom = QtWidgets.QComboBox(parent=self.frameFilters)
+        self.comboBoxRoom.setMinimumSize(QtCore.QSize(0, 0))
+        self.comboBoxRoom.setObjectName("comboBoxRoom")
+        self.horizontalLayout_3.addWidget(self.comboBoxRoom)
+        self.pushButtonResetRoom = QtWidgets.QPushButton(parent=self.frameFilters)
+        self.pushButtonResetRoom.setMaximumSize(QtCore.QSize(40, 16777215))
+        self.pushButtonResetRoom.setObjectName("pushButtonResetRoom")
+        self.horizontalLayout_3.addWidget(self.pushButtonResetRoom)
+        self.verticalLayout.addLayout(self.horizontalLayout_3)
+        self.labelSubject = QtWidgets.QLabel(parent=self.frameFilters)
+        self.labelSubject.setObjectName("labelSubject")
+        self.verticalLayout.addWidget(self.labelSubject)
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.comboBoxSubject = QtWidgets.QComboBox(parent=self.frameFilters)
+        self.comboBoxSubject.setMinimumSize(QtCore.QSize(0, 0))
+        self.comboBoxSubject.setObjectName("comboBoxSubject")
+        self.horizontalLayout_4.addWidget(self.comboBoxSubject)
+        self.pushButtonResetSubject = QtWidgets.QPushButton(parent=self.frameFilters)
+        self.pushButtonResetSubject.setMaximumSize(QtCore.QSize(40, 16777215))
+        self.pushButtonResetSubject.setObjectName("pushButtonResetSubject")
+        self.horizontalLayout_4.addWidget(self.pushButtonResetSubject)
+        self.verticalLayout.addLayout(self.horizontalLayout_4)
+        self.labelExpression = QtWidgets.QLabel(parent=self.frameFilters)
+        self.labelExpression.setObjectName("labelExpression")
+        self.verticalLayout.addWidget(self.labelExpression)
+        self.lineEditExpression = QtWidgets.QLineEdit(parent=self.frameFilters)
+        self.lineEditExpression.setClearButtonEnabled(True)
+        self.lineEditExpression.setObjectName("lineEditExpression")
+        self.verticalLayout.addWidget(self.lineEditExpression)
+        self.checkBoxCheckOverlaps = QtWidgets.QCheckBox(parent=self.frameFilters)
+        self.checkBoxCheckOverlaps.setObjectName("checkBoxCheckOverlaps")
+        self.verticalLayout.addWidget(self.checkBoxCheckOverlaps)
+        self.pushButtonClashReport = QtWidgets.QPushButton(parent=self.frameFilters)
+        self.pushButtonClashReport.setObjectName("pushButtonClashReport")
+        self.verticalLayout.addWidget(self.pushButtonClashReport)
+        self.frame = QtWidgets.QFrame(parent=self.splitter)
+        self.frame.setMinimumSize(QtCore.QSize(0, 0))
+        self.frame.setMaximumSize(QtCore.QSize(250, 16777215))
+        self.frame.setFrameShape(QtWidgets.QFrame.Shape.StyledPanel)
+        self.frame.setFrameShadow(QtWidgets.QFrame.Shadow.Raised)
+        self.frame.setObjectName("frame")
+        self.verticalLayout_5 = QtWidgets.QVBoxLayout(self.frame)
+        self.verticalLayout_5.setObjectName("verticalLayout_5")
+        self.groupBoxFreeRooms = QtWidgets.QGroupBox(parent=self.frame)
+        self.groupBoxFreeRooms.setObjectName("groupBoxFreeRooms")
+        self.verticalLayoutFreeRooms = QtWidgets.QVBoxLayout(self.groupBoxFreeRooms)
+        self.verticalLayoutFreeRooms.setObjectName("verticalLayoutFreeRooms")
+        self.horizontalLayoutFreeRooms = QtWidgets.QHBoxLayout()
+        self.horizontalLayoutFreeRooms.setObjectName("horizontalLayoutFreeRooms")
+        self.comboBoxFreeWeekday = QtWidgets.QComboBox(parent=self.groupBoxFreeRooms)
+        self.comboBoxFreeWeekday.setObjectName("comboBoxFreeWeekday")
+        self.horizontalLayoutFreeRooms.addWidget(self.comboBoxFreeWeekday)
+        self.comboBoxFreeInterval = QtWidgets.QComboBox(parent=self.groupBoxFreeRooms)
+        self.comboBoxFreeInterval.setObjectName("comboBoxFreeInterval")
+        self.horizontalLayoutFreeRooms.addWidget(self.comboBoxFreeInterval)
+        self.verticalLayoutFreeRooms.addLayout(self.horizontalLayoutFreeRooms)
+        self.listWidgetFreeRooms = QtWidgets.QListWidget(parent=self.groupBoxFreeRooms)
+        self.listWidgetFreeRooms.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.NoSelection)
+        self.listWidgetFreeRooms.setObjectName("listWidgetFreeRooms")
+        self.verticalLayoutFreeRooms.addWidget(self.listWidgetFreeRooms)
+        self.verticalLayout_5.addWidget(self.groupBoxFreeRooms)
+        self.verticalLayout_4 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_4.setObjectName("verticalLayout_4")
+        self.horizontalLayoutTimetable = QtWidgets.QHBoxLayout()
+        self.horizontalLayoutTimetable.setObjectName("horizontalLayoutTimetable")
+        self.labelTimetable = QtWidgets.QLabel(parent=self.frame)
+        self.labelTimetable.setObjectName("labelTimetable")
+        self.horizontalLayoutTimetable.addWidget(self.labelTimetable)
+        self.comboBoxTimetable = QtWidgets.QComboBox(parent=self.frame)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Expanding, QtWidgets.QSizePolicy.Policy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.comboBoxTimetable.sizePolicy().hasHeightForWidth())
+        self.comboBoxTimetable.setSizePolicy(sizePolicy)
+        self.comboBoxTimetable.setObjectName("comboBoxTimetable")
+        self.horizontalLayoutTimetable.addWidget(self.comboBoxTimetable)
+        self.verticalLayout_4.addLayout(self.horizontalLayoutTimetable)
+        self.pushButtonDownloadTimetable = QtWidgets.QPushButton(parent=self.frame)
+        self.pushButtonDownloadTimetable.setObjectName("pushButtonDownloadTimetable")
+        self.verticalLayout_4.addWidget(self.pushButtonDownloadTimetable)
+        self.horizontalLayoutDownload = QtWidgets.QHBoxLayout()
+        self.horizontalLayoutDownload.setObjectName("horizontalLayoutDownload")
+        self.progressBarDownload = QtWidgets.QProgressBar(parent=self.frame)
+        self.progressBarDownload.setMaximum(4)
+        self.progressBarDownload.setProperty("value", 0)
+        self.progressBarDownload.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.progressBarDownload.setObjectName("progressBarDownload")
+        self.horizontalLayoutDownload.addWidget(self.progressBarDownload)
+        self.pushButtonCancelDownload = QtWidgets.QPushButton(parent=self.frame)
+        self.pushButtonCancelDownload.setMaximumSize(QtCore.QSize(70, 16777215))
+        self.pushButtonCancelDownload.setObjectName("pushButtonCancelDownload")
+        self.horizontalLayoutDownload.addWidget(self.pushButtonCancelDownload)
+        self.verticalLayout_4.addLayout(self.horizontalLayoutDownload)
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.verticalLayout_2 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_2.setObjectName("verticalLayout_2")
+        self.labelYear = QtWidgets.QLabel(parent=self.frame)
+        self.labelYear.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.labelYear.setObjectName("labelYear")
+        self.verticalLayout_2.addWidget(self.labelYear)
+        self.lineEditYears = QtWidgets.QLineEdit(parent=self.frame)
+        self.lineEditYears.setText("")
+        self.lineEditYears.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.lineEditYears.setObjectName("lineEditYears")
+        self.verticalLayout_2.addWidget(self.lineEditYears)
+        self.horizontalLayout_5.addLayout(self.verticalLayout_2)
+        self.verticalLayout_3 = QtWidgets.QVBoxLayout()
+        self.verticalLayout_3.setObjectName("verticalLayout_3")
+        self.labelSemester = QtWidgets.QLabel(parent=self.frame)
+        self.labelSemester.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.labelSemester.setObjectName("labelSemester")
+        self.verticalLayout_3.addWidget(self.labelSemester)
+        self.lineEditSemester = QtWidgets.QLineEdit(parent=self.frame)
+        self.lineEditSemester.setAlignment(QtCore.Qt.AlignmentFlag.AlignCenter)
+        self.lineEditSemester.setObjectName("lineEditSemester")
+        self.verticalLayout_3.addWidget(self.lineEditSemester)
+        self.horizontalLayout_5.addLayout(self.verticalLayout_3)
+        self.verticalLayout_4.addLayout(self.horizontalLayout_5)
+        self.verticalLayout_5.addLayout(self.verticalLayout_4)
+        self.horizontalLayout_6.addWidget(self.splitter)
+        self.tableViewMain = QtWidgets.QTableView(parent=Dialog)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Policy.Preferred, QtWidgets.QSizePolicy.Policy.Preferred)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.tableViewMain.sizePolicy().hasHeightForWidth())
+        self.tableViewMain.setSizePolicy(sizePolicy)
+        self.tableViewMain.setMinimumSize(QtCore.QSize(0, 0))
+        self.tableViewMain.setSizeAdjustPolicy(QtWidgets.QAbstractScrollArea.SizeAdjustPolicy.AdjustToContents)
+        self.tableViewMain.setSelectionMode(QtWidgets.QAbstractItemView.SelectionMode.NoSelection)
+        self.tableViewMain.setObjectName("tableViewMain")
+        self.horizontalLayout_6.addWidget(self.tableViewMain)
+
+        self.retranslateUi(Dialog)
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "Orar"))
+        self.labelGroup.setText(_translate("Dialog", "Grupa"))
+        self.pushButtonResetGroup.setText(_translate("Dialog", "Reset"))
+        self.labelProfessor.setText(_translate("Dialog", "Profesor"))
+        self.pushButtonResetProfessor.setText(_translate("Dialog", "Reset"))
+        self.labelRoom.setText(_translate("Dialog", "Sală"))
+        self.pushButtonResetRoom.setText(_translate("Dialog", "Reset"))
+        self.labelSubject.setText(_translate("Dialog", "Materie"))
+        self.pushButtonResetSubject.setText(_translate("Dialog", "Reset"))
+        self.labelExpression.setText(_translate("Dialog", "Expresie"))
+        self.lineEditExpression.setPlaceholderText(_translate("Dialog", "ex: room:B8 AND NOT group:GT3"))
+        self.checkBoxCheckOverlaps.setText(_translate("Dialog", "Verifică suprapuneri"))
+        self.pushButtonClashReport.setText(_translate("Dialog", "Raport suprapuneri"))
+        self.groupBoxFreeRooms.setTitle(_translate("Dialog", "Săli libere"))
+        self.labelTimetable.setText(_translate("Dialog", "Orar"))
+        self.comboBoxTimetable.setToolTip(_translate("Dialog", "Orarele salvate. Cele folosite recent sunt afișate imediat."))
+        self.pushButtonDownloadTimetable.setText(_translate("Dialog", "Descarcă tabelul"))
+        self.pushButtonCancelDownload.setText(_translate("Dialog", "Anulează"))
+        self.labelYear.setText(_translate("Dialog", "Anul universitar"))
+        self.lineEditYears.setPlaceholderText(_translate("Dialog", "ex: 2023-2024"))
+        self.labelSemester.setText(_translate("Dialog", "Semestrul"))
+        self.lineEditSemester.setPlaceholderText(_translate("Dialog", "ex: 1"))
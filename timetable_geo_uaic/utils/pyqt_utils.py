@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+from typing import Callable
+
 from PyQt6.QtCore import (
     Qt,
     QEvent,
+    QAbstractListModel,
+    QModelIndex,
 )
 from PyQt6.QtGui import (
     QFontMetrics,
@@ -10,66 +14,65 @@ from PyQt6.QtGui import (
     QPalette,
 )
 from PyQt6.QtWidgets import (
-    QScrollArea,
-    QLabel,
-    QWidget,
-    QVBoxLayout,
     QComboBox,
     QCompleter,
-    QTabWidget,
     QStyledItemDelegate,
     QApplication,
 )
 
 
+class SearchCompleterModel(QAbstractListModel):
+    """The names found for the text typed, as returned by a search function (e.g. SearchIndex.search)."""
 
-def create_tab_widget() -> QTabWidget:
-    widget = QTabWidget()
-    widget.setTabBarAutoHide(True)
-    return widget
+    def __init__(self, search: Callable[[str], list[str]], parent=None):
+        super().__init__(parent)
+        self.search = search
+        self.names: list[str] = []
 
 
-def create_scroll_label() -> ScrollLabel:
-    return ScrollLabel()
+    def set_query(self, query: str) -> None:
+        self.beginResetModel()
+        self.names = self.search(query)
+        self.endResetModel()
 
 
-def combobox_add_completer(combobox: QComboBox) -> None:
-    combobox.setEditable(True)
-    combobox.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
-    combobox.completer().setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
-    combobox.setCurrentIndex(-1)
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
 
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if index.isValid() and role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            return self.names[index.row()]
+        return None
 
-class ScrollLabel(QScrollArea):
-    """A scrollable label object."""
-    # source code: https://www.geeksforgeeks.org/pyqt5-scrollable-label/
-    # constructor
-    def __init__(self) -> None:
-        super(ScrollLabel, self).__init__()
-        # making widget resizable
-        self.setWidgetResizable(True)
-        # making qwidget object
-        content = QWidget(self)
-        self.setWidget(content)
-        # vertical box layout
-        lay = QVBoxLayout(content)
-        # creating label
-        self.label = QLabel(content)
-        # setting alignment to the text
-        self.label.setAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop)
-        # making label multi-line
-        self.label.setWordWrap(True)
-        # adding label to the layout
-        lay.addWidget(self.label)
 
+class SearchCompleter(QCompleter):
+    """A completer showing the results of a search instead of matching the prefix of every item.
+    The search runs when the completer splits the text typed, the results are shown unfiltered."""
 
-    def setText(self, text) -> None:
-        # setting text to the label
-        self.label.setText(text)
+    def __init__(self, search: Callable[[str], list[str]], parent=None):
+        super().__init__(parent)
+        self.setModel(SearchCompleterModel(search, self))
+        self.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.setMaxVisibleItems(15)
 
 
-    def text(self) -> str:
-        return self.label.text()
+    def splitPath(self, path):
+        self.model().set_query(path)
+        return ['']
+
+
+def combobox_add_completer(combobox: QComboBox, search: Callable[[str], list[str]] | None = None) -> None:
+    """Adds a completer to the combobox. If a search function is given, the items are found by it
+    instead of by their prefix. Once added, the search completer is kept."""
+    combobox.setEditable(True)
+    combobox.setInsertPolicy(QComboBox.InsertPolicy.NoInsert)
+    if not isinstance(combobox.completer(), SearchCompleter):
+        if search is None:
+            combobox.completer().setCompletionMode(QCompleter.CompletionMode.PopupCompletion)
+        else:
+            combobox.setCompleter(SearchCompleter(search, combobox))
+    combobox.setCurrentIndex(-1)
 
 
 class CheckableComboBox(QComboBox):
@@ -171,7 +174,8 @@ class CheckableComboBox(QComboBox):
             self.model().item(i).setCheckState(Qt.CheckState.Unchecked)
 
 
-    def addItem(self, text, data=None):
+    @staticmethod
+    def create_item(text, data=None) -> QStandardItem:
         item = QStandardItem()
         item.setText(text)
         if data is None:
@@ -180,7 +184,15 @@ class CheckableComboBox(QComboBox):
             item.setData(data)
         item.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable)
         item.setData(Qt.CheckState.Unchecked, Qt.ItemDataRole.CheckStateRole)
-        self.model().appendRow(item)
+        return item
+
+
+    def addItem(self, text, data=None):
+        self.model().appendRow(self.create_item(text, data))
+
+
+    def insertItem(self, index, text, data=None):
+        self.model().insertRow(index, self.create_item(text, data))
 
 
     def addItems(self, texts, datalist=None):
@@ -0,0 +1,233 @@
+"""Runs the work triggered by the UI (e.g. filtering) on a thread pool, keeping only the latest result."""
+from __future__ import annotations
+
+import threading
+import traceback
+from typing import Callable, Iterable
+
+from PyQt6.QtCore import (
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QTimer,
+    pyqtSignal,
+)
+
+
+# a job receives a function telling whether it became stale, so it can stop early
+Job = Callable[[Callable[[], bool]], object]
+
+
+class Cancelled(Exception):
+    """Raised by a job which noticed that it became stale."""
+
+
+class _JobSignals(QObject):
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, object)
+
+
+class _JobRunnable(QRunnable):
+    def __init__(self, generation: int, job: Job, is_cancelled: Callable[[], bool], signals: _JobSignals) -> None:
+        super().__init__()
+        self.generation = generation
+        self.job = job
+        self.is_cancelled = is_cancelled
+        self.signals = signals
+
+
+    def run(self) -> None:
+        if self.is_cancelled():
+            return
+        try:
+            result = self.job(self.is_cancelled)
+        except Cancelled:
+            return
+        except Exception as e:
+            self.signals.failed.emit(self.generation, e)
+            return
+        if not self.is_cancelled():
+            self.signals.finished.emit(self.generation, result)
+
+
+class LatestJobRunner(QObject):
+    """Debounces the requests and runs a job on the thread pool once they stop for `delay` milliseconds.
+    Every job gets a generation number; a job whose generation is not the latest one is stale, it stops
+    as soon as it notices it and its result is dropped, so only the latest result is applied.
+
+    prepare is called on the GUI thread when the job is submitted (e.g. to read the selected filters) and
+    returns the job to run on the pool. apply is called on the GUI thread with the result and with the cells
+    requested since the last applied result (None meaning all of them).
+    A job which raises is reported with failed, the exception is never raised in the slot, which would abort the app."""
+    finished = pyqtSignal()
+    failed = pyqtSignal(object)
+
+
+    def __init__(
+        self,
+        prepare: Callable[[], Job],
+        apply: Callable[[object, set | None], None],
+        delay: int = 150,
+        pool: QThreadPool | None = None,
+        parent: QObject | None = None,
+    ) -> None:
+        super().__init__(parent)
+        self.prepare = prepare
+        self.apply = apply
+        self.pool = pool if pool is not None else QThreadPool.globalInstance()
+        self.generation = 0
+        # the cells requested since the last applied result, None meaning all of them
+        self.pending_cells: set | None = set()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.submit)
+        self.signals = _JobSignals(self)
+        self.signals.finished.connect(self._on_finished)
+        self.signals.failed.connect(self._on_failed)
+
+
+    def _add_cells(self, cells: Iterable | None) -> None:
+        if cells is None:
+            self.pending_cells = None
+        elif self.pending_cells is not None:
+            self.pending_cells.update(cells)
+
+
+    def _take_cells(self) -> set | None:
+        cells, self.pending_cells = self.pending_cells, set()
+        return cells
+
+
+    def is_cancelled_for(self, generation: int) -> Callable[[], bool]:
+        # reading an int is atomic, so the workers can compare it without a lock
+        return lambda: generation != self.generation
+
+
+    def request(self, cells: Iterable | None = None) -> None:
+        """Asks for a new result. Rapid requests are coalesced into a single job."""
+        self._add_cells(cells)
+        # the job which is running will not be applied anymore
+        self.generation += 1
+        self.timer.start()
+
+
+    def submit(self) -> None:
+        self.timer.stop()
+        self.generation += 1
+        generation = self.generation
+        runnable = _JobRunnable(generation, self.prepare(), self.is_cancelled_for(generation), self.signals)
+        runnable.setAutoDelete(True)
+        self.pool.start(runnable)
+
+
+    def run_now(self, cells: Iterable | None = None) -> None:
+        """Computes and applies a result on the calling thread, cancelling the pending and the running jobs."""
+        self.timer.stop()
+        self.generation += 1
+        self._add_cells(cells)
+        result = self.prepare()(lambda: False)
+        self.apply(result, self._take_cells())
+        self.finished.emit()
+
+
+    def _on_finished(self, generation: int, result: object) -> None:
+        if generation != self.generation:
+            return
+        self.apply(result, self._take_cells())
+        self.finished.emit()
+
+
+    def _on_failed(self, generation: int, error: Exception) -> None:
+        if generation != self.generation:
+            return
+        traceback.print_exception(error)
+        self.failed.emit(error)
+
+
+class _StagedJobSignals(QObject):
+    progress = pyqtSignal(int, str)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(object)
+    cancelled = pyqtSignal()
+
+
+class StagedJob(QRunnable):
+    """A long job (e.g. a download) run on the thread pool, which reports the stage it is in.
+
+    The function receives the job itself and calls report at the start of every stage, checkpoint
+    where it can stop if it was cancelled and commit before the work which cannot be undone
+    (e.g. changing shared state). After commit, the job can no longer be cancelled."""
+
+
+    def __init__(self, function: Callable[[StagedJob], object]) -> None:
+        super().__init__()
+        self.function = function
+        self.signals = _StagedJobSignals()
+        self._lock = threading.Lock()
+        self._cancelled = False
+        self._committed = False
+
+
+    @property
+    def progress(self):
+        return self.signals.progress
+
+
+    @property
+    def finished(self):
+        return self.signals.finished
+
+
+    @property
+    def failed(self):
+        return self.signals.failed
+
+
+    @property
+    def cancelled(self):
+        return self.signals.cancelled
+
+
+    def emit(self, name: str, *args) -> None:
+        """Emits a signal of the job, unless it was already deleted because the app quit while the job was running."""
+        try:
+            getattr(self.signals, name).emit(*args)
+        except RuntimeError:
+            pass
+
+
+    def report(self, stage: int, text: str) -> None:
+        self.checkpoint()
+        self.emit('progress', stage, text)
+
+
+    def checkpoint(self) -> None:
+        if self._cancelled and not self._committed:
+            raise Cancelled()
+
+
+    def commit(self) -> None:
+        with self._lock:
+            self.checkpoint()
+            self._committed = True
+
+
+    def cancel(self) -> bool:
+        """Asks the job to stop. Returns False if it is too late, the job will finish normally."""
+        with self._lock:
+            if self._committed:
+                return False
+            self._cancelled = True
+            return True
+
+
+    def run(self) -> None:
+        try:
+            result = self.function(self)
+        except Cancelled:
+            self.emit('cancelled')
+        except Exception as e:
+            self.emit('failed', e)
+        else:
+            self.emit('finished', result)
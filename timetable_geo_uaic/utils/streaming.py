@@ -0,0 +1,300 @@
+"""Single pass extraction of the timetable from the downloaded page.
+
+StreamingTableParser gives the same results as HTMLTableParser, without building a BeautifulSoup tree
+and without searching the rows once for every line class. The page is tokenized with the standard
+html.parser (the same tokenizer BeautifulSoup uses with features='html.parser') and only the events
+of the timetable table are handled. The tokenizer stops as soon as that table is closed.
+
+Run this module with the path of a downloaded page to compare both parsers:
+
+    python -m timetable_geo_uaic.utils.streaming page.html
+"""
+from __future__ import annotations
+
+import sys
+import time
+from html.parser import HTMLParser
+
+from attrs import define, field
+
+from ..tracing import traced
+from .utils import (
+    Table,
+    HTMLTableParser,
+)
+
+
+LINE_CLASSES = ('studentsset line0', 'line1', 'teacher line2', 'room line3')
+# the elements which never have children, as in BeautifulSoup
+VOID_ELEMENTS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'keygen', 'link', 'menuitem', 'meta', 'param', 'source', 'track', 'wbr',
+))
+
+
+def class_matches(class_attribute: str | None, class_: str) -> bool:
+    """Same matching as BeautifulSoup's find_all(attrs={'class': class_})."""
+    if class_attribute is None:
+        return False
+    classes = class_attribute.split()
+    return class_ == ' '.join(classes) or class_ in classes
+
+
+class _TableClosed(Exception):
+    """Raised to stop the tokenizer once the timetable table is closed."""
+
+
+class _Element:
+    __slots__ = ('tag', 'roles', 'text', 'lines')
+
+
+    def __init__(self, tag: str) -> None:
+        self.tag = tag
+        self.roles: tuple[str, ...] = ()
+        self.text: list[str] | None = None
+        self.lines: list[list[str]] | None = None
+
+
+class TableExtractor(HTMLParser):
+    """Collects the weekdays, the intervals and the four line classes of a table in one pass."""
+
+
+    def __init__(self, table_index: int = 2) -> None:
+        super().__init__(convert_charrefs=True)
+        # imported here, so that it is only loaded when a page is parsed
+        from unidecode import unidecode
+        self.unidecode = unidecode
+        self.table_index = table_index
+        self.tables_seen = 0
+        self.stack: list[_Element] = []
+        self.capturing: list[_Element] = []
+        self.pending_text: list[str] = []
+        self.thead_seen = False
+        self.tbody_seen = False
+        self.in_thead = False
+        self.in_tbody = False
+        self.row: dict[str, list[list[str]]] | None = None
+        self.weekdays: list[str] = []
+        self.intervals: list[str] = []
+        self.rows: list[dict[str, list[list[str]]]] = []
+        self.closed = False
+
+
+    @traced('TableExtractor.extract')
+    def extract(self, markup: str) -> TableExtractor:
+        try:
+            self.feed(markup)
+            self.close()
+        except _TableClosed:
+            pass
+        if not self.closed and not self.stack:
+            raise ValueError('The page does not contain the timetable table.')
+        # the elements left open at the end of the page are closed, as BeautifulSoup does
+        self._flush_text()
+        while len(self.stack) > 1:
+            self._end(self.stack.pop())
+        return self
+
+
+    def _flush_text(self) -> None:
+        """Adjacent strings are a single string for BeautifulSoup, so they are a single line entry."""
+        if not self.pending_text:
+            return
+        text = ''.join(self.pending_text)
+        self.pending_text.clear()
+        if self.stack and self.stack[-1].lines is not None:
+            for line in self.stack[-1].lines:
+                line.append(self.unidecode(text.strip()))
+
+
+    def _start(self, element: _Element, attrs: list[tuple[str, str | None]]) -> None:
+        parent = self.stack[-1]
+        tag = element.tag
+        class_attribute = dict(attrs).get('class')
+        roles = []
+        if tag == 'thead' and not self.thead_seen:
+            self.thead_seen = self.in_thead = True
+            roles.append('thead')
+        elif tag == 'tbody' and not self.tbody_seen:
+            self.tbody_seen = self.in_tbody = True
+            roles.append('tbody')
+        elif tag == 'tr' and 'tbody' in parent.roles:
+            self.row = {class_: [] for class_ in LINE_CLASSES}
+            self.rows.append(self.row)
+            roles.append('row')
+        elif tag == 'tr' and self.row is not None:
+            lines = []
+            for class_ in LINE_CLASSES:
+                if class_matches(class_attribute, class_):
+                    line = []
+                    self.row[class_].append(line)
+                    lines.append(line)
+            if lines:
+                element.lines = lines
+        elif tag == 'th' and self.in_thead and class_matches(class_attribute, 'xAxis'):
+            roles.append('xAxis')
+        elif tag == 'th' and self.in_tbody and class_matches(class_attribute, 'yAxis'):
+            roles.append('yAxis')
+        if parent.lines is not None:
+            roles.append('entry')
+        element.roles = tuple(roles)
+        if 'xAxis' in roles or 'yAxis' in roles or 'entry' in roles:
+            element.text = []
+            self.capturing.append(element)
+
+
+    def _end(self, element: _Element) -> None:
+        roles = element.roles
+        if element.text is not None:
+            self.capturing.remove(element)
+            text = ''.join(element.text)
+            if 'xAxis' in roles:
+                self.weekdays.append(self.unidecode(text))
+            if 'yAxis' in roles:
+                self.intervals.append(self.unidecode(text))
+            if 'entry' in roles and self.stack and self.stack[-1].lines is not None:
+                for line in self.stack[-1].lines:
+                    line.append(self.unidecode(text.strip()))
+        if 'thead' in roles:
+            self.in_thead = False
+        elif 'tbody' in roles:
+            self.in_tbody = False
+        elif 'row' in roles:
+            self.row = None
+
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if not self.stack:
+            if tag == 'table' and not self.closed:
+                self.tables_seen += 1
+                if self.tables_seen - 1 == self.table_index:
+                    self.stack.append(_Element(tag))
+            return
+        self._flush_text()
+        element = _Element(tag)
+        self._start(element, attrs)
+        if tag in VOID_ELEMENTS:
+            self._end(element)
+        else:
+            self.stack.append(element)
+
+
+    def handle_endtag(self, tag: str) -> None:
+        if not self.stack:
+            return
+        self._flush_text()
+        for i in range(len(self.stack) - 1, -1, -1):
+            if self.stack[i].tag == tag:
+                break
+        else:
+            # an end tag without a start tag is ignored
+            return
+        while len(self.stack) > i:
+            element = self.stack.pop()
+            if self.stack:
+                self._end(element)
+        if not self.stack:
+            self.closed = True
+            raise _TableClosed()
+
+
+    def handle_data(self, data: str) -> None:
+        if not self.stack:
+            return
+        for element in self.capturing:
+            element.text.append(data)
+        self.pending_text.append(data)
+
+
+    def handle_comment(self, data: str) -> None:
+        if not self.stack:
+            return
+        self._flush_text()
+        # a comment is a child without text
+        if self.stack[-1].lines is not None:
+            for line in self.stack[-1].lines:
+                line.append('')
+
+
+    def elements(self, class_: str) -> list[tuple[tuple[str]]]:
+        """Returns the lines of a class, the same way as HTMLTableParser.get_elements_from_lines."""
+        # the last row is the footer
+        return [tuple(tuple(line) for line in row[class_]) for row in self.rows[:-1]]
+
+
+def decode(content: bytes | str) -> str:
+    """Decodes a page the same way BeautifulSoup does."""
+    if isinstance(content, str):
+        return content
+    from bs4.dammit import UnicodeDammit
+    return UnicodeDammit(content, is_html=True).unicode_markup
+
+
+@define
+class StreamingTableParser:
+    """Drop-in replacement of HTMLTableParser, which extracts everything in a single pass over the page."""
+    table: Table = field(default=None)
+    _extractor: TableExtractor = field(init=False, default=None)
+
+
+    def __attrs_post_init__(self):
+        if self.table is None:
+            self.table = Table()
+
+
+    @property
+    def extractor(self) -> TableExtractor:
+        if self._extractor is None:
+            self._extractor = TableExtractor().extract(decode(self.table.result.content))
+        return self._extractor
+
+
+    def get_weekdays(self) -> list[str]:
+        return list(self.extractor.weekdays)
+
+
+    def get_intervals(self) -> list[str]:
+        return list(self.extractor.intervals)
+
+
+    def get_subjects(self) -> list[tuple[tuple[str]]]:
+        return self.extractor.elements('line1')
+
+
+    def get_groups(self) -> list[tuple[tuple[str]]]:
+        return self.extractor.elements('studentsset line0')
+
+
+    def get_professors(self) -> list[tuple[tuple[str]]]:
+        return self.extractor.elements('teacher line2')
+
+
+    def get_rooms(self) -> list[tuple[tuple[str]]]:
+        return self.extractor.elements('room line3')
+
+
+def compare_parsers(content: bytes, repeat: int = 5) -> dict[str, float]:
+    """Checks that both parsers give the same results for a page and returns their best time, in seconds."""
+    methods = ('get_weekdays', 'get_intervals', 'get_subjects', 'get_groups', 'get_professors', 'get_rooms')
+    timings = {}
+    results = {}
+    for parser_class in (HTMLTableParser, StreamingTableParser):
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parser = parser_class(table=Table.from_content(content))
+            result = [getattr(parser, method)() for method in methods]
+            best = min(best, time.perf_counter() - start)
+        timings[parser_class.__name__] = best
+        results[parser_class.__name__] = result
+    if results['HTMLTableParser'] != results['StreamingTableParser']:
+        raise AssertionError('StreamingTableParser does not give the same results as HTMLTableParser.')
+    return timings
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            timings = compare_parsers(f.read())
+        speedup = timings['HTMLTableParser'] / timings['StreamingTableParser']
+        print(f'{path}: identical results, ' + ', '.join(f'{k} {v * 1000:.1f} ms' for k, v in timings.items()) + f' ({speedup:.1f}x)')
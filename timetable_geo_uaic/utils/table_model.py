@@ -0,0 +1,207 @@
+"""Model and delegate used to show the timetable in a QTableView."""
+from __future__ import annotations
+
+from typing import Iterable
+
+from PyQt6.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QEvent,
+    QModelIndex,
+    QObject,
+    QRect,
+)
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtWidgets import (
+    QStyle,
+    QStyleOptionViewItem,
+    QStyledItemDelegate,
+    QTableView,
+)
+
+from ..tracing import count, traced
+
+
+LECTURES_ROLE = Qt.ItemDataRole.UserRole
+PAGE_ROLE = Qt.ItemDataRole.UserRole + 1
+CLASHES_ROLE = Qt.ItemDataRole.UserRole + 2
+CLASH_COLOR = QColor(255, 205, 205)
+
+
+def get_lecture_texts(lectures: dict) -> list[str]:
+    """Returns the text of every lecture of a cell: the groups, the professors and the room on
+    separate lines, followed by the subject."""
+    texts = []
+    for timetable_key, objects in lectures.items():
+        for i, object_ in enumerate(objects):
+            text = ', '.join(object_.names)
+            if timetable_key != 'subjects':
+                text += '\n'
+            if len(texts) < i + 1:
+                texts.append('')
+            texts[i] += text
+    return texts
+
+
+class TimetableTableModel(QAbstractTableModel):
+    """Weekdays as columns and time intervals as rows. Every cell holds a stack of lectures,
+    of which one page (lecture) is shown at a time."""
+
+
+    def __init__(self, parent: QObject | None = None) -> None:
+        super().__init__(parent)
+        self.weekdays: list[str] = []
+        self.intervals: list[str] = []
+        self.lectures: dict[tuple[int, int], list[str]] = {}
+        self.pages: dict[tuple[int, int], int] = {}
+        # the descriptions of the clashes of every highlighted cell
+        self.clashes: dict[tuple[int, int], list[str]] = {}
+
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.intervals)
+
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.weekdays)
+
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        headers = self.weekdays if orientation == Qt.Orientation.Horizontal else self.intervals
+        return headers[section] if section < len(headers) else None
+
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        cell = (index.row(), index.column())
+        lectures = self.lectures.get(cell, [])
+        if role == LECTURES_ROLE:
+            return lectures
+        if role == PAGE_ROLE:
+            return self.pages.get(cell, 0)
+        if role == CLASHES_ROLE:
+            return self.clashes.get(cell, [])
+        if role == Qt.ItemDataRole.DisplayRole:
+            return lectures[self.pages.get(cell, 0)] if lectures else None
+        if role == Qt.ItemDataRole.BackgroundRole and cell in self.clashes:
+            return CLASH_COLOR
+        if role == Qt.ItemDataRole.ToolTipRole and (len(lectures) > 1 or cell in self.clashes):
+            texts = ['\n'.join(self.clashes[cell])] if cell in self.clashes else []
+            return '\n\n'.join(texts + lectures)
+        return None
+
+
+    def set_headers(self, weekdays: list[str], intervals: list[str]) -> None:
+        self.beginResetModel()
+        self.weekdays, self.intervals = list(weekdays), list(intervals)
+        self.lectures.clear()
+        self.pages.clear()
+        self.clashes.clear()
+        self.endResetModel()
+
+
+    def set_timetable(self, timetable: dict, cells: Iterable[tuple[str, str]] | None = None) -> None:
+        """Shows a (filtered) timetable. If cells is given, only those (weekday, interval) cells are updated.
+        No widget is created, the view is only notified of the data which changed."""
+        if cells is None:
+            cells = [(weekday, interval) for weekday in self.weekdays for interval in self.intervals]
+        for weekday, interval in cells:
+            cell = (self.intervals.index(interval), self.weekdays.index(weekday))
+            texts = get_lecture_texts(timetable[weekday][interval])
+            if texts == self.lectures.get(cell):
+                continue
+            self.lectures[cell] = texts
+            self.pages[cell] = 0
+            index = self.index(*cell)
+            self.dataChanged.emit(index, index)
+
+
+    def set_clashes(self, clashes: dict[tuple[str, str], list[str]]) -> None:
+        """Highlights the (weekday, interval) cells which have clashes, described by the given texts."""
+        new = {
+            (self.intervals.index(interval), self.weekdays.index(weekday)): texts
+            for (weekday, interval), texts in clashes.items()
+        }
+        old, self.clashes = self.clashes, new
+        for cell in set(new) | set(old):
+            if new.get(cell) != old.get(cell):
+                index = self.index(*cell)
+                self.dataChanged.emit(index, index)
+
+
+    def set_page(self, index: QModelIndex, page: int) -> None:
+        cell = (index.row(), index.column())
+        count = len(self.lectures.get(cell, []))
+        if count == 0:
+            return
+        page %= count
+        if page != self.pages.get(cell, 0):
+            self.pages[cell] = page
+            self.dataChanged.emit(index, index)
+
+
+class LectureStackDelegate(QStyledItemDelegate):
+    """Paints the current lecture of a cell. When a cell has several lectures, a pager is painted
+    at its top: clicking its left or right half, or scrolling over the cell, changes the lecture."""
+    margin = 4
+
+
+    def __init__(self, view: QTableView) -> None:
+        super().__init__(view)
+        self.view = view
+        view.viewport().installEventFilter(self)
+
+
+    def pager_rect(self, option: QStyleOptionViewItem) -> QRect:
+        rect = option.rect.adjusted(self.margin, self.margin, -self.margin, 0)
+        rect.setHeight(option.fontMetrics.height())
+        return rect
+
+
+    @traced('LectureStackDelegate.paint')
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem, index: QModelIndex) -> None:
+        count('cells painted')
+        self.initStyleOption(option, index)
+        style = option.widget.style() if option.widget else self.view.style()
+        style.drawPrimitive(QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter, option.widget)
+        lectures = index.data(LECTURES_ROLE)
+        if not lectures:
+            return
+        painter.save()
+        painter.setClipRect(option.rect)
+        rect = option.rect.adjusted(self.margin, self.margin, -self.margin, -self.margin)
+        if len(lectures) > 1:
+            pager = self.pager_rect(option)
+            page = index.data(PAGE_ROLE)
+            painter.setPen(option.palette.color(option.palette.ColorRole.PlaceholderText))
+            painter.drawText(pager, Qt.AlignmentFlag.AlignCenter, f'‹  {page + 1}/{len(lectures)}  ›')
+            rect.setTop(pager.bottom() + self.margin)
+        painter.setPen(option.palette.color(option.palette.ColorRole.Text))
+        flags = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop | Qt.TextFlag.TextWordWrap
+        painter.drawText(rect, flags, index.data(Qt.ItemDataRole.DisplayRole))
+        painter.restore()
+
+
+    def editorEvent(self, event: QEvent, model: TimetableTableModel, option: QStyleOptionViewItem, index: QModelIndex) -> bool:
+        if event.type() != QEvent.Type.MouseButtonRelease or len(index.data(LECTURES_ROLE) or []) < 2:
+            return False
+        pager = self.pager_rect(option)
+        position = event.position().toPoint()
+        if not pager.contains(position):
+            return False
+        step = -1 if position.x() < pager.center().x() else 1
+        model.set_page(index, index.data(PAGE_ROLE) + step)
+        return True
+
+
+    def eventFilter(self, object: QObject, event: QEvent) -> bool:
+        if event.type() == QEvent.Type.Wheel:
+            index = self.view.indexAt(event.position().toPoint())
+            if index.isValid() and len(index.data(LECTURES_ROLE) or []) > 1:
+                step = -1 if event.angleDelta().y() > 0 else 1
+                self.view.model().set_page(index, index.data(PAGE_ROLE) + step)
+                return True
+        return False
@@ -1,29 +1,45 @@
 """HTML, json and other utilities."""
 from __future__ import annotations
 
+import hashlib
 import os
-from typing import Any
+import time
+from functools import partial
+from typing import Any, Callable, TYPE_CHECKING
 
 import json
-from unidecode import unidecode
 from attrs import define, field
-from bs4 import Tag, ResultSet
 
-from ..request import request_table
+from ..request import (
+    FetchResult,
+    Fetcher,
+    get_fetcher,
+    parse_table,
+)
+from ..store import ColumnarTimetable
+from .. import snapshot
 from ..objects import (
     Weekday,
     TimeInterval,
     Group,
     Groups,
+    GroupHierarchy,
     Professor,
     Professors,
     Room,
     Rooms,
     Subject,
     Subjects,
-    ObjectCreator
+    Catalog,
+    ObjectCreator,
+    entities,
 )
-from ..assets import TIMETABLE
+from ..assets import TIMETABLE, TIMETABLE_SNAPSHOT
+from ..tracing import count, traced, tracer
+
+if TYPE_CHECKING:
+    # bs4 and unidecode are only imported when a page is parsed, to keep the startup fast
+    from bs4 import Tag, ResultSet
 
 
 
@@ -48,18 +64,39 @@ def check_json_is_valid(filepath) -> bool:
     return _check_is_file(filepath) and _check_is_openable(filepath)
 
 
+class TimetableNotFound(Exception):
+    """Raised when there is no local timetable and it should not be downloaded."""
+
+
 @define
 class Table:
     """Describes an HTML code table."""
     years: list[str] = field(default=['2023', '2024'], converter='_'.join)
     semester: str = field(default='1', converter=str)
+    fetcher: Fetcher | None = field(factory=get_fetcher)
+    _result: FetchResult = field(default=None, init=False)
     _tag: Tag = field(default=None, init=False)
+
+
+    @classmethod
+    def from_content(cls, content: bytes, url: str = '') -> Table:
+        """Creates a table from an already downloaded page."""
+        table = cls(fetcher=None)
+        table._result = FetchResult(url=url, content=content, digest=hashlib.sha256(content).hexdigest())
+        return table
+
+
+    @property
+    def result(self) -> FetchResult:
+        if self._result is None:
+            self._result = self.fetcher.fetch_table(years=self.years, semester=self.semester)
+        return self._result
         
 
     @property
     def tag(self):
         if self._tag is None:
-            self._tag = request_table(years=self.years, semester=self.semester)
+            self._tag = parse_table(self.result.content)
         return self._tag
 
 
@@ -109,6 +146,7 @@ class HTMLTableParser:
 
 
     def get_elements_from_lines(self, result_set: ResultSet, class_: str) -> list[tuple[tuple[str]]]:
+        from unidecode import unidecode
         lines = self.find_all_from_result_set(result_set, 'tr', {'class': class_})
         elements: list[tuple[str]] = []
         for line in lines:
@@ -123,31 +161,39 @@ class HTMLTableParser:
         return elements
     
 
+    @traced('HTMLTableParser.get_weekdays')
     def get_weekdays(self) -> list[str]:
+        from unidecode import unidecode
         result_set = self.thead.find_all('th', attrs={'class': 'xAxis'})
         return [unidecode(result.getText()) 
                 for result in result_set]
     
 
+    @traced('HTMLTableParser.get_intervals')
     def get_intervals(self) -> list[str]:
+        from unidecode import unidecode
         intervals = self.tbody.find_all('th', attrs={'class': 'yAxis'})
         return [unidecode(interval.getText())
                 for interval in intervals]
 
 
+    @traced('HTMLTableParser.get_subjects')
     def get_subjects(self) -> list[tuple[tuple[str]]]:
         """Returns the subjects as a list of tuples."""
         return self.get_elements_from_lines(self.tr, 'line1')
     
 
+    @traced('HTMLTableParser.get_groups')
     def get_groups(self) -> list[tuple[tuple[str]]]:
         return self.get_elements_from_lines(self.tr, 'studentsset line0')
     
 
+    @traced('HTMLTableParser.get_professors')
     def get_professors(self) -> list[tuple[tuple[str]]]:
         return self.get_elements_from_lines(self.tr, 'teacher line2')
     
 
+    @traced('HTMLTableParser.get_rooms')
     def get_rooms(self) -> list[tuple[tuple[str]]]:
         return self.get_elements_from_lines(self.tr, 'room line3')
 
@@ -163,7 +209,10 @@ class HTMLTableParser:
 
 @define
 class HTMLElementsToJson:
-    parser: HTMLTableParser = field(default=None)
+    parser: HTMLTableParser | StreamingTableParser = field(default=None)
+    # every timetable has its own files, see library.TimetableLibrary
+    json_file_path: str = TIMETABLE
+    snapshot_file_path: str = TIMETABLE_SNAPSHOT
     _weekdays: list[str] = field(init=False, default=None)
     _time_intervals: list[tuple[str]] = field(init=False, default=None)
     _groups: list[tuple[tuple[str]]] = field(init=False, default=None)
@@ -178,11 +227,6 @@ class HTMLElementsToJson:
         return json.dumps(self.timetable, indent=2)
     
 
-    @property
-    def json_file_path(self) -> str:
-        return TIMETABLE
-
-
     @property
     def weekdays(self) -> list[str]:
         if self._weekdays is None:
@@ -266,24 +310,111 @@ class HTMLElementsToJson:
         self.add_rooms()
         self.add_subjects()
                     
-    def save_json(self) -> None:
-        self.create_json_attribute()
-        with open(self.json_file_path, 'w') as f:
-            f.write(self.json_file)
-
-
-    def read_json(self) -> dict:
-        if not check_json_is_valid(self.json_file_path):
+    def is_up_to_date(self) -> bool:
+        """Checks if the json file was created from the same page as the one downloaded by the parser,
+        in which case the page does not have to be parsed again."""
+        table = self.parser.table
+        cache = table.fetcher.cache if table.fetcher is not None else None
+        if cache is None or not os.path.isfile(self.json_file_path):
+            return False
+        return cache.get_source(self.json_file_path) == table.result.digest
+
+
+    @traced('HTMLElementsToJson.save_json')
+    def save_json(self, force: bool = False, commit: Callable[[], None] | None = None) -> None:
+        """Parses the table and saves it, if it changed. commit is called once the files are about to be written,
+        so a job cancelled before then never leaves its timetable on disk."""
+        table = self.parser.table
+        cache = table.fetcher.cache if table.fetcher is not None else None
+        if force or not self.is_up_to_date():
+            self.create_json_attribute()
+            json_file = self.json_file
+            store = ColumnarTimetable.from_json(self.timetable)
+            if commit is not None:
+                commit()
+            os.makedirs(os.path.dirname(self.json_file_path) or '.', exist_ok=True)
+            # written to a temporary file first, so a crash never leaves a half written json file
+            tmp_path = f'{self.json_file_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(json_file)
+            os.replace(tmp_path, self.json_file_path)
+            self.save_snapshot(store)
+            if cache is not None:
+                cache.set_source(self.json_file_path, table.result.digest)
+        elif commit is not None:
+            commit()
+        if cache is not None:
+            cache.set_validation(self.json_file_path, years=table.years, semester=table.semester)
+
+
+    def get_validation(self) -> dict | None:
+        table = self.parser.table if self.parser is not None else None
+        if table is None or table.fetcher is None or table.fetcher.cache is None:
+            return None
+        return table.fetcher.cache.get_validation(self.json_file_path)
+
+
+    def get_age(self) -> float | None:
+        """Returns the seconds since the json file was last checked against the website.
+        Returns None if it is not known, e.g. for a file saved by an older version."""
+        validation = self.get_validation()
+        if validation is None or not os.path.isfile(self.json_file_path):
+            return None
+        return time.time() - validation['time']
+
+
+    def get_source_table(self) -> Table | None:
+        """Returns the table the json file was last checked against, None if it is not known."""
+        validation = self.get_validation()
+        if validation is None:
+            return None
+        return Table(years=validation['years'].split('_'), semester=validation['semester'])
+
+
+    def save_snapshot(self, store: ColumnarTimetable) -> None:
+        try:
+            snapshot.save(store, self.snapshot_file_path, source_path=self.json_file_path)
+        except OSError:
+            # the snapshot is only a cache, the json file is still used if it cannot be written
+            pass
+
+
+    @traced('HTMLElementsToJson.read_json')
+    def read_json(self, download: bool = True) -> dict:
+        try:
+            with open(self.json_file_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            if not download:
+                raise TimetableNotFound(self.json_file_path)
             if self.parser is None:
-                self.parser = HTMLTableParser()
-            self.save_json()
-        return json.load(open(self.json_file_path))
+                from .streaming import StreamingTableParser
+                self.parser = StreamingTableParser()
+            self.save_json(force=True)
+        with open(self.json_file_path, 'r') as f:
+            return json.load(f)
+
+
+    @traced('HTMLElementsToJson.read_snapshot')
+    def read_snapshot(self, download: bool = True) -> ColumnarTimetable:
+        """Reads the converted timetable from the snapshot. If the snapshot is missing, of another version
+        or older than the json file, the json file is read instead and a new snapshot is saved.
+        If download is False, TimetableNotFound is raised when there is no json file either."""
+        try:
+            return snapshot.load(self.snapshot_file_path, source_path=self.json_file_path)
+        except snapshot.SnapshotError:
+            store = ColumnarTimetable.from_json(self.read_json(download=download))
+            self.save_snapshot(store)
+            return store
     
 
 @define
 class JsonToObjects:
     timetable: dict = field(factory=dict)
     creator: ObjectCreator = field(init=False)
+    catalog: Catalog = field(init=False, default=None)
+    hierarchy: GroupHierarchy = field(init=False, factory=GroupHierarchy)
+    _unique: dict[str, dict[str, Any]] = field(init=False, factory=dict)
 
 
     def __attrs_post_init__(self):
@@ -299,19 +430,50 @@ class JsonToObjects:
 
 
     def to_objects(self, object: type, aggregate_object: type, timetable_key: str, split_separator=None, split_maxsplit=-1):
+        # every distinct value is split only once, to the entities shared by all the cells.
+        # The first occurrence of every name is kept for the catalog, while converting
+        unique = self._unique.setdefault(timetable_key, {})
+        split_values: dict[str, list] = {}
         for weekday, daily_timetable in self.timetable.items():
             for interval, lectures in daily_timetable.items():
-                    to_object = lambda x: aggregate_object(
-                        [object(lecture_object) for lecture_object in x.split(split_separator, split_maxsplit)]
-                        )
-                    self.timetable[weekday][interval][timetable_key] = [to_object(x) for x in lectures[timetable_key]]
-
-
+                converted = []
+                for value in lectures[timetable_key]:
+                    objects = split_values.get(value)
+                    if objects is None:
+                        objects = split_values[value] = entities.get_many(object, value.split(split_separator, split_maxsplit))
+                        for object_ in objects:
+                            unique.setdefault(object_.name, object_)
+                    # the aggregate sorts its list, so every lecture gets its own
+                    converted.append(aggregate_object(list(objects)))
+                self.timetable[weekday][interval][timetable_key] = converted
+
+
+    def create_catalog(self) -> Catalog:
+        """Creates the catalog from the unique objects found by to_objects. Each collection is sorted only once.
+        The group hierarchy shared by the converted Groups objects is built from the catalog groups."""
+        groups = Groups(list(self._unique.get('groups', {}).values()))
+        self.hierarchy.update(groups)
+        self.catalog = Catalog(
+            groups=groups,
+            professors=Professors(list(self._unique.get('professors', {}).values())),
+            rooms=Rooms(list(self._unique.get('rooms', {}).values())),
+            subjects=Subjects(list(self._unique.get('subjects', {}).values())),
+            hierarchy=self.hierarchy,
+        )
+        return self.catalog
+
+
+    @traced('JsonToObjects.convert_timetable')
     def convert_timetable(self):
-        self.to_objects(Group, Groups, 'groups', ',')
+        self._unique.clear()
+        self.to_objects(Group, partial(Groups, hierarchy=self.hierarchy), 'groups', ',')
         self.to_objects(Professor, Professors, 'professors', ',')
         self.to_objects(Room, Rooms, 'rooms', split_maxsplit=0)
         self.to_objects(Subject, Subjects, 'subjects', split_maxsplit=0)
+        self.create_catalog()
+        if tracer.enabled:
+            # the lectures are only summed up when they are traced
+            count('lectures converted', sum(len(lectures['groups']) for daily in self.timetable.values() for lectures in daily.values()))
         return self.timetable
 
 
@@ -319,4 +481,4 @@ def get_attribute_name(class_, obj):
     for name, value in vars(class_).items():
         if value is obj:
             return name
-    return None
\ No newline at end of file
+    return None
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""Memoized views derived from the catalog of the timetable shown by the dialog."""
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from attrs import define, field
+
+from .index import TIMETABLE_KEYS
+from .objects import Catalog
+from .search import SearchIndex
+
+
+@define
+class CatalogViews:
+    """This class memoizes the name lists and the sorted views derived from a catalog (e.g. the items of the comboboxes).
+    Every view is computed once per generation. The model starts a new generation, clearing every view,
+    when it shows a timetable with another catalog. The hits and misses tell how often a view was reused."""
+    catalog: Catalog = field(factory=Catalog)
+    generation: int = 0
+    hits: int = 0
+    misses: int = 0
+    _values: dict[tuple, Any] = field(init=False, factory=dict)
+
+
+    def invalidate(self, catalog: Catalog | None = None) -> None:
+        if catalog is not None:
+            self.catalog = catalog
+        self.generation += 1
+        self._values.clear()
+
+
+    def get(self, key: tuple, compute: Callable[[], Any]) -> Any:
+        try:
+            value = self._values[key]
+        except KeyError:
+            self.misses += 1
+            value = self._values[key] = compute()
+            return value
+        self.hits += 1
+        return value
+
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {'generation': self.generation, 'hits': self.hits, 'misses': self.misses, 'views': len(self._values)}
+
+
+    def names(self, timetable_key: str) -> list[str]:
+        """Returns the sorted names of a catalog collection."""
+        return self.get(('names', timetable_key), lambda: list(self.catalog[timetable_key].names))
+
+
+    def name_set(self, timetable_key: str) -> frozenset[str]:
+        return self.get(('name_set', timetable_key), lambda: frozenset(self.names(timetable_key)))
+
+
+    def subject_timetable_names(self) -> list[str]:
+        return self.get(('subject_timetable_names',), lambda: list(self.catalog.subjects.timetable_names))
+
+
+    def subject_timetable_name_set(self) -> frozenset[str]:
+        return self.get(('subject_timetable_name_set',), lambda: frozenset(self.subject_timetable_names()))
+
+
+    def combobox_items(self, timetable_key: str) -> list[str]:
+        """Returns the sorted items of the combobox of a timetable key. Aggregate groups are not shown
+        and the subjects are shown by their timetable name."""
+        def compute() -> list[str]:
+            if timetable_key == 'groups':
+                return [group.name for group in self.catalog.groups if not group.aggregate]
+            if timetable_key == 'subjects':
+                return self.subject_timetable_names()
+            return self.names(timetable_key)
+
+        return self.get(('combobox_items', timetable_key), compute)
+
+
+    def search_index(self) -> SearchIndex:
+        """Returns the search index over the items of every combobox."""
+        return self.get(
+            ('search_index',),
+            lambda: SearchIndex.from_items({timetable_key: self.combobox_items(timetable_key) for timetable_key in TIMETABLE_KEYS}),
+        )